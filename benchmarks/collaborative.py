@@ -0,0 +1,84 @@
+import argparse
+import json
+import resource
+import time
+import numpy as np
+from benchmarks.synthetic import generate_pois, generate_history, CHUNK_ROWS
+
+
+def synthetic_matrix(n_users, n_pois, n_interactions, seed=0):
+    """Zipf-skewed users x POIs interaction matrix, built chunk by chunk."""
+    from ml_models.collaborative import interaction_matrix
+
+    pois = generate_pois(n_pois, seed=seed)
+    user_ids = np.arange(1, n_users + 1, dtype=np.int64)
+    poi_ids = pois["poi_id"].to_numpy(dtype=np.int64)
+    matrix = None
+    for start in range(0, n_interactions, CHUNK_ROWS):
+        chunk = generate_history(min(CHUNK_ROWS, n_interactions - start), pois, n_users, seed, start)
+        part, _, _ = interaction_matrix(chunk, user_ids, poi_ids)
+        matrix = part if matrix is None else matrix + part
+    return matrix, user_ids, poi_ids
+
+
+def run(n_users, n_pois, n_interactions, factors, iterations, workers, queries, seed=0):
+    from ml_models.collaborative import train_als, CollaborativeModel
+
+    start = time.perf_counter()
+    matrix, user_ids, poi_ids = synthetic_matrix(n_users, n_pois, n_interactions, seed)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    user_factors, item_factors = train_als(matrix, factors, iterations, workers=workers, seed=seed)
+    train_seconds = time.perf_counter() - start
+    model = CollaborativeModel(user_ids, poi_ids, user_factors, item_factors)
+
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(n_users, queries)
+    recommend_latency = []
+    for row in sample:
+        t = time.perf_counter()
+        model.recommend(model.user_factors[row], top_n=10, exclude=poi_ids[matrix.indices[
+            matrix.indptr[row]:matrix.indptr[row + 1]]])
+        recommend_latency.append(time.perf_counter() - t)
+
+    fold_in_latency = []
+    for row in sample:
+        cols = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+        t = time.perf_counter()
+        model.fold_in(poi_ids[cols], matrix.data[matrix.indptr[row]:matrix.indptr[row + 1]])
+        fold_in_latency.append(time.perf_counter() - t)
+
+    return {
+        "users": n_users, "pois": n_pois, "interactions": int(matrix.nnz), "factors": factors,
+        "iterations": iterations, "matrix_seconds": round(build_seconds, 2),
+        "train_seconds": round(train_seconds, 2),
+        "seconds_per_iteration": round(train_seconds / max(iterations, 1), 2),
+        "recommend_p50_ms": round(float(np.percentile(recommend_latency, 50)) * 1000, 3),
+        "recommend_p99_ms": round(float(np.percentile(recommend_latency, 99)) * 1000, 3),
+        "fold_in_p50_ms": round(float(np.percentile(fold_in_latency, 50)) * 1000, 3),
+        "fold_in_p99_ms": round(float(np.percentile(fold_in_latency, 99)) * 1000, 3),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ALS collaborative-filtering model")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--pois", type=int, default=100_000)
+    parser.add_argument("--interactions", type=int, default=5_000_000)
+    parser.add_argument("--factors", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None, help="Threads (default: all cores).")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = run(args.users, args.pois, args.interactions, args.factors, args.iterations,
+                  args.workers, args.queries, args.seed)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
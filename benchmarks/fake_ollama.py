@@ -0,0 +1,134 @@
+import json
+import re
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOllamaServer:
+    """
+    Local stand-in for the Ollama HTTP API (/api/generate and the OpenAI-style
+    /v1/chat/completions). Every reply waits `latency` seconds, and prompts
+    mentioning any name in `fail_for` get an HTTP 500. Streamed /api/generate
+    replies send one token every `token_latency` seconds.
+    """
+
+    def __init__(self, latency=0.0, fail_for=(), token_latency=0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.fail_for = set(fail_for)
+        self.requests = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def in_flight(self):
+        """Requests the server is still working on."""
+        with self._lock:
+            return self._in_flight
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reply_for(self, prompt):
+        match = re.search(r"why (.+?) in ", prompt)
+        return f"Fake explanation for {match.group(1) if match else 'prompt'}."
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if "prompt" in body:
+                    prompt = body["prompt"]
+                else:
+                    prompt = body["messages"][-1]["content"]
+
+                with server._lock:
+                    server.requests += 1
+                    server._in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server._in_flight)
+                try:
+                    time.sleep(server.latency)
+                    if any(name in prompt for name in server.fail_for):
+                        self.send_response(500)
+                        self.end_headers()
+                        return
+
+                    text = server.reply_for(prompt)
+                    if "prompt" in body and body.get("stream"):
+                        # Ollama streams NDJSON chunks, one per token, ending with done=true
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/x-ndjson")
+                        self.end_headers()
+                        for token in text.split(" "):
+                            chunk = {"model": body.get("model"), "response": token + " ", "done": False}
+                            self.wfile.write((json.dumps(chunk) + "\n").encode())
+                            self.wfile.flush()
+                            time.sleep(server.token_latency)
+                        self.wfile.write((json.dumps({"response": "", "done": True}) + "\n").encode())
+                        return
+                    if "prompt" in body:
+                        payload = {"model": body.get("model"), "response": text, "done": True}
+                    else:
+                        payload = {"choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]}
+                    data = json.dumps(payload).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+
+        return Handler
+
+
+class OllamaHTTPClient:
+    """Minimal client for /api/generate with the same `call` API as crewai's LLM, plus token `stream`."""
+
+    def __init__(self, base_url, model="mistral", timeout=10.0):
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+
+    def call(self, prompt):
+        data = json.dumps({"model": self.model, "prompt": prompt, "stream": False}).encode()
+        request = urllib.request.Request(
+            f"{self.base_url}/api/generate", data=data, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())["response"]
+
+    def stream(self, prompt):
+        data = json.dumps({"model": self.model, "prompt": prompt, "stream": True}).encode()
+        request = urllib.request.Request(
+            f"{self.base_url}/api/generate", data=data, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            for line in response:
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    return
@@ -0,0 +1,98 @@
+import argparse
+import json
+import subprocess
+import sys
+
+# Cold-import budgets in milliseconds (best of REPEATS runs) and modules
+# each entry point must not pull in. pandas alone costs a few hundred ms,
+# so modules that need it get a correspondingly larger budget. Budgets
+# depend on the machine and are only reported; heavy imports are errors.
+IMPORT_BUDGETS = {
+    "main": (200, ["crewai", "pandas", "sklearn", "scipy"]),
+    "trip_agents.llm": (100, ["crewai"]),
+    "trip_agents.stages": (200, ["crewai", "pandas", "sklearn", "scipy"]),
+    "ml_models.model_registry": (100, ["joblib", "sklearn"]),
+    "ml_models.destination_classifier": (1500, ["crewai", "sklearn"]),
+    "ml_models.preference_scorer": (1500, ["crewai", "sklearn", "scipy"]),
+    "ml_models.optimizer": (1500, ["crewai", "sklearn", "scipy"]),
+}
+REPEATS = 3
+
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} from `python -X importtime` output."""
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def measure_import(module):
+    """Cold import of `module` in a fresh interpreter: (total_ms, timings)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    timings = parse_importtime(result.stderr)
+    return timings[module][1] / 1000.0, timings
+
+
+def heavy_imports(module, forbidden):
+    """Which of `forbidden` are in sys.modules after importing `module` in a fresh interpreter."""
+    code = (f"import json, sys, {module}\n"
+            f"print(json.dumps([name for name in {list(forbidden)!r} if name in sys.modules]))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def check_budgets(budgets=IMPORT_BUDGETS, repeats=REPEATS):
+    """
+    Measures every entry point; returns (report rows, list of violations).
+    Only heavy imports are violations; time over budget is in the report.
+    """
+    report, violations = [], []
+    for module, (budget_ms, forbidden) in budgets.items():
+        runs = [measure_import(module) for _ in range(repeats)]
+        total_ms, timings = min(runs, key=lambda run: run[0])
+        loaded = [name for name in forbidden if name in timings]
+        report.append((module, total_ms, budget_ms, loaded))
+        if loaded:
+            violations.append(f"{module}: imports {', '.join(loaded)} at import time")
+    return report, violations
+
+
+def slowest_imports(module, top=15):
+    """The imports contributing most (self time) to a cold import of `module`."""
+    _, timings = measure_import(module)
+    return sorted(timings.items(), key=lambda item: -item[1][0])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check")
+    parser.add_argument("--module", help="Show the slowest imports behind one module instead.")
+    args = parser.parse_args()
+
+    if args.module:
+        for name, (self_us, cumulative_us) in slowest_imports(args.module):
+            print(f"{self_us / 1000:9.1f} ms self {cumulative_us / 1000:9.1f} ms cumulative  {name}")
+        return
+
+    report, violations = check_budgets()
+    for module, total_ms, budget_ms, loaded in report:
+        over = "  OVER BUDGET" if total_ms > budget_ms else ""
+        heavy = f"  (loads {', '.join(loaded)})" if loaded else ""
+        print(f"{module:<36} {total_ms:8.1f} ms / {budget_ms} ms{over}{heavy}")
+    for violation in violations:
+        print(f"HEAVY IMPORT: {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+# Allowed slowdown before a stage counts as a regression against the baseline
+TOLERANCE = 0.25
+
+# Calls per stage used for the tracemalloc pass (tracing slows calls down,
+# so latency and memory are measured in separate passes)
+MEMORY_CALLS = 3
+
+STAGES = [
+    "predict_category", "score_pois_for_user", "hybrid_recommend",
+    "optimize_itinerary", "recommend_pois", "generate_itinerary",
+]
+
+
+def percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q) * 1000.0) if latencies else 0.0
+
+
+def measure(stage, calls):
+    """Runs each zero-argument callable in `calls`; latency pass, then memory pass."""
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    for call in calls[:MEMORY_CALLS]:
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        "stage": stage,
+        "calls": len(latencies),
+        "throughput": len(latencies) / total if total else 0.0,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        "peak_kb": peak / 1024.0,
+    }
+
+
+def prepare(workdir, sizes, seed):
+    """
+    Generates the dataset under workdir/data, moves there (os.chdir, for
+    the whole process) and trains both models.
+    """
+    from benchmarks.synthetic import write_dataset
+
+    write_dataset(os.path.join(workdir, "data"), sizes["pois"], sizes["users"], sizes["history"],
+                  sizes.get("cities"), seed)
+    os.chdir(workdir)
+
+    from ml_models.training import train_models
+
+    start = time.perf_counter()
+    train_models()
+    return time.perf_counter() - start
+
+
+def build_calls(requests, seed, llm_url):
+    """One list of zero-argument calls per stage, all drawn from the same seeded sample."""
+    from ml_models.poi_catalog import get_catalog
+    from ml_models.destination_classifier import predict_category
+    from ml_models.preference_scorer import score_pois_for_user
+    from ml_models.recommender import hybrid_recommend
+    from ml_models.optimizer import optimize_itinerary
+    from personalization.adaptive_recommender import load_user, recommend_pois
+    from trip_agents.stages import score_pois
+
+    rng = np.random.default_rng(seed)
+    pois = get_catalog().frame()
+    history_users = np.unique(np.loadtxt("data/user_history_draft1.csv", delimiter=",", skiprows=1,
+                                         usecols=0, dtype=int, ndmin=1))
+    users = rng.choice(history_users, requests)
+    picks = pois.iloc[rng.integers(0, len(pois), requests)]
+    cities = list(zip(picks["location"], picks["country"], picks["climate"], picks["budget"]))
+
+    # Candidate lists are prepared up front so only the optimizer is timed
+    city_pois = {city[:2]: score_pois(0, city[0], city[1]) for city in set(cities)}
+
+    def known_user(user_id):
+        try:
+            load_user(user_id)
+            return True
+        except ValueError:
+            return False
+
+    profile_users = [u for u in users if known_user(u)] or list(users)
+
+    calls = {
+        "predict_category": [
+            lambda c=c: predict_category(c[2], c[0], c[3]) for c in cities
+        ],
+        "score_pois_for_user": [lambda u=u: score_pois_for_user(u) for u in users],
+        "hybrid_recommend": [lambda u=u: hybrid_recommend(u) for u in users],
+        "optimize_itinerary": [
+            lambda c=c: optimize_itinerary(city_pois[c[:2]], trip_days=3, slots_per_day=2, max_budget=c[3])
+            for c in cities
+        ],
+        "recommend_pois": [lambda u=u: recommend_pois(u) for u in profile_users],
+    }
+    if llm_url is not None:
+        calls["generate_itinerary"] = end_to_end_calls(users, cities, llm_url)
+    return calls
+
+
+def end_to_end_calls(users, cities, llm_url):
+    from crewai import LLM
+    from trip_agents.trip_agents import TripPipeline
+
+    pipeline = TripPipeline(agent_llm=LLM(model="ollama/mistral", base_url=llm_url))
+
+    def run(user_id, city):
+        try:
+            pipeline.run(int(user_id), city[0], city[1], city[3], city[2], 2)
+        except ValueError:
+            pass    # nothing fits the budget in this city; still a full pipeline pass
+
+    return [lambda u=u, c=c: run(u, c) for u, c in zip(users, cities)]
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Regression messages for stages slower than `baseline` by more than `tolerance`."""
+    regressions = []
+    if baseline.get("sizes") != results["sizes"]:
+        print(f"Baseline sizes {baseline.get('sizes')} differ from this run {results['sizes']}; "
+              "comparison is indicative only.")
+    previous = {stage["stage"]: stage for stage in baseline.get("stages", [])}
+    for stage in results["stages"]:
+        old = previous.get(stage["stage"])
+        if old is None:
+            continue
+        if stage["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{stage['stage']}: p95 {stage['p95_ms']:.2f} ms vs baseline {old['p95_ms']:.2f} ms")
+        if stage["throughput"] < old["throughput"] / (1 + tolerance):
+            regressions.append(f"{stage['stage']}: {stage['throughput']:.1f}/s vs baseline {old['throughput']:.1f}/s")
+        if stage["peak_kb"] > old["peak_kb"] * (1 + tolerance) + 64:
+            regressions.append(f"{stage['stage']}: peak {stage['peak_kb']:.0f} KiB vs baseline {old['peak_kb']:.0f} KiB")
+    return regressions
+
+
+def run_benchmarks(sizes, requests=20, seed=0, stages=STAGES, llm_latency=0.05, workdir=None):
+    """
+    Generates a synthetic dataset of `sizes` (pois/users/history/cities),
+    trains the models on it and benchmarks each stage. Runs inside `workdir`
+    (a fresh temp dir by default) because the pipeline uses relative paths.
+
+    prepare() changes the working directory of the whole process until this
+    returns, so do not call it from a multi-threaded or embedding process
+    (a service, a notebook kernel); run the CLI in its own process instead.
+    """
+    cwd = os.getcwd()
+    workdir = workdir or tempfile.mkdtemp(prefix="trip-bench-")
+    try:
+        train_seconds = prepare(workdir, sizes, seed)
+        server = None
+        if "generate_itinerary" in stages:
+            from benchmarks.fake_ollama import FakeOllamaServer
+            server = FakeOllamaServer(latency=llm_latency).__enter__()
+        try:
+            calls = build_calls(requests, seed, server.url if server else None)
+            results = [measure(stage, calls[stage]) for stage in stages if stage in calls]
+        finally:
+            if server is not None:
+                server.__exit__(None, None, None)
+    finally:
+        os.chdir(cwd)
+    return {"sizes": sizes, "seed": seed, "requests": requests,
+            "train_seconds": train_seconds, "stages": results}
+
+
+def print_report(results):
+    print(f"Sizes: {results['sizes']} (training took {results['train_seconds']:.2f}s)")
+    print(f"{'stage':<22}{'calls':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KiB':>11}")
+    for s in results["stages"]:
+        print(f"{s['stage']:<22}{s['calls']:>6}{s['throughput']:>10.1f}{s['p50_ms']:>10.2f}"
+              f"{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['peak_kb']:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic data")
+    parser.add_argument("--pois", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--history", type=int, default=100_000)
+    parser.add_argument("--cities", type=int, default=None)
+    parser.add_argument("--requests", type=int, default=50, help="Calls per stage.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM reply.")
+    parser.add_argument("--workdir", help="Where to generate data and models (default: a temp dir).")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare against a results JSON saved earlier.")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    sizes = {"pois": args.pois, "users": args.users, "history": args.history, "cities": args.cities}
+    results = run_benchmarks(sizes, args.requests, args.seed, args.stages, args.llm_latency, args.workdir)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
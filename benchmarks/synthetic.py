@@ -0,0 +1,161 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+# Same file names as data/, so a generated directory can stand in for the
+# repo's data folder (the pipeline uses relative "data/..." paths).
+POI_CSV = "POIs_draft1.csv"
+USERS_CSV = "users_draft1.csv"
+HISTORY_CSV = "user_history_draft1.csv"
+
+CATEGORIES = [
+    "culture", "museums", "nature", "hiking", "history", "gardens", "beaches",
+    "walking", "architecture", "adventure", "entertainment", "food", "nightlife", "shopping",
+]
+CLIMATES = ["warm", "cold", "temperate"]
+BUDGETS = ["low", "medium", "high"]
+INTERACTION_TYPES = ["viewed", "clicked", "booked"]
+
+# Rows are written in chunks so 10^7-row histories never sit in one frame
+CHUNK_ROWS = 1_000_000
+
+
+def zipf_weights(n, exponent=1.1):
+    """Normalised Zipf weights: item i gets weight proportional to 1 / (i + 1)^exponent."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def generate_cities(n_cities, rng):
+    countries = max(1, n_cities // 4)
+    cities = pd.DataFrame({
+        "location": [f"City {i}" for i in range(n_cities)],
+        "country": [f"Country {i % countries}" for i in range(n_cities)],
+        "climate": rng.choice(CLIMATES, n_cities, p=[0.5, 0.2, 0.3]),
+        "latitude": rng.uniform(-50, 65, n_cities),
+        "longitude": rng.uniform(-170, 170, n_cities),
+    })
+    # Each city favours a few categories (its own skewed mix)
+    cities["category_order"] = [rng.permutation(len(CATEGORIES)) for _ in range(n_cities)]
+    return cities
+
+
+def generate_pois(n_pois, n_cities=None, seed=0):
+    """
+    `n_pois` POIs over `n_cities` cities. City sizes follow a Zipf law (a few
+    large tourist hubs, a long tail of small towns) and categories are skewed
+    per city, like the hand-made catalog's many-Paris-sights shape.
+    """
+    rng = np.random.default_rng(seed)
+    n_cities = n_cities or max(4, int(np.sqrt(n_pois)))
+    cities = generate_cities(n_cities, rng)
+
+    city = rng.choice(n_cities, n_pois, p=zipf_weights(n_cities))
+    # Every city gets at least one POI when there are enough to go round
+    city[:min(n_cities, n_pois)] = np.arange(min(n_cities, n_pois))
+    city.sort()
+
+    category_rank = rng.choice(len(CATEGORIES), n_pois, p=zipf_weights(len(CATEGORIES), 1.3))
+    category_order = np.stack(cities["category_order"].to_numpy())
+    category = np.asarray(CATEGORIES)[category_order[city, category_rank]]
+
+    return pd.DataFrame({
+        "poi_id": np.arange(1, n_pois + 1),
+        "name": [f"POI {i}" for i in range(1, n_pois + 1)],
+        "category": category,
+        "location": cities["location"].to_numpy()[city],
+        "country": cities["country"].to_numpy()[city],
+        "climate": cities["climate"].to_numpy()[city],
+        "budget": rng.choice(BUDGETS, n_pois, p=[0.4, 0.4, 0.2]),
+        "duration_hours": rng.choice([1, 2, 3, 4, 5], n_pois, p=[0.15, 0.35, 0.25, 0.15, 0.1]),
+        "rating": np.round(np.clip(rng.normal(4.3, 0.35, n_pois), 1.0, 5.0), 1),
+        # Within ~5 km of the city centre
+        "latitude": np.round(cities["latitude"].to_numpy()[city] + rng.normal(0, 0.025, n_pois), 6),
+        "longitude": np.round(cities["longitude"].to_numpy()[city] + rng.normal(0, 0.035, n_pois), 6),
+    })
+
+
+def generate_users(n_users, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    category_weights = zipf_weights(len(CATEGORIES), 1.0)
+    interests = [
+        ", ".join(rng.choice(CATEGORIES, rng.integers(1, 4), replace=False, p=category_weights))
+        for _ in range(n_users)
+    ]
+    return pd.DataFrame({
+        "user_id": np.arange(1, n_users + 1),
+        "name": [f"User {i}" for i in range(1, n_users + 1)],
+        "preferred_climate": rng.choice(CLIMATES, n_users, p=[0.5, 0.2, 0.3]),
+        "preferred_budget": rng.choice(BUDGETS, n_users, p=[0.4, 0.4, 0.2]),
+        "interest_categories": interests,
+        "trip_duration_days": rng.integers(2, 10, n_users),
+    })
+
+
+def generate_history(n_rows, pois, n_users, seed=0, start=0):
+    """
+    Interactions where both user activity and POI popularity are Zipf-skewed
+    (a few power users, a few famous sights). Higher-rated POIs are liked more.
+    `start` offsets the random stream so chunks of one history differ.
+    """
+    rng = np.random.default_rng([seed + 2, start])
+    user_id = rng.choice(n_users, n_rows, p=zipf_weights(n_users, 0.8)) + 1
+
+    # Popularity follows rating order with a Zipf tail
+    popularity = np.argsort(-pois["rating"].to_numpy(), kind="stable")
+    poi_index = popularity[rng.choice(len(pois), n_rows, p=zipf_weights(len(pois), 0.9))]
+    rating = pois["rating"].to_numpy()[poi_index]
+
+    liked = (rng.random(n_rows) < np.clip((rating - 3.0) / 2.0, 0.05, 0.95)).astype(int)
+    seconds = rng.integers(0, 365 * 24 * 3600, n_rows)
+    timestamp = pd.Timestamp("2025-01-01") + pd.to_timedelta(seconds, unit="s")
+
+    return pd.DataFrame({
+        "user_id": user_id,
+        "poi_id": pois["poi_id"].to_numpy()[poi_index],
+        "liked": liked,
+        "interaction_type": rng.choice(INTERACTION_TYPES, n_rows, p=[0.6, 0.3, 0.1]),
+        "timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+
+def write_dataset(directory, n_pois=1_000, n_users=100, n_history=1_000, n_cities=None, seed=0):
+    """Writes POIs, users and history CSVs into `directory`; returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {name: os.path.join(directory, filename)
+             for name, filename in [("pois", POI_CSV), ("users", USERS_CSV), ("history", HISTORY_CSV)]}
+
+    pois = generate_pois(n_pois, n_cities, seed)
+    pois.to_csv(paths["pois"], index=False)
+    generate_users(n_users, seed).to_csv(paths["users"], index=False)
+
+    with open(paths["history"], "w", newline="") as f:
+        for start in range(0, max(n_history, 1), CHUNK_ROWS):
+            rows = min(CHUNK_ROWS, n_history - start)
+            if rows <= 0:
+                break
+            chunk = generate_history(rows, pois, n_users, seed, start)
+            chunk.to_csv(f, index=False, header=(start == 0))
+        if n_history == 0:
+            f.write("user_id,poi_id,liked,interaction_type,timestamp\n")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic trip-planner dataset")
+    parser.add_argument("directory")
+    parser.add_argument("--pois", type=int, default=1_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--history", type=int, default=1_000)
+    parser.add_argument("--cities", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = write_dataset(args.directory, args.pois, args.users, args.history, args.cities, args.seed)
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,133 @@
-from trip_agents.trip_agents import generate_itinerary
-import pandas as pd
+import argparse
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Agentic Trip Planner")
+    parser.add_argument("--user-id", type=int, default=1, help="User to plan the trip for (interactive mode).")
+    parser.add_argument("--serve", action="store_true", help="Run the HTTP/JSON itinerary service instead of prompting.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8, help="Itineraries generated in parallel by the service.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds for the service.")
+    parser.add_argument("--no-llm", action="store_true",
+                        help="Template explanations only; skips loading crewai and the LLM client.")
+    parser.add_argument("--telemetry", action="store_true", help="Record metrics and write them to --metrics-file.")
+    parser.add_argument("--metrics-file", default="logs/metrics.prom")
+    parser.add_argument("--trace-sample", type=float, default=None,
+                        help="Fraction of requests traced to logs/traces.jsonl (implies --telemetry).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Attach cProfile and tracemalloc reports to this itinerary's trace.")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Print the itinerary only once every explanation is ready.")
+    parser.add_argument("--stream-tokens", action="store_true",
+                        help="Print LLM explanations token by token as they are generated.")
+    parser.add_argument("--bulk", metavar="REQUESTS",
+                        help="Generate itineraries for every request in this CSV/Parquet file (see trip_agents/bulk.py).")
+    parser.add_argument("--bulk-output", default="output/bulk", help="Output directory for --bulk (resumable).")
+    return parser.parse_args()
+
+def render_stream(events):
+    """Prints the schedule as soon as it exists, then each explanation as it arrives."""
+    rows, streaming = [], None
+    for event in events:
+        if event["event"] == "schedule":
+            rows = event["itinerary"].to_dict("records")
+            print("\nYour Optimized Itinerary")
+            for _, row in event["itinerary"].iterrows():
+                print(f"Day {row['day']} {row['time_of_day']}: {row['name']} ({row['category']}) — "
+                      f"Budget: {row['budget']} | Rating: {row['rating']}")
+            print("\nWhy these places:")
+        elif event["event"] == "token":
+            if streaming != event["index"]:
+                streaming = event["index"]
+                row = rows[streaming]
+                print(f"Day {row['day']} {row['time_of_day']} – {row['name']}")
+                print("→ ", end="")
+            print(event["text"], end="", flush=True)
+        elif event["event"] == "explanation":
+            row = event["row"]
+            if streaming == event["index"]:
+                print("\n")
+            else:
+                print(f"Day {row['day']} {row['time_of_day']} – {row['name']}")
+                print(f"→ {event['explanation']}\n")
+            streaming = None
 
 def main():
+    args = parse_args()
+    record_metrics = args.telemetry or bool(args.trace_sample) or args.profile
+    if record_metrics:
+        from telemetry.tracing import configure
+        from telemetry.metrics import start_exporter
+        configure(enabled=True, sample_rate=args.trace_sample)
+        if args.serve:
+            start_exporter(path=args.metrics_file)
+
+    if args.serve:
+        from trip_agents.service import run_service
+        options = {"max_workers": args.workers, "timeout": args.timeout}
+        if args.no_llm:
+            from trip_agents.stages import template_itinerary, stream_template_itinerary
+            options["generate"] = template_itinerary
+            options["stream"] = stream_template_itinerary
+        run_service(host=args.host, port=args.port, **options)
+        return
+
+    if args.bulk:
+        from trip_agents.bulk import run_bulk
+        llm = None
+        if not args.no_llm:
+            from trip_agents.llm import get_llm
+            llm = get_llm()
+        run_bulk(args.bulk, args.bulk_output, llm=llm)
+        return
+
+    if args.no_llm:
+        from trip_agents.stages import template_itinerary as generate_itinerary
+        from trip_agents.stages import stream_template_itinerary as generate_itinerary_stream
+    else:
+        from trip_agents.trip_agents import generate_itinerary, generate_itinerary_stream
+
     print("Agentic Trip Planner")
-    user_id = 1
+    user_id = args.user_id
 
-    location = input("Enter a city you'd like to visit (e.g., Paris): ").strip()
+    location = input("Enter a city you'd like to visit (e.g., Paris; several as 'Athens, Santorini'; "
+                     "blank for the whole country): ").strip()
     country = input("Enter the country: ").strip()
     budget = input("Enter your budget level (low/medium/high): ").strip().lower() or "medium"
     climate = input("Preferred climate (warm/cold): ").strip().lower() or "warm"
 
-    itinerary = generate_itinerary(
-        user_id=user_id,
-        location=location,
-        country=country,
-        budget=budget,
-        climate=climate,
-        trip_days=3
-    )
-
-    print("\nYour Optimized Itinerary")
-    for _, row in itinerary.iterrows():
-        print(f"Day {row['day']} {row['time_of_day']}: {row['name']} ({row['category']}) — "
-              f"Budget: {row['budget']} | Rating: {row['rating']}")
-        print(f"→ {row['explanation']}\n")
+    if args.no_stream or args.profile:
+        itinerary = generate_itinerary(
+            user_id=user_id,
+            location=location,
+            country=country,
+            budget=budget,
+            climate=climate,
+            trip_days=3,
+            profile=args.profile
+        )
+
+        print("\nYour Optimized Itinerary")
+        for _, row in itinerary.iterrows():
+            print(f"Day {row['day']} {row['time_of_day']}: {row['name']} ({row['category']}) — "
+                  f"Budget: {row['budget']} | Rating: {row['rating']}")
+            print(f"→ {row['explanation']}\n")
+    else:
+        events = generate_itinerary_stream(
+            user_id=user_id,
+            location=location,
+            country=country,
+            budget=budget,
+            climate=climate,
+            trip_days=3,
+            tokens=args.stream_tokens
+        )
+        render_stream(events)
+
+    if record_metrics:
+        from telemetry.metrics import metrics
+        metrics.write(args.metrics_file)
+        print(f"Metrics written to {args.metrics_file}")
 
 if __name__ == "__main__":
     main()
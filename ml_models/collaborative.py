@@ -0,0 +1,308 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from personalization.history_manager import load_history, HISTORY_FILE
+
+MODEL_PATH = "models/cf_model.npz"
+
+# Implicit-feedback strength per interaction; a dislike keeps a weak signal
+# (the user still engaged) instead of counting as a positive one
+INTERACTION_WEIGHTS = {"viewed": 1.0, "clicked": 2.0, "booked": 4.0}
+DISLIKE_FACTOR = 0.25
+
+FACTORS = 32
+ITERATIONS = 10
+REGULARIZATION = 0.1
+ALPHA = 10.0          # confidence = 1 + ALPHA * weight
+
+# Interactions solved per batch; bounds the (nnz, f, f) outer-product buffer
+BATCH_NNZ = 8_192
+
+# Rows with more interactions than this (popular POIs) use one matrix product instead
+DENSE_ROW_NNZ = 64
+
+
+def interaction_weights(history):
+    """Per-row implicit weight from interaction_type and liked."""
+    types = history["interaction_type"].astype(str).str.strip().str.lower()
+    weights = types.map(INTERACTION_WEIGHTS).fillna(1.0).to_numpy(dtype=np.float32)
+    liked = pd.to_numeric(history["liked"], errors="coerce").fillna(0).to_numpy()
+    return np.where(liked > 0, weights, weights * DISLIKE_FACTOR).astype(np.float32)
+
+
+def interaction_matrix(history, user_ids=None, poi_ids=None):
+    """
+    users x POIs csr_matrix of summed weights (repeat interactions add up).
+    Returns (matrix, user_ids, poi_ids); the id arrays are sorted and give
+    the row/column order. Rows for ids outside given id lists are dropped.
+    """
+    from scipy import sparse
+
+    users = history["user_id"].to_numpy(dtype=np.int64)
+    pois = history["poi_id"].to_numpy(dtype=np.int64)
+    user_ids = np.unique(users) if user_ids is None else np.asarray(user_ids, dtype=np.int64)
+    poi_ids = np.unique(pois) if poi_ids is None else np.asarray(poi_ids, dtype=np.int64)
+
+    rows = np.searchsorted(user_ids, users)
+    cols = np.searchsorted(poi_ids, pois)
+    keep = (rows < len(user_ids)) & (cols < len(poi_ids))
+    keep[keep] &= (user_ids[rows[keep]] == users[keep]) & (poi_ids[cols[keep]] == pois[keep])
+
+    matrix = sparse.csr_matrix(
+        (interaction_weights(history)[keep], (rows[keep], cols[keep])),
+        shape=(len(user_ids), len(poi_ids)), dtype=np.float32,
+    )
+    matrix.sum_duplicates()
+    return matrix, user_ids, poi_ids
+
+
+def _solve_rows(matrix, fixed, gram, regularization, alpha, start, stop):
+    """
+    Implicit ALS step for rows start:stop of `matrix` against the `fixed`
+    factors (Hu, Koren & Volinsky): for each row u solve
+    (G + sum_i (c_ui - 1) y_i y_i^T + reg I) x_u = sum_i c_ui y_i.
+    """
+    factors = fixed.shape[1]
+    indptr = matrix.indptr[start:stop + 1]
+    lo = indptr[0]
+    counts = np.diff(indptr)
+    lhs = np.broadcast_to(gram + regularization * np.eye(factors, dtype=fixed.dtype),
+                          (stop - start, factors, factors)).copy()
+    rhs = np.zeros((stop - start, factors), dtype=fixed.dtype)
+
+    # Short rows: outer products summed per row with reduceat (rows are contiguous in csr)
+    is_short = (counts > 0) & (counts <= DENSE_ROW_NNZ)
+    short = np.flatnonzero(is_short)
+    if len(short):
+        take = np.flatnonzero(np.repeat(is_short, counts)) + lo
+        y = fixed[matrix.indices[take]]
+        confidence = 1.0 + alpha * matrix.data[take]
+        starts = np.concatenate([[0], np.cumsum(counts[short])[:-1]])
+        lhs[short] += np.add.reduceat((confidence - 1.0)[:, None, None] * (y[:, :, None] * y[:, None, :]),
+                                      starts, axis=0)
+        rhs[short] = np.add.reduceat(confidence[:, None] * y, starts, axis=0)
+
+    for r in np.flatnonzero(counts > DENSE_ROW_NNZ):
+        cols = matrix.indices[indptr[r]:indptr[r + 1]]
+        confidence = 1.0 + alpha * matrix.data[indptr[r]:indptr[r + 1]]
+        y = fixed[cols]
+        lhs[r] += (y * (confidence - 1.0)[:, None]).T @ y
+        rhs[r] = confidence @ y
+
+    return np.linalg.solve(lhs, rhs[:, :, None])[:, :, 0]
+
+
+def _batches(matrix, batch_nnz=BATCH_NNZ):
+    """Row ranges holding about `batch_nnz` stored entries each."""
+    bounds = [0]
+    targets = np.arange(batch_nnz, matrix.nnz, batch_nnz)
+    bounds.extend(np.searchsorted(matrix.indptr, targets, side="right") - 1)
+    bounds.append(matrix.shape[0])
+    bounds = np.unique(np.asarray(bounds))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _als_step(matrix, fixed, regularization, alpha, pool):
+    gram = fixed.T @ fixed
+    solved = np.zeros((matrix.shape[0], fixed.shape[1]), dtype=fixed.dtype)
+
+    def work(bounds):
+        start, stop = bounds
+        if stop > start:
+            solved[start:stop] = _solve_rows(matrix, fixed, gram, regularization, alpha, start, stop)
+
+    list(pool.map(work, _batches(matrix)))
+    return solved
+
+
+class CollaborativeModel:
+    """
+    Implicit-feedback matrix factorisation over the user x POI matrix.
+    user_ids / poi_ids are sorted and index the factor rows.
+    """
+
+    def __init__(self, user_ids, poi_ids, user_factors, item_factors,
+                 regularization=REGULARIZATION, alpha=ALPHA, history_rows=0, version=1, trained_at=0.0,
+                 history_file=None):
+        self.user_ids = user_ids
+        self.poi_ids = poi_ids
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.history_rows = history_rows
+        self.version = version
+        # Set by train_cf_model and kept by fold-ins (which leave the item factors alone)
+        self.trained_at = trained_at
+        # History the model was trained on (None: saved before it was recorded, i.e. HISTORY_FILE)
+        self.history_file = history_file
+        self._gram = None
+
+    def trained_on(self, history_file):
+        return os.path.abspath(history_file) == os.path.abspath(self.history_file or HISTORY_FILE)
+
+    @property
+    def gram(self):
+        if self._gram is None:
+            self._gram = self.item_factors.T @ self.item_factors
+        return self._gram
+
+    def user_vector(self, user_id):
+        row = np.searchsorted(self.user_ids, user_id)
+        if row < len(self.user_ids) and self.user_ids[row] == user_id:
+            return self.user_factors[row]
+        return None
+
+    def fold_in(self, poi_ids, weights):
+        """Factor vector for a user with these interactions, item factors held fixed."""
+        from scipy import sparse
+
+        cols = np.searchsorted(self.poi_ids, np.asarray(poi_ids, dtype=np.int64))
+        cols = np.minimum(cols, len(self.poi_ids) - 1)
+        known = self.poi_ids[cols] == np.asarray(poi_ids, dtype=np.int64)
+        row = sparse.csr_matrix((np.asarray(weights, dtype=np.float32)[known], (np.zeros(known.sum(), dtype=int),
+                                 cols[known])), shape=(1, len(self.poi_ids)))
+        row.sum_duplicates()
+        if row.nnz == 0:
+            return np.zeros(self.item_factors.shape[1], dtype=self.item_factors.dtype)
+        return _solve_rows(row, self.item_factors, self.gram, self.regularization, self.alpha, 0, 1)[0]
+
+    def scores(self, user_vector):
+        """Predicted preference for every POI (aligned with poi_ids)."""
+        return self.item_factors @ user_vector
+
+    def recommend(self, user_vector, top_n=10, exclude=()):
+        scores = self.scores(user_vector)
+        if len(exclude):
+            scores = np.where(np.isin(self.poi_ids, np.asarray(exclude, dtype=np.int64)), -np.inf, scores)
+        top_n = min(top_n, len(scores))
+        best = np.argpartition(-scores, top_n - 1)[:top_n] if top_n else np.empty(0, dtype=int)
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return pd.Series(scores[best], index=pd.Index(self.poi_ids[best], name="poi_id"), name="cf_score")
+
+    def save(self, path=MODEL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp_path, user_ids=self.user_ids, poi_ids=self.poi_ids, user_factors=self.user_factors,
+                 item_factors=self.item_factors,
+                 params=np.array([self.regularization, self.alpha, self.history_rows, self.version,
+                                  self.trained_at]),
+                 history_file=np.array(self.history_file or ""))
+        os.replace(tmp_path, path)
+        _models.pop(os.path.abspath(path), None)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with np.load(path) as data:
+            regularization, alpha, history_rows, version = data["params"][:4]
+            trained_at = float(data["params"][4]) if len(data["params"]) > 4 else 0.0
+            history_file = str(data["history_file"]) if "history_file" in data.files else ""
+            return cls(data["user_ids"], data["poi_ids"], data["user_factors"], data["item_factors"],
+                       float(regularization), float(alpha), int(history_rows), int(version), trained_at,
+                       history_file or None)
+
+
+def train_als(matrix, factors=FACTORS, iterations=ITERATIONS, regularization=REGULARIZATION,
+              alpha=ALPHA, workers=None, seed=0):
+    """
+    Alternating least squares on a users x items csr matrix. Each half-step
+    solves independent row batches on a thread pool (numpy's solve releases
+    the GIL), so all cores are used. Returns (user_factors, item_factors).
+    """
+    rng = np.random.default_rng(seed)
+    item_factors = (rng.standard_normal((matrix.shape[1], factors)) * 0.01).astype(np.float32)
+    user_factors = np.zeros((matrix.shape[0], factors), dtype=np.float32)
+    transposed = matrix.T.tocsr()
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for _ in range(iterations):
+            user_factors = _als_step(matrix, item_factors, regularization, alpha, pool)
+            item_factors = _als_step(transposed, user_factors, regularization, alpha, pool)
+    return user_factors, item_factors
+
+
+def train_cf_model(history_file=HISTORY_FILE, factors=FACTORS, iterations=ITERATIONS, workers=None, path=MODEL_PATH):
+    history = load_history(history_file)
+    matrix, user_ids, poi_ids = interaction_matrix(history)
+    user_factors, item_factors = train_als(matrix, factors, iterations, workers=workers)
+    model = CollaborativeModel(user_ids, poi_ids, user_factors, item_factors, history_rows=len(history),
+                               trained_at=time.time(), history_file=os.path.abspath(history_file))
+    model.save(path)
+    print(f"Collaborative model trained: {len(user_ids)} users x {len(poi_ids)} POIs, {factors} factors.")
+    return model
+
+
+def fold_in_interactions(model, history, user_ids):
+    """
+    Re-solves the vectors of `user_ids` from their rows in `history` with
+    the item factors fixed; unseen users are appended. No item is retrained,
+    so POIs absent from the model still need train_cf_model.
+    """
+    user_ids = np.unique(np.asarray(user_ids, dtype=np.int64))
+    rows = history[history["user_id"].isin(user_ids)]
+    matrix, _, _ = interaction_matrix(rows, user_ids, model.poi_ids)
+    vectors = _solve_rows(matrix, model.item_factors, model.gram, model.regularization, model.alpha,
+                          0, len(user_ids)) if len(user_ids) else np.empty((0, model.item_factors.shape[1]))
+
+    all_ids = np.union1d(model.user_ids, user_ids)
+    factors = np.zeros((len(all_ids), model.item_factors.shape[1]), dtype=model.item_factors.dtype)
+    factors[np.searchsorted(all_ids, model.user_ids)] = model.user_factors
+    factors[np.searchsorted(all_ids, user_ids)] = vectors
+    return CollaborativeModel(all_ids, model.poi_ids, factors, model.item_factors, model.regularization,
+                              model.alpha, model.history_rows, model.version + 1, model.trained_at,
+                              model.history_file)
+
+
+def update_cf_model(history_file=HISTORY_FILE, path=MODEL_PATH):
+    """Folds in users with history rows logged since the model was trained/updated."""
+    model = CollaborativeModel.load(path)
+    history = load_history(history_file)
+    new_rows = history.iloc[model.history_rows:]
+    if new_rows.empty:
+        return model
+    updated = fold_in_interactions(model, history, new_rows["user_id"].unique())
+    updated.history_rows = len(history)
+    updated.save(path)
+    return updated
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_cf_model(path=MODEL_PATH):
+    """Process-wide model for `path`, reloaded when the file changes; None if not trained."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    key = os.path.abspath(path)
+    cached = _models.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _models_lock:
+        model = CollaborativeModel.load(path)
+        _models[key] = (mtime, model)
+    return model
+
+
+def cf_scores_for_user(user_id, history_file=HISTORY_FILE, path=MODEL_PATH):
+    """
+    CF score per POI for one user as a Series indexed by poi_id, or None
+    without a model trained on `history_file`. Users missing from the model
+    are folded in from their history on the fly.
+    """
+    model = get_cf_model(path)
+    if model is None or not model.trained_on(history_file):
+        return None
+    vector = model.user_vector(user_id)
+    if vector is None:
+        history = load_history(history_file)
+        rows = history[history["user_id"] == user_id]
+        if rows.empty:
+            return None
+        vector = model.fold_in(rows["poi_id"].to_numpy(), interaction_weights(rows))
+    return pd.Series(model.scores(vector), index=pd.Index(model.poi_ids, name="poi_id"), name="cf_score")
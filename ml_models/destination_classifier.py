@@ -1,16 +1,25 @@
 import pandas as pd
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.preprocessing import LabelEncoder
-from joblib import dump, load
+import numpy as np
 import os
+from ml_models.poi_catalog import get_catalog
+from ml_models.model_registry import registry, atomic_dump_many
 
 MODEL_PATH = "models/destination_classifier.pkl"
 ENCODER_PATH = "models/destination_label_encoders.pkl"
+LOOKUP_PATH = "models/destination_lookup.pkl"
+
+FEATURE_COLS = ["climate", "location", "budget"]
+
+# Largest climate x location x budget grid compiled into a lookup table
+MAX_LOOKUP_SIZE = 5_000_000
 
 def load_data(poi_file):
-    return pd.read_csv(poi_file)
+    # preprocess_data strips columns in place, so work on a private copy
+    return get_catalog(poi_file).frame().copy()
 
 def preprocess_data(data):
+    from sklearn.preprocessing import LabelEncoder
+
     encoders = {}
     X = data[["climate", "location", "budget"]].copy()  #True copy to accommodate SettingWithCopyWarning
     y = data["category"]
@@ -31,16 +40,31 @@ def preprocess_data(data):
     return X, y, encoders
 
 
-def train_model(poi_file="data/POIs_draft1.csv"):
+def build_lookup_table(model, encoders):
+    """
+    Predicts every (climate, location, budget) code combination in one pass.
+    The result is indexed as table[climate_code, location_code, budget_code].
+    """
+    shape = tuple(len(encoders[col].classes_) for col in FEATURE_COLS)
+    grid = np.indices(shape).reshape(len(shape), -1).T
+    predictions = model.predict(pd.DataFrame(grid, columns=FEATURE_COLS))
+    return predictions.astype(np.min_scalar_type(len(encoders["category"].classes_))).reshape(shape)
+
+
+def train_model(poi_file="data/POIs_draft1.csv", build_lookup=True):
+    from sklearn.tree import DecisionTreeClassifier
+
     data = load_data(poi_file)
     X, y, encoders = preprocess_data(data)
 
     model = DecisionTreeClassifier()
     model.fit(X, y)
 
-    os.makedirs("models", exist_ok=True)
-    dump(model, MODEL_PATH)
-    dump(encoders, ENCODER_PATH)
+    # Written together; without a new table the previous one is dropped,
+    # as it would disagree with the new model
+    lookup_size = np.prod([len(encoders[col].classes_) for col in FEATURE_COLS])
+    lookup = build_lookup_table(model, encoders) if build_lookup and lookup_size <= MAX_LOOKUP_SIZE else None
+    atomic_dump_many({MODEL_PATH: model, ENCODER_PATH: encoders, LOOKUP_PATH: lookup})
 
     print("Destination classifier trained and saved.")
     print("\nTrained encoder classes:")
@@ -48,36 +72,67 @@ def train_model(poi_file="data/POIs_draft1.csv"):
         print(f"{col}: {list(le.classes_)}")
 
 
-def predict_category(climate, location, budget):
-    from sklearn.exceptions import NotFittedError
-    import numpy as np
+def _encode_column(le, values, col):
+    # LabelEncoder codes are positions in the sorted classes_ array
+    classes = le.classes_.astype(str)
+    values = np.asarray(values).astype(str)
+    positions = np.searchsorted(classes, values).clip(max=len(classes) - 1)
+    seen = classes[positions] == values
 
-    model = load(MODEL_PATH)
-    encoders = load(ENCODER_PATH)
+    for value in pd.unique(values[~seen]):
+        print(f"Unseen label '{value}' for column '{col}'. Using fallback: most frequent class.")
+    # Use most frequent class as fallback
+    return np.where(seen, positions, 0)
 
-    input_df = pd.DataFrame([{
-        "climate": climate,
-        "location": location,
-        "budget": budget
-    }])
 
-    for col in input_df.columns:
-        le = encoders[col]
-        value = input_df[col].iloc[0]
+def _load_lookup_table(encoders):
+    try:
+        table = registry.get(LOOKUP_PATH)
+    except FileNotFoundError:
+        return None
+    expected = tuple(len(encoders[col].classes_) for col in FEATURE_COLS)
+    return table if table.shape == expected else None
+
+
+def predict_category_batch(requests):
+    """
+    Vectorised predict_category for many requests at once.
+    `requests` is a DataFrame (or list of dicts / tuples) with climate,
+    location and budget; returns an array of predicted categories.
+    """
+    from sklearn.exceptions import NotFittedError
 
-        if value not in le.classes_:
-            print(f"Unseen label '{value}' for column '{col}'. Using fallback: most frequent class.")
-            # Use most frequent class as fallback
-            most_common = le.classes_[0]
-            input_df[col] = le.transform([most_common])
-        else:
-            input_df[col] = le.transform([value])
+    requests = pd.DataFrame(requests, columns=FEATURE_COLS)
+    encoders = registry.get(ENCODER_PATH)
+    if requests.empty:
+        return encoders["category"].classes_[:0]
 
-    try:
-        prediction = model.predict(input_df)[0]
-    except NotFittedError:
-        raise ValueError("Model has not been trained.")
+    codes = np.column_stack([
+        _encode_column(encoders[col], requests[col].to_numpy(), col) for col in FEATURE_COLS
+    ])
 
-    category = encoders["category"].inverse_transform([prediction])[0]
-    return category
+    table = _load_lookup_table(encoders)
+    if table is not None:
+        predictions = table[codes[:, 0], codes[:, 1], codes[:, 2]]
+    else:
+        model = registry.get(MODEL_PATH)
+        try:
+            predictions = model.predict(pd.DataFrame(codes, columns=FEATURE_COLS))
+        except NotFittedError:
+            raise ValueError("Model has not been trained.")
 
+    return encoders["category"].classes_[predictions]
+
+
+def predict_category(climate, location, budget):
+    encoders = registry.get(ENCODER_PATH)
+    table = _load_lookup_table(encoders)
+    if table is None:
+        return predict_category_batch([(climate, location, budget)])[0]
+
+    # Compiled table: a single prediction is one array lookup
+    codes = tuple(
+        _encode_column(encoders[col], [value], col)[0]
+        for col, value in zip(FEATURE_COLS, (climate, location, budget))
+    )
+    return encoders["category"].classes_[table[codes]]
@@ -0,0 +1,190 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Average door-to-door urban travel speed used to turn km into minutes
+TRAVEL_SPEED_KMH = 20.0
+
+COORD_COLS = ["latitude", "longitude"]
+
+
+def has_coordinates(pois):
+    return all(col in pois.columns for col in COORD_COLS) and pois[COORD_COLS].notna().all().all()
+
+
+def project_km(lat, lon, ref_lat=None):
+    """
+    Equirectangular projection to planar km around `ref_lat`. Accurate to
+    well under 1% at city scale, and lets the KD-tree use Euclidean distance.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if ref_lat is None:
+        ref_lat = float(lat.mean()) if len(lat) else 0.0
+    x = np.radians(lon) * np.cos(np.radians(ref_lat)) * EARTH_RADIUS_KM
+    y = np.radians(lat) * EARTH_RADIUS_KM
+    return np.column_stack([x, y])
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def neighbourhoods(points, n_clusters, weights=None, iterations=25, seed=0):
+    """
+    Weighted k-means over projected points. Each Lloyd step assigns points
+    to centroids with a KD-tree over the k centroids (O(n log k)), so no
+    n x n distance matrix is ever built. Returns (labels, centroids).
+    """
+    from scipy.spatial import cKDTree
+
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    k = max(1, min(n_clusters, n))
+    weights = np.ones(n) if weights is None else np.clip(np.asarray(weights, dtype=float), 1e-9, None)
+
+    # k-means++ seeding, weighted towards high-scoring POIs
+    rng = np.random.default_rng(seed)
+    centroids = [points[np.argmax(weights)]]
+    nearest = np.full(n, np.inf)
+    for _ in range(1, k):
+        nearest = np.minimum(nearest, ((points - centroids[-1]) ** 2).sum(axis=1))
+        probs = nearest * weights
+        if probs.sum() <= 0:
+            break
+        centroids.append(points[rng.choice(n, p=probs / probs.sum())])
+    centroids = np.array(centroids)
+
+    labels = np.zeros(n, dtype=int)
+    for _ in range(iterations):
+        _, labels = cKDTree(centroids).query(points)
+        totals = np.bincount(labels, weights=weights, minlength=len(centroids))
+        moved = np.column_stack([
+            np.bincount(labels, weights=weights * points[:, dim], minlength=len(centroids)) for dim in range(2)
+        ])
+        occupied = totals > 0
+        updated = centroids.copy()
+        updated[occupied] = moved[occupied] / totals[occupied, None]
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+    return labels, centroids
+
+
+class TravelTimeCache:
+    """
+    Per-city cache of POI-to-POI travel minutes. Only pairs that are
+    actually requested (stops within one day) are computed, so memory grows
+    with itineraries served rather than with the square of the city size.
+    """
+
+    def __init__(self, max_pairs_per_city=100_000, speed_kmh=TRAVEL_SPEED_KMH):
+        self.max_pairs_per_city = max_pairs_per_city
+        self.speed_kmh = speed_kmh
+        self._cities = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def matrix(self, city, poi_ids, lat, lon):
+        """Travel minutes between the given POIs, as a len(poi_ids)^2 matrix."""
+        poi_ids = [int(p) for p in poi_ids]
+        size = len(poi_ids)
+        result = np.zeros((size, size))
+        missing = []
+        with self._lock:
+            pairs = self._cities.setdefault(city, OrderedDict())
+            for i in range(size):
+                for j in range(i + 1, size):
+                    key = (min(poi_ids[i], poi_ids[j]), max(poi_ids[i], poi_ids[j]))
+                    if key in pairs:
+                        pairs.move_to_end(key)
+                        result[i, j] = result[j, i] = pairs[key]
+                        self.hits += 1
+                    else:
+                        missing.append((i, j, key))
+                        self.misses += 1
+
+        if missing:
+            rows, cols, keys = zip(*missing)
+            km = haversine_km(np.take(lat, rows), np.take(lon, rows), np.take(lat, cols), np.take(lon, cols))
+            minutes = km / self.speed_kmh * 60.0
+            with self._lock:
+                pairs = self._cities[city]
+                for i, j, key, value in zip(rows, cols, keys, minutes):
+                    result[i, j] = result[j, i] = value
+                    pairs[key] = value
+                while len(pairs) > self.max_pairs_per_city:
+                    pairs.popitem(last=False)
+        return result
+
+
+# Shared travel-time cache used by optimize_itinerary
+travel_times = TravelTimeCache()
+
+
+def order_route(minutes):
+    """Visiting order for one day: nearest neighbour, then 2-opt until no gain."""
+    size = len(minutes)
+    if size <= 2:
+        return list(range(size))
+
+    # Start from the stop with the smallest total distance to the others
+    route = [int(np.argmin(minutes.sum(axis=1)))]
+    remaining = set(range(size)) - set(route)
+    while remaining:
+        last = route[-1]
+        nxt = min(remaining, key=lambda j: minutes[last, j])
+        route.append(nxt)
+        remaining.remove(nxt)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, size - 1):
+            for j in range(i + 1, size):
+                before = minutes[route[i - 1], route[i]] + (minutes[route[j], route[j + 1]] if j + 1 < size else 0)
+                after = minutes[route[i - 1], route[j]] + (minutes[route[i], route[j + 1]] if j + 1 < size else 0)
+                if after < before - 1e-9:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+    return route
+
+
+def assign_days_by_area(points, centroids, durations, categories, slots_per_day, hours_per_day, enforce_diversity):
+    """
+    Re-groups the selected POIs so each day stays in one neighbourhood:
+    POIs are placed, largest regret first, on the feasible day whose
+    centroid is closest. Returns day indices, or None if some POI fits no day.
+    """
+    days = len(centroids)
+    cost = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+    assignment = np.full(len(points), -1)
+    count = np.zeros(days, dtype=int)
+    hours = np.zeros(days)
+    cats = [set() for _ in range(days)]
+
+    def feasible(i, d):
+        return (count[d] < slots_per_day
+                and hours[d] + durations[i] <= hours_per_day
+                and not (enforce_diversity and categories[i] in cats[d]))
+
+    for _ in range(len(points)):
+        best = None
+        for i in np.flatnonzero(assignment < 0):
+            options = sorted((cost[i, d], d) for d in range(days) if feasible(i, d))
+            if not options:
+                return None
+            regret = options[1][0] - options[0][0] if len(options) > 1 else np.inf
+            if best is None or regret > best[0]:
+                best = (regret, i, options[0][1])
+        _, i, d = best
+        assignment[i] = d
+        count[d] += 1
+        hours[d] += durations[i]
+        cats[d].add(categories[i])
+    return assignment
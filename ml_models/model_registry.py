@@ -0,0 +1,326 @@
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from telemetry.metrics import metrics
+from telemetry.tracing import span
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+# A models directory may hold published versions (see training.py):
+# versions/<version>/ with a manifest, and CURRENT naming the live one
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+MANIFEST_FILE = "manifest.json"
+
+# Older versions kept on disk (for rollback) besides the published one
+KEEP_VERSIONS = 3
+
+_publish_lock = threading.Lock()
+
+
+def _file_version(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _tmp_path(path):
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def atomic_write_text(text, path):
+    tmp_path = _tmp_path(path)
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_manifest(version_dir):
+    with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def write_manifest(version_dir, manifest):
+    atomic_write_text(json.dumps(manifest, indent=2), os.path.join(version_dir, MANIFEST_FILE))
+
+
+@contextmanager
+def publish_lock(directory):
+    """Serialises publishing new versions of `directory`, across threads and processes."""
+    with _publish_lock, open(os.path.join(directory, ".publish.lock"), "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def new_version(versions_dir):
+    # Microseconds keep names unique (and sortable) even after pruning
+    now = time.time()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f".{int(now % 1 * 1e6):06d}"
+    version, n = stamp, 1
+    while os.path.exists(os.path.join(versions_dir, version)):
+        n += 1
+        version = f"{stamp}-{n}"
+    return version
+
+
+def prune_versions(directory, keep=KEEP_VERSIONS):
+    """Removes all but the published version and the `keep` newest others."""
+    versions_dir = os.path.join(directory, VERSIONS_DIR)
+    with open(os.path.join(directory, CURRENT_FILE)) as f:
+        current = f.read().strip()
+    older = sorted((v for v in os.listdir(versions_dir) if not v.startswith(".") and v != current),
+                   key=lambda v: os.path.getmtime(os.path.join(versions_dir, v)))
+    for version in older[:max(0, len(older) - keep)]:
+        shutil.rmtree(os.path.join(versions_dir, version), ignore_errors=True)
+
+
+def _link_or_copy(source, target):
+    # Published files are never rewritten, so a new version can share them
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _publish_update(directory, updates, keep=KEEP_VERSIONS):
+    """
+    Publishes a new version of `directory`: the published one with
+    `updates` ({artifact name: obj}) written as their own files and every
+    other file shared. A None obj stays listed without a file, as in
+    training.publish. The version is staged in a hidden directory and
+    renamed into place before CURRENT is switched, so readers see all of
+    the updates or none; published versions are never modified.
+    """
+    from joblib import dump
+
+    versions_dir = os.path.join(directory, VERSIONS_DIR)
+    with publish_lock(directory):
+        base = registry.release(directory, fresh=True)
+        base_manifest = read_manifest(base["dir"])
+        version = new_version(versions_dir)
+        staging = os.path.join(versions_dir, f".{version}.{os.getpid()}.tmp")
+        os.makedirs(staging)
+        try:
+            artifacts = dict(base_manifest["artifacts"])
+            for name, obj in updates.items():
+                mmap = artifacts.get(name, {}).get("mmap", False)
+                if obj is not None:
+                    dump(obj, os.path.join(staging, name))
+                artifacts[name] = {"file": name, "bytes": None if obj is None else
+                                   os.path.getsize(os.path.join(staging, name)), "mmap": mmap}
+            for artifact in artifacts.values():
+                source = os.path.join(base["dir"], artifact["file"])
+                target = os.path.join(staging, artifact["file"])
+                if artifact["bytes"] is not None and not os.path.exists(target):
+                    _link_or_copy(source, target)
+
+            manifest = dict(base_manifest, version=version, created_at=time.time(),
+                            base_version=os.path.basename(base["dir"]), artifacts=artifacts)
+            write_manifest(staging, manifest)
+            os.rename(staging, os.path.join(versions_dir, version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        atomic_write_text(version, os.path.join(directory, CURRENT_FILE))
+        registry.invalidate()
+        prune_versions(directory, keep)
+    return manifest
+
+
+def atomic_dump_many(objs):
+    """
+    Writes {path: obj} so readers (and the registry's hot-swap check) see
+    all of them or none of them, never a half-written file. A None obj
+    removes the artifact. The shared registry drops its cached copies so
+    this process swaps at once.
+
+    Paths in a directory with published versions (see training.py) are
+    published together as a new version derived from the live one (e.g. a
+    partial_fit update of the live model); other paths are pickled next to
+    themselves and renamed into place.
+    """
+    from joblib import dump
+
+    by_directory = {}
+    for path, obj in objs.items():
+        directory, name = os.path.split(os.path.abspath(path))
+        by_directory.setdefault(directory, {})[name] = obj
+
+    for directory, updates in by_directory.items():
+        if registry.release(directory, fresh=True)["token"] is not None:
+            _publish_update(directory, updates)
+            continue
+        os.makedirs(directory, exist_ok=True)
+        for name, obj in updates.items():
+            target = os.path.join(directory, name)
+            if obj is None:
+                if os.path.exists(target):
+                    os.remove(target)
+                continue
+            tmp_path = _tmp_path(target)
+            try:
+                dump(obj, tmp_path)
+                os.replace(tmp_path, target)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    for path in objs:
+        registry.invalidate(path)
+
+
+def atomic_dump(obj, path):
+    """Writes one artifact (see atomic_dump_many)."""
+    atomic_dump_many({path: obj})
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of unpickled models and encoders.
+
+    Each artifact is loaded once and kept in memory. Its (mtime, size) is
+    re-checked at most every `check_interval` seconds, and a changed file is
+    reloaded, so retraining hot-swaps the model without a restart.
+
+    Paths are the legacy ones (models/<name>.pkl). When their directory has
+    a CURRENT pointer, a name listed in that version's manifest is loaded
+    from the version's file instead, with numpy arrays memory-mapped if the
+    manifest says so. Once a switch of CURRENT is seen, every artifact of
+    that directory reloads from the new version.
+    """
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._releases = {}
+        self._entries = {}
+        self._stats = {"hits": 0, "misses": 0, "version_checks": 0, "loads": 0, "load_seconds": 0.0}
+        self._load_times = {}
+
+    def release(self, directory, fresh=False):
+        """
+        The published version of `directory`: {"token", "dir", "artifacts"}
+        from its CURRENT pointer and manifest (no artifacts without one).
+        Re-read at most every `check_interval` seconds unless `fresh`.
+        """
+        now = time.monotonic()
+        cached = self._releases.get(directory)
+        if not fresh and cached is not None and now - cached["checked_at"] < self.check_interval:
+            return cached
+
+        pointer = os.path.join(directory, CURRENT_FILE)
+        try:
+            with open(pointer) as f:
+                version_dir = os.path.join(directory, VERSIONS_DIR, f.read().strip())
+            token = (version_dir, _file_version(os.path.join(version_dir, MANIFEST_FILE)))
+        except FileNotFoundError:
+            version_dir, token = None, None
+
+        if cached is not None and cached["token"] == token:
+            release = dict(cached, checked_at=now)
+        else:
+            artifacts = read_manifest(version_dir)["artifacts"] if token is not None else {}
+            release = {"token": token, "dir": version_dir, "artifacts": artifacts, "checked_at": now}
+        self._releases[directory] = release
+        return release
+
+    def resolve(self, path, fresh=False):
+        """The file `path` loads from (see the class docstring)."""
+        directory, name = os.path.split(os.path.abspath(path))
+        release = self.release(directory, fresh)
+        artifact = release["artifacts"].get(name)
+        return path if artifact is None else os.path.join(release["dir"], artifact["file"])
+
+    def get(self, path):
+        key = os.path.abspath(path)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is not None and now - entry["checked_at"] < self.check_interval:
+            # A new CURRENT, once seen for any artifact, applies to all of them
+            if entry["release"] == self.release(os.path.dirname(key))["token"]:
+                with self._stats_lock:
+                    self._stats["hits"] += 1
+                return entry["obj"]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            directory, name = os.path.split(key)
+            release = self.release(directory)
+            artifact = release["artifacts"].get(name)
+            source = key if artifact is None else os.path.join(release["dir"], artifact["file"])
+            version = (source, _file_version(source))
+
+            if entry is not None and entry["version"] == version:
+                entry["checked_at"] = now
+                entry["release"] = release["token"]
+                with self._stats_lock:
+                    self._stats["version_checks"] += 1
+                    self._stats["hits"] += 1
+                return entry["obj"]
+
+            from joblib import load
+            with span("model_load", path=path):
+                start = time.perf_counter()
+                obj = load(source, mmap_mode="r" if artifact is not None and artifact.get("mmap") else None)
+                elapsed = time.perf_counter() - start
+            metrics.observe("model_load_seconds", elapsed, path=path)
+            self._entries[key] = {"obj": obj, "version": version, "release": release["token"], "checked_at": now}
+
+        with self._stats_lock:
+            self._stats["version_checks"] += 1
+            self._stats["misses"] += 1
+            self._stats["loads"] += 1
+            self._stats["load_seconds"] += elapsed
+            self._load_times[path] = elapsed
+        return obj
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._releases.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats["load_times"] = dict(self._load_times)
+            stats["cached"] = len(self._entries)
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            for name in self._stats:
+                self._stats[name] = 0.0 if name == "load_seconds" else 0
+            self._load_times.clear()
+
+
+# Shared registry used by the classifier and the preference scorer
+registry = ModelRegistry()
+
+
+def _registry_metrics():
+    stats = registry.stats()
+    return [(f"model_registry_{name}", stats[name], {})
+            for name in ["hits", "misses", "version_checks", "loads", "load_seconds", "cached"]]
+
+
+metrics.register_collector(_registry_metrics)
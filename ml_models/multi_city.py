@@ -0,0 +1,217 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from ml_models.geo import has_coordinates, haversine_km, order_route
+from ml_models.optimizer import optimize_itinerary, HOURS_PER_DAY, TIME_LIMIT
+
+# Days spent travelling between two consecutive cities
+TRANSFER_DAYS = 1
+
+# Transfer estimates by distance: (up to km, mode, average speed in km/h,
+# fixed door-to-door overhead in hours, e.g. getting to and through an airport)
+TRANSFER_MODES = [
+    (300.0, "car", 80.0, 0.0),
+    (1000.0, "train", 160.0, 0.5),
+    (float("inf"), "plane", 750.0, 3.0),
+]
+
+# Cities kept after ranking, however many the country has
+MAX_CITIES = 4
+
+TRANSFER_CATEGORY = "transfer"
+
+# Processes in the shared city pool (None: one per CPU); sized once, at first use
+POOL_WORKERS = None
+
+
+def _day_values(pois, trip_days, slots_per_day, allowed, hours_per_day):
+    """
+    Per city, the value of its 1st, 2nd, ... day: the next slots_per_day best
+    scores among POIs that pass the budget and fit in a day. An estimate
+    (it ignores diversity and hour budgets), only used to allocate days.
+    """
+    usable = pois[pois["budget"].isin(allowed) & (pois["duration_hours"] <= hours_per_day)]
+    values = {}
+    for city, group in usable.groupby("location", observed=True, sort=False):
+        scores = np.sort(group["score"].to_numpy(dtype=float))[::-1][:trip_days * slots_per_day]
+        padded = np.zeros(trip_days * slots_per_day)
+        padded[:len(scores)] = scores
+        values[city] = padded.reshape(trip_days, slots_per_day).sum(axis=1)
+    return values
+
+
+def allocate_days(values, trip_days, transfer_days=TRANSFER_DAYS, max_cities=MAX_CITIES, min_days=1):
+    """
+    Picks cities and their day counts: for each city count k, the k cities
+    with the best first day share the days left after transfers, one day at
+    a time to the largest marginal value. Returns {city: days} for the k
+    with the highest total (so a city is only added if it beats the lost day).
+    """
+    ranked = sorted(values, key=lambda city: -values[city][0])[:max_cities]
+    best, best_total = {}, -1.0
+    for k in range(1, len(ranked) + 1):
+        free = trip_days - transfer_days * (k - 1)
+        if free < k * min_days:
+            break
+        days = {city: min_days for city in ranked[:k]}
+        total = sum(values[city][:min_days].sum() for city in days)
+        for _ in range(free - k * min_days):
+            city = max(days, key=lambda c: values[c][days[c]] if days[c] < len(values[c]) else 0.0)
+            total += values[city][days[city]] if days[city] < len(values[city]) else 0.0
+            days[city] += 1
+        if total > best_total + 1e-12:
+            best, best_total = days, total
+    return best
+
+
+def _centroids(pois, cities):
+    grouped = pois.groupby("location", observed=True)[["latitude", "longitude"]].mean()
+    return grouped.loc[cities].to_numpy(dtype=float)
+
+
+def order_cities(pois, cities):
+    """Visiting order: a short route between city centroids, or as given without coordinates."""
+    if len(cities) <= 2 or not has_coordinates(pois):
+        return list(cities)
+    centroids = _centroids(pois, cities)
+    km = haversine_km(centroids[:, None, 0], centroids[:, None, 1], centroids[None, :, 0], centroids[None, :, 1])
+    return [cities[i] for i in order_route(km)]
+
+
+def _optimize_city(pois, kwargs):
+    start = time.perf_counter()
+    itinerary = optimize_itinerary(pois, **kwargs)
+    return itinerary, dict(itinerary.attrs.get("solution", {})), time.perf_counter() - start
+
+
+def process_context():
+    """forkserver where available: safe to start pools from threaded callers such as the HTTP service."""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Process pool shared by plan_multi_city calls, started once with
+    POOL_WORKERS processes (each worker imports pandas) and never replaced,
+    so callers holding it can always submit to it.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS or os.cpu_count() or 1,
+                                        mp_context=process_context())
+        return _pool
+
+
+def transfer_estimate(km):
+    """(mode, hours) of the likeliest way to cover `km` between two cities (see TRANSFER_MODES)."""
+    for max_km, mode, speed_kmh, overhead_hours in TRANSFER_MODES:
+        if km <= max_km:
+            return mode, overhead_hours + km / speed_kmh
+
+
+def _transfer_row(pois, origin, destination, day, columns):
+    row = {col: None for col in columns}
+    row.update(day=day, time_of_day="Transfer", location=destination, category=TRANSFER_CATEGORY,
+               name=f"Travel from {origin} to {destination}", score=0.0)
+    if has_coordinates(pois):
+        (lat1, lon1), (lat2, lon2) = _centroids(pois, [origin, destination])
+        mode, hours = transfer_estimate(float(haversine_km(lat1, lon1, lat2, lon2)))
+        row["name"] += f" (about {hours:.1f} h by {mode}, estimated)"
+        row["duration_hours"] = round(hours, 1)
+        if "travel_minutes" in columns:
+            row["travel_minutes"] = round(hours * 60, 1)
+    return row
+
+
+def plan_multi_city(
+    recommended_pois: pd.DataFrame,
+    trip_days: int = 3,
+    slots_per_day: int = 2,
+    max_budget: str = "medium",
+    enforce_diversity: bool = True,
+    hours_per_day: float = HOURS_PER_DAY,
+    solver: str = "auto",
+    time_limit: float = TIME_LIMIT,
+    geo_routing: bool = True,
+    transfer_days: int = TRANSFER_DAYS,
+    max_cities: int = MAX_CITIES,
+    workers: int = None
+) -> pd.DataFrame:
+    """
+    optimize_itinerary for candidates spread over several cities. Days are
+    split across the most rewarding cities (see allocate_days), every city
+    is optimised on its own in a process pool, so the solve takes about as
+    long as the slowest city, and the results are merged in visiting order
+    with a "Transfer" row for each travel day between cities. workers=1
+    optimises the cities in this process instead.
+    """
+    if "location" not in recommended_pois.columns:
+        raise ValueError("Missing required column in input: 'location'")
+    budget_levels = ["low", "medium", "high"]
+    if max_budget not in budget_levels:
+        raise ValueError(f"Invalid budget: {max_budget}. Choose from {budget_levels}")
+
+    start = time.perf_counter()
+    allowed = budget_levels[:budget_levels.index(max_budget) + 1]
+    values = _day_values(recommended_pois, trip_days, slots_per_day, allowed, hours_per_day)
+    days = allocate_days(values, trip_days, transfer_days, max_cities)
+    if not days:
+        print("After budget filtering, no Points of Interests remain.")
+        return pd.DataFrame()
+
+    cities = order_cities(recommended_pois, list(days))
+    kwargs = dict(slots_per_day=slots_per_day, max_budget=max_budget, enforce_diversity=enforce_diversity,
+                  hours_per_day=hours_per_day, solver=solver, time_limit=time_limit, geo_routing=geo_routing)
+    tasks = [(recommended_pois[recommended_pois["location"] == city], dict(kwargs, trip_days=days[city]))
+             for city in cities]
+
+    if len(tasks) == 1 or workers == 1:
+        results = [_optimize_city(pois, city_kwargs) for pois, city_kwargs in tasks]
+    else:
+        results = list(get_pool().map(_optimize_city, *zip(*tasks)))
+
+    parts, offset, previous = [], 0, None
+    columns = next((list(itinerary.columns) for itinerary, _, _ in results if not itinerary.empty), None)
+    if columns is None:
+        print("No Points of Interests selected under current constraints.")
+        return pd.DataFrame()
+    for city, (itinerary, _, _) in zip(cities, results):
+        if previous is not None:
+            transfers = [_transfer_row(recommended_pois, previous, city, offset + t + 1, columns)
+                         for t in range(transfer_days)]
+            parts.append(pd.DataFrame(transfers, columns=columns).dropna(axis=1, how="all"))
+            offset += transfer_days
+        if not itinerary.empty:
+            parts.append(itinerary.assign(day=itinerary["day"] + offset))
+        offset += days[city]
+        previous = city
+
+    itinerary_df = pd.concat([part for part in parts if not part.empty], ignore_index=True)[columns]
+    if transfer_days and len(cities) > 1:
+        itinerary_df["poi_id"] = itinerary_df["poi_id"].astype("Int64")   # transfers have no POI
+
+    solutions = [solution for _, solution, _ in results]
+    objective = sum(s.get("objective", 0.0) for s in solutions)
+    upper_bound = sum(s.get("upper_bound", 0.0) for s in solutions)
+    itinerary_df.attrs["solution"] = {
+        "solver": "multi_city",
+        "optimal": all(s.get("optimal", False) for s in solutions),
+        "objective": objective,
+        "upper_bound": upper_bound,
+        "quality": objective / upper_bound if upper_bound > 0 else 1.0,
+        "candidates": sum(s.get("candidates", 0) for s in solutions),
+        "cities": [{"location": str(city), "days": int(days[city]), "seconds": round(seconds, 4)}
+                   for city, (_, _, seconds) in zip(cities, results)],
+        "seconds": time.perf_counter() - start,
+    }
+    return itinerary_df
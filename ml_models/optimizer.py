@@ -1,11 +1,277 @@
+import bisect
+import time
+from typing import NamedTuple
+import numpy as np
 import pandas as pd
+from ml_models.geo import (
+    has_coordinates, project_km, neighbourhoods, assign_days_by_area, order_route, travel_times
+)
+
+# Default per-day time budget (sum of duration_hours per day)
+HOURS_PER_DAY = 8.0
+
+# "auto" uses the exact solver up to this many candidates (after pruning)
+EXACT_MAX_CANDIDATES = 60
+
+# Wall-clock budget for a solve; the best solution found so far is returned
+TIME_LIMIT = 0.5
+
+
+class ItineraryProblem(NamedTuple):
+    scores: np.ndarray       # float, sorted descending
+    durations: np.ndarray    # float hours
+    categories: np.ndarray   # int category codes
+    trip_days: int
+    slots_per_day: int
+    hours_per_day: float
+    enforce_diversity: bool
+    deadline: float
+
+
+def _prune_dominated(scores, durations, categories, trip_days, slots_per_day, enforce_diversity):
+    """
+    Drops candidates that can never be needed: if K kept candidates (same
+    category when diversity is enforced) all score at least as high and
+    last no longer, a solution using this one could swap in an unused one.
+    K is trip_days with diversity (one per day) and every slot without.
+    Returns the kept positions in the input (score-descending) order.
+    """
+    limit = trip_days if enforce_diversity else trip_days * slots_per_day
+    groups = categories if enforce_diversity else np.zeros(len(scores), dtype=int)
+    kept_durations = {}
+    keep = []
+    for i in range(len(scores)):
+        durations_so_far = kept_durations.setdefault(groups[i], [])
+        if bisect.bisect_right(durations_so_far, durations[i]) >= limit:
+            continue
+        bisect.insort(durations_so_far, durations[i])
+        keep.append(i)
+    return np.asarray(keep, dtype=int)
+
+
+def _first_fit(problem, reserve):
+    n = len(problem.scores)
+    days = problem.trip_days
+    slots = problem.slots_per_day
+    assignment = np.full(n, -1)
+    count = np.zeros(days, dtype=int)
+    hours = np.zeros(days)
+    cats = [set() for _ in range(days)]
+    capacity = days * slots
+    # With `reserve`, keep enough hours for the day's other slots to be
+    # filled with the shortest candidate, so long POIs cannot starve them
+    shortest = problem.durations.min() if reserve and n else 0.0
+    placed = 0
+
+    def fits(i, d, removed=None):
+        extra = problem.durations[removed] if removed is not None else 0.0
+        if hours[d] - extra + problem.durations[i] > problem.hours_per_day:
+            return False
+        if problem.enforce_diversity and problem.categories[i] in cats[d]:
+            return removed is not None and problem.categories[removed] == problem.categories[i]
+        return True
+
+    for i in range(n):
+        if placed == capacity:
+            break
+        for d in range(days):
+            free_after = slots - count[d] - 1
+            if free_after < 0 or hours[d] + problem.durations[i] + free_after * shortest > problem.hours_per_day:
+                continue
+            if fits(i, d):
+                assignment[i] = d
+                count[d] += 1
+                hours[d] += problem.durations[i]
+                cats[d].add(problem.categories[i])
+                placed += 1
+                break
+
+    # Improvement: swap an unused candidate in for a weaker one it can replace
+    for i in np.flatnonzero(assignment < 0):
+        if time.perf_counter() > problem.deadline:
+            break
+        best_gain, best = 0.0, None
+        for j in np.flatnonzero(assignment >= 0):
+            gain = problem.scores[i] - problem.scores[j]
+            if gain > best_gain and fits(i, assignment[j], removed=j):
+                best_gain, best = gain, j
+        if best is not None:
+            d = assignment[best]
+            assignment[best], assignment[i] = -1, d
+            hours[d] += problem.durations[i] - problem.durations[best]
+            cats[d].discard(problem.categories[best])
+            cats[d].add(problem.categories[i])
+
+    return assignment
+
+
+def solve_greedy(problem):
+    """
+    First-fit in score order: each candidate goes to the earliest day with a
+    free slot, enough hours left and (optionally) no POI of its category,
+    followed by a time-bounded pass of improving swaps. Runs once plainly and
+    once reserving hours for unfilled slots and keeps the better. O(n * days).
+    """
+    plain = _first_fit(problem, reserve=False)
+    reserved = _first_fit(problem, reserve=True)
+    if problem.scores[reserved >= 0].sum() > problem.scores[plain >= 0].sum():
+        return reserved, False
+    return plain, False
+
+
+def solve_exact(problem):
+    """
+    Branch and bound over candidates in score order, seeded with the greedy
+    solution. The bound is the current total plus the best remaining scores
+    that could still fill the free slots. Returns (assignment, optimal), where
+    optimal is False if the deadline cut the search short.
+    """
+    n = len(problem.scores)
+    days = problem.trip_days
+    slots = problem.slots_per_day
+    scores, durations, categories = problem.scores, problem.durations, problem.categories
+    prefix = np.concatenate([[0.0], np.cumsum(scores)])
+    # Shortest duration among candidates i.. (bounds how many slots can still fill)
+    shortest_from = np.minimum.accumulate(durations[::-1])[::-1] if n else durations
+
+    best_assignment, _ = solve_greedy(problem)
+    best = [float(scores[best_assignment >= 0].sum()), best_assignment.copy()]
+
+    assignment = np.full(n, -1)
+    count = [0] * days
+    hours = [0.0] * days
+    cats = [set() for _ in range(days)]
+    nodes = [0]
+    timed_out = [False]
+
+    def search(i, total, free):
+        nodes[0] += 1
+        if nodes[0] % 1024 == 0 and time.perf_counter() > problem.deadline:
+            timed_out[0] = True
+        if timed_out[0]:
+            return
+        if total > best[0] + 1e-12:
+            best[0], best[1] = total, assignment.copy()
+        if i == n or free == 0:
+            return
+        fillable = sum(
+            min(slots - count[d], int((problem.hours_per_day - hours[d]) // shortest_from[i]))
+            for d in range(days)
+        ) if shortest_from[i] > 0 else free
+        if total + prefix[min(n, i + min(free, fillable))] - prefix[i] <= best[0] + 1e-12:
+            return
+
+        tried = set()
+        for d in range(days):
+            state = (count[d], hours[d], frozenset(cats[d]))
+            if state in tried or count[d] == slots:
+                continue
+            tried.add(state)  # identical days are interchangeable
+            if hours[d] + durations[i] > problem.hours_per_day:
+                continue
+            if problem.enforce_diversity and categories[i] in cats[d]:
+                continue
+
+            assignment[i] = d
+            count[d] += 1
+            hours[d] += durations[i]
+            cats[d].add(categories[i])
+            search(i + 1, total + scores[i], free - 1)
+            cats[d].discard(categories[i])
+            hours[d] -= durations[i]
+            count[d] -= 1
+            assignment[i] = -1
+
+        search(i + 1, total, free)
+
+    search(0, 0.0, days * slots)
+    return best[1], not timed_out[0]
+
+
+def solve_heuristic(problem):
+    """
+    Bounded-time solver for large candidate sets: greedy over everything,
+    then branch and bound restricted to the top EXACT_MAX_CANDIDATES
+    candidates until the deadline; the better of the two wins.
+    """
+    assignment, _ = solve_greedy(problem)
+    top = min(len(problem.scores), EXACT_MAX_CANDIDATES)
+    head = problem._replace(
+        scores=problem.scores[:top], durations=problem.durations[:top], categories=problem.categories[:top]
+    )
+    head_assignment, _ = solve_exact(head)
+
+    if problem.scores[:top][head_assignment >= 0].sum() > problem.scores[assignment >= 0].sum():
+        assignment = np.full(len(problem.scores), -1)
+        assignment[:top] = head_assignment
+    return assignment, False
+
+
+# Solver engine: name -> fn(ItineraryProblem) -> (assignment, optimal)
+SOLVERS = {
+    "greedy": solve_greedy,
+    "exact": solve_exact,
+    "heuristic": solve_heuristic,
+}
+
+
+def _upper_bound(scores, categories, trip_days, slots_per_day, enforce_diversity):
+    # Relaxation without time budgets: best scores, at most one per category per day
+    if enforce_diversity:
+        order = pd.Series(scores).groupby(categories).head(trip_days).to_numpy()
+    else:
+        order = scores
+    return float(np.sort(order)[::-1][:trip_days * slots_per_day].sum())
+
+
+def _route_days(filtered, candidates, chosen, assignment, problem, trip_days):
+    """
+    Geo pass over a solved itinerary: clusters every candidate into
+    trip_days neighbourhoods, re-groups the chosen POIs so each day stays
+    in one of them, and orders each day's stops along a short route.
+    Returns the new assignment, each stop's rank in its day's route, and
+    the travel minutes from the previous stop.
+    """
+    lat = filtered["latitude"].to_numpy(dtype=float)
+    lon = filtered["longitude"].to_numpy(dtype=float)
+    points = project_km(lat, lon)
+    _, centroids = neighbourhoods(points, trip_days, weights=filtered["score"].to_numpy(dtype=float))
+
+    picked = candidates[chosen]
+    regrouped = assign_days_by_area(
+        points[picked], centroids, problem.durations[chosen], problem.categories[chosen],
+        problem.slots_per_day, problem.hours_per_day, problem.enforce_diversity
+    )
+    assignment = assignment.copy()
+    if regrouped is not None:
+        assignment[chosen] = regrouped
+
+    city = str(filtered["location"].iloc[0])
+    poi_ids = filtered["poi_id"].to_numpy()
+    route_rank = np.zeros(len(chosen), dtype=int)
+    travel_minutes = np.zeros(len(chosen))
+    for day in np.unique(assignment[chosen]):
+        members = np.flatnonzero(assignment[chosen] == day)
+        stops = picked[members]
+        minutes = travel_times.matrix(city, poi_ids[stops], lat[stops], lon[stops])
+        route = order_route(minutes)
+        for rank, member in enumerate(route):
+            route_rank[members[member]] = rank
+            if rank > 0:
+                travel_minutes[members[member]] = minutes[route[rank - 1], member]
+    return assignment, route_rank, travel_minutes
+
 
 def optimize_itinerary(
     recommended_pois: pd.DataFrame,
     trip_days: int = 3,
     slots_per_day: int = 2,
     max_budget: str = "medium",
-    enforce_diversity: bool = True
+    enforce_diversity: bool = True,
+    hours_per_day: float = HOURS_PER_DAY,
+    solver: str = "auto",
+    time_limit: float = TIME_LIMIT,
+    geo_routing: bool = True
 ) -> pd.DataFrame:
     required_cols = ["poi_id","name","category","location","budget","duration_hours","rating","score"]
     for col in required_cols:
@@ -20,37 +286,79 @@ def optimize_itinerary(
     if max_budget not in budget_levels:
         raise ValueError(f"Invalid budget: {max_budget}. Choose from {budget_levels}")
 
+    if solver != "auto" and solver not in SOLVERS:
+        raise ValueError(f"Unknown solver: {solver}. Choose from {['auto'] + list(SOLVERS)}")
+
     allowed = budget_levels[:budget_levels.index(max_budget) + 1]
-    filtered = recommended_pois[recommended_pois["budget"].isin(allowed)].copy()
+    filtered = recommended_pois[recommended_pois["budget"].isin(allowed)]
     if filtered.empty:
         print("After budget filtering, no Points of Interests remain.")
         return pd.DataFrame()
 
-    filtered = filtered.sort_values(by="score", ascending=False)
-    max_pois = trip_days * slots_per_day
-    selected = []
-    used_cats = {day:set() for day in range(1, trip_days+1)}
+    start = time.perf_counter()
+    filtered = filtered.sort_values(by="score", ascending=False, kind="stable")
+    scores = filtered["score"].to_numpy(dtype=float)
+    durations = filtered["duration_hours"].to_numpy(dtype=float)
+    categories = pd.factorize(filtered["category"])[0]
 
-    for _, row in filtered.iterrows():
-        if len(selected) >= max_pois:
-            break
-        idx = len(selected)
-        day = idx // slots_per_day + 1
-        slot = idx % slots_per_day
-        time_of_day = "AM" if slot == 0 else "PM"
+    candidates = np.flatnonzero(durations <= hours_per_day)
+    candidates = candidates[_prune_dominated(
+        scores[candidates], durations[candidates], categories[candidates],
+        trip_days, slots_per_day, enforce_diversity
+    )]
+    if solver == "auto":
+        solver = "exact" if len(candidates) <= EXACT_MAX_CANDIDATES else "heuristic"
 
-        if enforce_diversity and (row["category"] in used_cats[day]):
-            continue
-        used_cats[day].add(row["category"])
+    problem = ItineraryProblem(
+        scores=scores[candidates],
+        durations=durations[candidates],
+        categories=categories[candidates],
+        trip_days=trip_days,
+        slots_per_day=slots_per_day,
+        hours_per_day=hours_per_day,
+        enforce_diversity=enforce_diversity,
+        deadline=start + time_limit,
+    )
+    assignment, optimal = SOLVERS[solver](problem)
 
-        poi = row.copy()
-        poi["day"] = day
-        poi["time_of_day"] = time_of_day
-        selected.append(poi)
-
-    if not selected:
+    chosen = np.flatnonzero(assignment >= 0)
+    if len(chosen) == 0:
         print("No Points of Interests selected under current constraints.")
         return pd.DataFrame()
 
-    itinerary_df = pd.DataFrame(selected)
-    return itinerary_df[["day","time_of_day","location","poi_id","name","category","budget","duration_hours","rating","score"]].reset_index(drop=True)
+    # Within a day, higher scores take the earlier slot unless routing reorders them
+    route_rank = np.argsort(np.argsort(-problem.scores[chosen], kind="stable"))
+    travel_minutes = None
+    routed = geo_routing and has_coordinates(filtered)
+    if routed:
+        assignment, route_rank, travel_minutes = _route_days(
+            filtered, candidates, chosen, assignment, problem, trip_days
+        )
+
+    order = np.lexsort((route_rank, assignment[chosen]))
+    chosen = chosen[order]
+    days = assignment[chosen]
+    slots = np.arange(len(chosen)) - np.searchsorted(days, days)
+
+    itinerary_df = filtered.iloc[candidates[chosen]].copy()
+    itinerary_df["day"] = days + 1
+    itinerary_df["time_of_day"] = np.where(slots == 0, "AM", "PM")
+
+    columns = ["day","time_of_day","location","poi_id","name","category","budget","duration_hours","rating","score"]
+    if routed:
+        itinerary_df["travel_minutes"] = travel_minutes[order].round(1)
+        columns.append("travel_minutes")
+
+    objective = float(problem.scores[chosen].sum())
+    upper_bound = _upper_bound(scores[candidates], categories[candidates], trip_days, slots_per_day, enforce_diversity)
+    itinerary_df = itinerary_df[columns].reset_index(drop=True)
+    itinerary_df.attrs["solution"] = {
+        "solver": solver,
+        "optimal": bool(optimal),
+        "objective": objective,
+        "upper_bound": upper_bound,
+        "quality": objective / upper_bound if upper_bound > 0 else 1.0,
+        "candidates": int(len(candidates)),
+        "seconds": time.perf_counter() - start,
+    }
+    return itinerary_df
@@ -0,0 +1,174 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from storage.columnar import read_table, source_mtime
+
+POI_FILE = "data/POIs_draft1.csv"
+
+# Columns stored as pandas categoricals (integer codes + one shared dictionary)
+CATEGORICAL_COLS = ["category", "location", "country", "climate", "budget"]
+
+# Hash indexes kept on the catalog: index name -> key columns
+INDEX_COLS = {
+    "poi_id": ["poi_id"],
+    "location": ["country", "location"],
+    "country": ["country"],
+    "category": ["category"],
+    "budget": ["budget"],
+}
+
+# Indexes on lowercased keys, for matching free-text user preferences
+NORMALISED_INDEX_COLS = {
+    "preference": ["climate", "budget", "category"],
+    "budget_category": ["budget", "category"],
+}
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+
+def _normalise_key(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def _as_list(values):
+    if isinstance(values, (list, tuple, set, np.ndarray, pd.Series, pd.Index)):
+        return list(values)
+    return [values]
+
+
+def _build_index(pois, cols):
+    # groupby().indices maps every key to the row positions holding it in O(n)
+    groups = pois.groupby(cols if len(cols) > 1 else cols[0], observed=True, sort=False).indices
+    return {key: np.asarray(positions, dtype=np.intp) for key, positions in groups.items()}
+
+
+def _lowered(series):
+    # Lowercases the (few) categories, not every row
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = np.asarray([str(c).lower() for c in series.cat.categories], dtype=object)
+        return pd.Series(categories[series.cat.codes.to_numpy()], index=series.index)
+    return series.astype(str).str.lower()
+
+
+class PoiCatalog:
+    """
+    In-memory POI table shared by the agents and recommenders.
+
+    The CSV (or its columnar copy, see storage/columnar.py) is read once,
+    string columns are stripped and stored as categoricals, and hash
+    indexes map keys to row positions so lookups cost O(matches). The
+    files' mtimes are checked on every query and the table is rebuilt
+    when either changes.
+    """
+
+    def __init__(self, poi_file=POI_FILE):
+        self.poi_file = poi_file
+        self.version = 0
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._state = (pd.DataFrame(), {})
+
+    def _refresh(self):
+        mtime = source_mtime(self.poi_file)
+        if mtime == self._mtime:
+            return self._state
+        with self._lock:
+            if mtime != self._mtime:
+                self._state = self._load()
+                self._mtime = mtime
+                self.version += 1
+        return self._state
+
+    def _load(self):
+        pois = read_table(self.poi_file)
+        for col in CATEGORICAL_COLS:
+            # A columnar copy is already stripped and dictionary-encoded
+            if col in pois.columns and not isinstance(pois[col].dtype, pd.CategoricalDtype):
+                pois[col] = pois[col].astype(str).str.strip().astype("category")
+        pois = pois.reset_index(drop=True)
+
+        indexes = {name: _build_index(pois, cols) for name, cols in INDEX_COLS.items()}
+        lowered = pd.DataFrame({col: _lowered(pois[col]) for col in CATEGORICAL_COLS if col in pois.columns})
+        for name, cols in NORMALISED_INDEX_COLS.items():
+            indexes[name] = _build_index(lowered, cols)
+        return pois, indexes
+
+    def reload(self):
+        with self._lock:
+            self._mtime = None
+        return self._refresh()
+
+    def frame(self):
+        """Full POI table. Shared across callers, so copy before mutating."""
+        pois, _ = self._refresh()
+        return pois
+
+    def _positions(self, indexes, index, keys):
+        if index not in indexes:
+            raise ValueError(f"Unknown catalog index: '{index}'. Choose from {list(indexes)}")
+        lookup = indexes[index]
+        hits = [lookup.get(key, _EMPTY) for key in keys]
+        return np.concatenate(hits) if hits else _EMPTY
+
+    def _select(self, index, keys, sort=False):
+        # One snapshot for both the index lookup and the row fetch, so a
+        # concurrent reload can never mix positions from two versions
+        pois, indexes = self._refresh()
+        positions = self._positions(indexes, index, keys)
+        if sort:
+            positions = np.sort(positions)
+        return pois.take(positions)
+
+    def positions(self, index, keys):
+        """Row positions for every key in `keys`, in key order (repeats kept)."""
+        _, indexes = self._refresh()
+        return self._positions(indexes, index, keys)
+
+    def get(self, poi_ids):
+        ids = [int(i) for i in _as_list(poi_ids)]
+        return self._select("poi_id", ids)
+
+    def in_location(self, country, location):
+        key = (_normalise_key(country), _normalise_key(location))
+        return self._select("location", [key])
+
+    def in_country(self, country):
+        return self._select("country", [_normalise_key(country)], sort=True)
+
+    def with_category(self, categories):
+        keys = [_normalise_key(c) for c in _as_list(categories)]
+        return self._select("category", keys, sort=True)
+
+    def with_budget(self, budgets):
+        keys = [_normalise_key(b) for b in _as_list(budgets)]
+        return self._select("budget", keys, sort=True)
+
+    def matching(self, climate=None, budget=None, categories=()):
+        """
+        POIs whose budget and category match (case-insensitively), and
+        whose climate does too unless it is None, in catalog order.
+        """
+        budget = _normalise_key(budget).lower()
+        categories = dict.fromkeys(_normalise_key(c).lower() for c in _as_list(categories))
+        if climate is None:
+            return self._select("budget_category", [(budget, c) for c in categories], sort=True)
+        climate = _normalise_key(climate).lower()
+        return self._select("preference", [(climate, budget, c) for c in categories], sort=True)
+
+    def __len__(self):
+        return len(self.frame())
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(poi_file=POI_FILE):
+    """Process-wide catalog for `poi_file` (one instance per path)."""
+    key = os.path.abspath(poi_file)
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.setdefault(key, PoiCatalog(key))
+    return catalog
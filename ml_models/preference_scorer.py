@@ -1,16 +1,23 @@
 import pandas as pd
-from sklearn.naive_bayes import GaussianNB
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
-from joblib import dump, load
-import os
+import numpy as np
+import copy
+import threading
+from ml_models.poi_catalog import get_catalog
+from ml_models.model_registry import registry, atomic_dump, atomic_dump_many
+from personalization.history_manager import (
+    load_history, locked_history, history_with_cursor, log_token,
+    add_interaction_listener, remove_interaction_listener
+)
 
 MODEL_PATH = "models/naive_bayes_scorer.pkl"
 ENCODER_PATH = "models/nb_label_encoders.pkl"
 
-def load_and_prepare_data(poi_file, history_file):
-    pois = pd.read_csv(poi_file)
-    history = pd.read_csv(history_file)
+FEATURE_COLS = ["climate", "category", "budget", "duration_hours", "rating"]
+
+def load_and_prepare_data(poi_file, history_file, history=None):
+    pois = get_catalog(poi_file).frame()
+    if history is None:
+        history = load_history(history_file)
 
     # Merging user interactions with POI features
     data = history.merge(pois, on="poi_id")
@@ -18,6 +25,8 @@ def load_and_prepare_data(poi_file, history_file):
     return data
 
 def preprocess_data(data):
+    from sklearn.preprocessing import LabelEncoder
+
     # Encoding categorical features
     label_encoders = {}
     categorical_cols = ["climate", "category", "budget", "location", "country"]
@@ -28,56 +37,260 @@ def preprocess_data(data):
         label_encoders[col] = le
 
     # Selecting features
-    X = data[["climate", "category", "budget", "duration_hours", "rating"]]
+    X = data[FEATURE_COLS]
     y = data["liked"]
 
     return X, y, label_encoders
 
 def train_preference_model(poi_file="data/POIs_draft1.csv", history_file="data/user_history_draft1.csv"):
-    data = load_and_prepare_data(poi_file, history_file)
+    from sklearn.naive_bayes import GaussianNB
+
+    # The checkpoint comes from the snapshot the model is fitted on, so
+    # rows committed meanwhile are left for catch_up_preference_model
+    history, cursor = history_with_cursor(history_file)
+    data = load_and_prepare_data(poi_file, history_file, history)
     X, y, encoders = preprocess_data(data)
 
     model = GaussianNB()
     model.fit(X, y)
+    # Checkpoint for incremental updates: history rows already folded in,
+    # and where they end in the interaction log
+    model.history_rows_ = len(history)
+    model.history_cursor_ = cursor
+    model.version_ = 1
 
-    os.makedirs("models", exist_ok=True)
-    dump(model, MODEL_PATH)
-    dump(encoders, ENCODER_PATH)
+    atomic_dump_many({ENCODER_PATH: encoders, MODEL_PATH: model})
 
     print("Naive Bayes preference model trained and saved.")
 
+def _fold_in(model, encoders, interactions, poi_file):
+    """
+    A copy of `model` with `interactions` folded in by partial_fit (cost is
+    independent of total history), and the number of rows used. Rows whose
+    POI features are unseen by the encoders are skipped.
+    """
+    # Readers keep using the registry's object, so update a private copy
+    updated = copy.deepcopy(model)
+    updated.version_ = getattr(model, "version_", 1) + 1
+    interactions = pd.DataFrame(interactions)
+    if interactions.empty:
+        return updated, 0
+
+    # Only the POIs touched by these interactions are fetched from the catalog
+    pois = get_catalog(poi_file).get(interactions["poi_id"].unique())
+    data = interactions.merge(pois, on="poi_id")
+    data = data[data["liked"].isin(model.classes_)]
+
+    for col, le in encoders.items():
+        data = data[data[col].isin(le.classes_)].copy()
+        data[col] = le.transform(data[col])
+    if data.empty:
+        return updated, 0
+
+    updated.partial_fit(data[FEATURE_COLS], data["liked"])
+    return updated, len(data)
+
+def _published_model():
+    # Another process may have published since the registry last checked
+    registry.invalidate(MODEL_PATH)
+    return registry.get(MODEL_PATH), registry.get(ENCODER_PATH)
+
+def update_preference_model(interactions, poi_file="data/POIs_draft1.csv",
+                            history_file="data/user_history_draft1.csv"):
+    """
+    Folds interaction rows that are not in the history log into the
+    published model and publishes the copy under a new version. Logged rows
+    are applied by catch_up_preference_model; the checkpoint is left as is.
+    Runs under the history lock, so concurrent updates never drop each
+    other's rows. Returns the number of rows used.
+    """
+    if pd.DataFrame(interactions).empty:
+        return 0
+    with locked_history(history_file):
+        model, encoders = _published_model()
+        updated, used = _fold_in(model, encoders, interactions, poi_file)
+        if used:
+            atomic_dump(updated, MODEL_PATH)
+    return used
+
+def catch_up_preference_model(poi_file="data/POIs_draft1.csv", history_file="data/user_history_draft1.csv"):
+    """
+    Replays committed history rows past the model's checkpoint, whichever
+    process wrote them, and advances the checkpoint. Only the log after the
+    checkpoint's cursor (`history_cursor_`) is read, so the cost and the
+    time writers wait on the lock do not grow with total history; a model
+    without a usable cursor falls back to skipping `history_rows_` rows of
+    a full read. Model read, update and publish all happen under the
+    history lock, so with several updaters every row is applied exactly
+    once. Returns the number of rows used.
+    """
+    with locked_history(history_file) as read_history:
+        model, encoders = _published_model()
+        checkpoint = getattr(model, "history_cursor_", None)
+        rows, cursor = read_history(since=checkpoint) if checkpoint is not None else (None, None)
+        if rows is None:
+            history, cursor = read_history()
+            rows = history.iloc[getattr(model, "history_rows_", len(history)):]
+        if rows.empty:
+            return 0
+
+        updated, used = _fold_in(model, encoders, rows, poi_file)
+        updated.history_rows_ = getattr(model, "history_rows_", 0) + len(rows)
+        updated.history_cursor_ = cursor
+        atomic_dump(updated, MODEL_PATH)
+    return used
+
+class PreferenceModelUpdater:
+    """
+    Background updater that folds newly committed interactions into the
+    Naive Bayes model every `interval` seconds (see catch_up_preference_model),
+    so new likes affect scoring within seconds instead of at the next full
+    retrain. Rows saved by other processes are picked up too.
+    """
+
+    def __init__(self, poi_file="data/POIs_draft1.csv", history_file="data/user_history_draft1.csv", interval=2.0):
+        self.poi_file = poi_file
+        self.history_file = history_file
+        self.interval = interval
+        self._dirty = threading.Event()
+        self._log_token = log_token(history_file)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _on_interaction(self, record):
+        self._dirty.set()
+
+    def flush(self):
+        token = log_token(self.history_file)
+        if not self._dirty.is_set() and token == self._log_token:
+            return 0
+        self._dirty.clear()
+        self._log_token = token
+        return catch_up_preference_model(self.poi_file, self.history_file)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Preference model update failed: {e}")
+
+    def start(self):
+        add_interaction_listener(self._on_interaction, self.history_file)
+        self._thread = threading.Thread(target=self._run, name="preference-updater", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        remove_interaction_listener(self._on_interaction, self.history_file)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+def score_catalog(pois, model, encoders):
+    """
+    Encodes the POI table once and scores every row in one predict_proba
+    pass. Rows with labels unseen by the encoders are dropped; returns the
+    kept row positions and their 'liked' probabilities.
+    """
+    valid = np.ones(len(pois), dtype=bool)
+    for col, le in encoders.items():
+        valid &= pois[col].isin(le.classes_).to_numpy()
+    positions = np.flatnonzero(valid)
+    if len(positions) == 0:
+        return positions, np.empty(0)
+
+    kept = pois.take(positions)
+    features = pd.DataFrame({
+        col: encoders[col].transform(kept[col]) if col in encoders else kept[col].to_numpy()
+        for col in FEATURE_COLS
+    })
+    scores = model.predict_proba(features)[:, 1]  # probability of 'liked' class
+    return positions, scores
+
+def score_all_pois(poi_file="data/POIs_draft1.csv"):
+    """Every scoreable catalog POI with its 'liked' probability, in catalog order."""
+    model = registry.get(MODEL_PATH)
+    encoders = registry.get(ENCODER_PATH)
+
+    pois = get_catalog(poi_file).frame()
+    positions, scores = score_catalog(pois, model, encoders)
+    scored_pois = pois.take(positions)
+    scored_pois["score"] = scores
+    return scored_pois
+
 def score_pois_for_user(user_id, poi_file="data/POIs_draft1.csv", history_file="data/user_history_draft1.csv"):
-    model = load(MODEL_PATH)
-    encoders = load(ENCODER_PATH)
+    model = registry.get(MODEL_PATH)
+    encoders = registry.get(ENCODER_PATH)
 
-    pois = pd.read_csv(poi_file)
-    history = pd.read_csv(history_file)
+    pois = get_catalog(poi_file).frame()
+    history = load_history(history_file)
 
     # POIs the user hasn't interacted with
     interacted = history[history["user_id"] == user_id]["poi_id"]
     unseen_pois = pois[~pois["poi_id"].isin(interacted)]
 
-    # Keeping a copy of the original for output
-    original_unseen = unseen_pois.copy()
+    positions, scores = score_catalog(unseen_pois, model, encoders)
 
-    # Applying encoders for model input
-    for col, le in encoders.items():
-        # Drop rows with unseen labels
-        valid_mask = unseen_pois[col].isin(le.classes_)
-        unseen_pois = unseen_pois[valid_mask]
-        original_unseen = original_unseen.loc[unseen_pois.index]  # match index
+    # Adding scores to original POI data
+    scored_pois = unseen_pois.take(positions)
+    scored_pois["score"] = scores
 
-        # Encoding for prediction
-        unseen_pois[col] = le.transform(unseen_pois[col])
+    # Sort and return (stable, so ties keep catalog order)
+    return scored_pois.sort_values(by="score", ascending=False, kind="stable")
 
-    # Extracting features for prediction
-    features = unseen_pois[["climate", "category", "budget", "duration_hours", "rating"]]
-    scores = model.predict_proba(features)[:, 1]  # probability of 'liked' class
+def score_pois_for_users(user_ids, top_k=10, poi_file="data/POIs_draft1.csv",
+                         history_file="data/user_history_draft1.csv", chunk_size=4096):
+    """
+    Top-K unseen POIs for many users in one vectorised job.
 
-    # Adding scores to original POI data
-    scored_pois = original_unseen.copy()
-    scored_pois["score"] = scores
+    The catalog is encoded and scored once. Because the Naive Bayes score
+    does not depend on the user, a single global ranking is shared and each
+    user's "already interacted" POIs are masked out with a sparse user x POI
+    matrix. Returns a long DataFrame: user_id, rank, poi_id, score.
+    """
+    model = registry.get(MODEL_PATH)
+    encoders = registry.get(ENCODER_PATH)
+
+    pois = get_catalog(poi_file).frame()
+    history = load_history(history_file)
+
+    positions, scores = score_catalog(pois, model, encoders)
+    poi_ids = pois["poi_id"].to_numpy()[positions]
+
+    # Global ranking, best first (stable so ties keep catalog order)
+    order = np.argsort(-scores, kind="stable")
+    ranked_ids, ranked_scores = poi_ids[order], scores[order]
+
+    from scipy import sparse
+
+    user_ids = pd.unique(np.asarray(user_ids))
+    user_rows = pd.Index(user_ids).get_indexer(history["user_id"])
+    poi_cols = pd.Index(ranked_ids).get_indexer(history["poi_id"])
+    known = (user_rows >= 0) & (poi_cols >= 0)
+    interacted = sparse.csr_matrix(
+        (np.ones(known.sum(), dtype=bool), (user_rows[known], poi_cols[known])),
+        shape=(len(user_ids), len(ranked_ids)),
+    )
+
+    results = []
+    for start in range(0, len(user_ids), chunk_size):
+        block = interacted[start:start + chunk_size]
+        # A user's top-K lies within the first K + (their interactions) ranked POIs
+        width = min(len(ranked_ids), top_k + (int(block.getnnz(axis=1).max()) if block.shape[0] else 0))
+        keep = ~block[:, :width].toarray()
+        keep &= np.cumsum(keep, axis=1) <= top_k
 
-    # Sort and return
-    return scored_pois.sort_values(by="score", ascending=False)
+        rows, cols = np.nonzero(keep)
+        ranks = np.cumsum(keep, axis=1)[rows, cols]
+        results.append(pd.DataFrame({
+            "user_id": user_ids[start + rows],
+            "rank": ranks,
+            "poi_id": ranked_ids[cols],
+            "score": ranked_scores[cols],
+        }))
 
+    if not results:
+        return pd.DataFrame(columns=["user_id", "rank", "poi_id", "score"])
+    return pd.concat(results, ignore_index=True)
@@ -0,0 +1,585 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+from ml_models.poi_catalog import get_catalog
+from personalization.history_manager import (
+    load_history, history_with_cursor, read_log_since, log_token,
+    add_interaction_listener, remove_interaction_listener
+)
+from storage.columnar import get_table, source_mtime
+from telemetry.metrics import metrics
+
+STORE_FILE = "cache/recommendations.sqlite"
+
+POI_FILE = "data/POIs_draft1.csv"
+HISTORY_FILE = "data/user_history_draft1.csv"
+USERS_FILE = "data/users_draft1.csv"
+
+# Materialised recommenders: hybrid_recommend and adaptive recommend_pois
+KINDS = ["hybrid", "adaptive"]
+SCORE_COLUMNS = {"hybrid": "score", "adaptive": "final_score"}
+DEFAULT_TOP_N = {"hybrid": 10, "adaptive": 5}
+
+
+def _file_token(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def model_version(kind):
+    """
+    What a kind's scores depend on besides the user's own history and the
+    catalog. Entries stored under another version are stale.
+    """
+    if kind != "hybrid":
+        return "rules"
+    from ml_models.preference_scorer import MODEL_PATH, ENCODER_PATH
+    from ml_models.model_registry import registry
+    from ml_models.similarity_index import INDEX_DIR
+    from ml_models.collaborative import get_cf_model
+
+    # A CF fold-in only moves the folded-in users (see RecommendationStore.sync),
+    # so the CF part is the last full training, not the file
+    cf = get_cf_model()
+    return json.dumps([_file_token(registry.resolve(MODEL_PATH)), _file_token(registry.resolve(ENCODER_PATH)),
+                       _file_token(os.path.join(INDEX_DIR, "meta.json")),
+                       cf.trained_at if cf is not None else None])
+
+
+def _row_digests(frame, key):
+    # One 64-bit hash per row, viewed as signed to fit an SQLite integer
+    digests = pd.util.hash_pandas_object(frame.astype(str), index=False).to_numpy().view(np.int64)
+    return pd.Series(digests, index=frame[key].to_numpy())
+
+
+def _hybrid_bounds(pois):
+    """
+    Highest hybrid score each POI can reach for any user: its Naive Bayes
+    score, plus full marks from every extra source that is active. POIs the
+    encoders cannot score get -inf.
+    """
+    from ml_models.preference_scorer import score_catalog, MODEL_PATH, ENCODER_PATH
+    from ml_models.model_registry import registry
+    from ml_models.recommender import SIMILARITY_WEIGHT, CF_WEIGHT
+    from ml_models.similarity_index import get_similarity_index
+    from ml_models.collaborative import get_cf_model
+
+    bounds = np.full(len(pois), -np.inf)
+    positions, scores = score_catalog(pois, registry.get(MODEL_PATH), registry.get(ENCODER_PATH))
+    extra = (SIMILARITY_WEIGHT if get_similarity_index() is not None else 0.0) + \
+            (CF_WEIGHT if get_cf_model() is not None else 0.0)
+    bounds[positions] = (1 - extra) * scores + extra
+    return bounds
+
+
+def _adaptive_bounds(pois):
+    # Normalised rating; the liked boost only applies to users with history
+    # on the POI, who are invalidated anyway
+    return pois["rating"].to_numpy(dtype=float) / 5.0
+
+
+BOUNDS = {"hybrid": _hybrid_bounds, "adaptive": _adaptive_bounds}
+
+
+class RecommendationStore:
+    """
+    Materialised top-K recommendations per (kind, user, top_n) in a SQLite
+    table (WAL mode, shared by every process), so serving is a key lookup
+    plus catalog.get() of K POIs whatever the catalog size.
+
+    Entries are invalidated, never recomputed in place: a new interaction
+    invalidates that user; a catalog change invalidates only the entries a
+    changed POI could enter (its best possible score beats the stored K-th
+    score in the entry's country) or leave (the entry holds it); a changed
+    users row invalidates that user. Entries computed under another model
+    version count as stale. Readers only follow the new tail of the
+    interaction log (follow_history) and recompute stale entries on demand;
+    the catalog and users-table diffs run in sync(), from
+    RecommendationRefresher or precompute_recommendations, and readers
+    bypass the store until a change has been synced.
+    """
+
+    def __init__(self, path=STORE_FILE, poi_file=POI_FILE, history_file=HISTORY_FILE, users_file=USERS_FILE):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._tokens = None
+        self._log_token = None
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "invalidated": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS topk ("
+                " kind TEXT NOT NULL, user_id INTEGER NOT NULL, top_n INTEGER NOT NULL,"
+                " items TEXT NOT NULL, scope TEXT, kth_score REAL, version TEXT, updated_at REAL NOT NULL,"
+                " PRIMARY KEY (kind, user_id, top_n))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS topk_items ("
+                " kind TEXT NOT NULL, user_id INTEGER NOT NULL, top_n INTEGER NOT NULL, poi_id INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_topk_items_poi ON topk_items(poi_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_topk_items_entry ON topk_items(kind, user_id, top_n)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_topk_user ON topk(user_id)")
+            # Last seen catalog / users rows, diffed on change to find what moved
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshot ("
+                " source TEXT NOT NULL, key INTEGER NOT NULL, digest INTEGER NOT NULL,"
+                " PRIMARY KEY (source, key))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('sources', ?)",
+                (json.dumps([os.path.abspath(poi_file), os.path.abspath(history_file), os.path.abspath(users_file)]),)
+            )
+        self.poi_file, self.history_file, self.users_file = self._meta("sources")
+
+    def _connection(self):
+        # sqlite3 connections are not shareable across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _meta(self, key, default=None):
+        found = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(found[0]) if found is not None else default
+
+    def _set_meta(self, conn, key, value):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def serves(self, poi_file=POI_FILE, history_file=HISTORY_FILE, users_file=USERS_FILE):
+        """True if the store was built from these files (None matches any)."""
+        files = zip([poi_file, history_file, users_file], [self.poi_file, self.history_file, self.users_file])
+        return all(path is None or os.path.abspath(path) == built for path, built in files)
+
+    def get(self, kind, user_id, top_n, version):
+        """The stored recommendations, or None if missing, invalidated or from another version."""
+        found = self._connection().execute(
+            "SELECT items FROM topk WHERE kind = ? AND user_id = ? AND top_n = ? AND version = ?",
+            (kind, int(user_id), int(top_n), version)
+        ).fetchone()
+        if found is None:
+            self._count("misses")
+            return None
+
+        items = json.loads(found[0])
+        frame = get_catalog(self.poi_file).get(items["poi_id"])
+        if len(frame) != len(items["poi_id"]):
+            self._count("misses")
+            return None
+        for col, values in items["values"].items():
+            frame[col] = np.asarray(values, dtype=float)
+        self._count("hits")
+        return frame[items["columns"]]
+
+    def put_many(self, kind, entries, version):
+        """
+        Stores (user_id, top_n, recommendations, scope, bounded) entries.
+        bounded means no POI scoring below the K-th score, or outside
+        `scope` (a country, None for all), could enter the list; otherwise
+        any catalog change invalidates the entry.
+        """
+        score_col = SCORE_COLUMNS[kind]
+        now = time.time()
+        catalog_cols = set(get_catalog(self.poi_file).frame().columns)
+        rows, items = [], []
+        for user_id, top_n, frame, scope, bounded in entries:
+            poi_ids = [int(i) for i in frame["poi_id"]]
+            values = {col: frame[col].astype(float).tolist() for col in frame.columns if col not in catalog_cols}
+            full = bounded and len(frame) == top_n
+            kth_score = float(frame[score_col].iloc[-1]) if full else None
+            rows.append((kind, int(user_id), int(top_n),
+                         json.dumps({"columns": list(frame.columns), "poi_id": poi_ids, "values": values}),
+                         None if scope is None else str(scope), kth_score, version, now))
+            items.extend((kind, int(user_id), int(top_n), poi_id) for poi_id in poi_ids)
+
+        with self._connection() as conn:
+            conn.executemany(
+                "DELETE FROM topk_items WHERE kind = ? AND user_id = ? AND top_n = ?",
+                [row[:3] for row in rows]
+            )
+            conn.executemany("INSERT OR REPLACE INTO topk VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("INSERT INTO topk_items VALUES (?, ?, ?, ?)", items)
+        self._count("writes", len(rows))
+        return len(rows)
+
+    def put(self, kind, user_id, top_n, frame, scope, bounded, version):
+        return self.put_many(kind, [(user_id, top_n, frame, scope, bounded)], version)
+
+    def delete(self, kind, keys):
+        """Drops (user_id, top_n) entries, e.g. users nothing can be recommended to."""
+        keys = [(kind, int(user_id), int(top_n)) for user_id, top_n in keys]
+        with self._connection() as conn:
+            conn.executemany("DELETE FROM topk WHERE kind = ? AND user_id = ? AND top_n = ?", keys)
+            conn.executemany("DELETE FROM topk_items WHERE kind = ? AND user_id = ? AND top_n = ?", keys)
+
+    def stale(self, kind, version):
+        """(user_id, top_n) of every entry that needs recomputing."""
+        return self._connection().execute(
+            "SELECT user_id, top_n FROM topk WHERE kind = ? AND (version IS NULL OR version != ?)",
+            (kind, version)
+        ).fetchall()
+
+    def _invalidate(self, conn, where, params=()):
+        changed = conn.execute(f"UPDATE topk SET version = NULL WHERE version IS NOT NULL AND {where}",
+                               params).rowcount
+        self._count("invalidated", changed)
+        return changed
+
+    def invalidate_users(self, user_ids, kinds=None):
+        """Invalidates every entry of these users (all kinds unless given)."""
+        user_ids = [(int(user_id),) for user_id in pd.unique(np.asarray(user_ids))]
+        if not user_ids:
+            return 0
+        kinds = list(kinds or KINDS)
+        with self._connection() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS affected_users (user_id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM affected_users")
+            conn.executemany("INSERT OR IGNORE INTO affected_users VALUES (?)", user_ids)
+            return self._invalidate(
+                conn, f"kind IN ({','.join('?' * len(kinds))}) AND user_id IN (SELECT user_id FROM affected_users)",
+                kinds
+            )
+
+    def _diff(self, conn, source, digests):
+        """Keys added, changed or removed since the stored snapshot of `source`; the snapshot is updated."""
+        old = dict(conn.execute("SELECT key, digest FROM snapshot WHERE source = ?", (source,)).fetchall())
+        changed = pd.Index([key for key, digest in digests.items() if old.get(key) != digest])
+        removed = pd.Index(list(old)).difference(digests.index)
+
+        rows = [(source, int(key), int(digests[key])) for key in changed]
+        conn.executemany("INSERT OR REPLACE INTO snapshot VALUES (?, ?, ?)", rows)
+        conn.executemany("DELETE FROM snapshot WHERE source = ? AND key = ?", [(source, int(k)) for k in removed])
+        return changed, removed, len(old) == 0
+
+    def _sync_catalog(self, conn):
+        pois = get_catalog(self.poi_file).frame()
+        changed, removed, first = self._diff(conn, "catalog", _row_digests(pois, "poi_id"))
+        if first:
+            # No baseline to diff against
+            return self._invalidate(conn, "1")
+        moved = changed.union(removed)
+        if moved.empty:
+            return 0
+
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS moved_pois (poi_id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM moved_pois")
+        conn.executemany("INSERT INTO moved_pois VALUES (?)", [(int(p),) for p in moved])
+        # Lists holding a moved POI, and users whose history touches one (their
+        # excluded POIs, base country and liked boosts depend on it)
+        count = self._invalidate(conn, "(kind, user_id, top_n) IN (SELECT kind, user_id, top_n FROM topk_items"
+                                       " WHERE poi_id IN (SELECT poi_id FROM moved_pois))")
+        history = load_history(self.history_file)
+        touched = history.loc[history["poi_id"].isin(moved), "user_id"].unique()
+        count += self.invalidate_users(touched)
+
+        entrants = pois[pois["poi_id"].isin(changed)]
+        for kind, bound in BOUNDS.items():
+            if kind == "hybrid" and len(removed) and self._cf_active():
+                # The CF score is min-max normalised over the scored POIs
+                count += self._invalidate(conn, "kind = ?", (kind,))
+                continue
+            count += self._invalidate(conn, "kind = ? AND kth_score IS NULL", (kind,))
+            if entrants.empty:
+                continue
+            bounds = pd.Series(bound(entrants), index=entrants["country"].astype(str).to_numpy())
+            count += self._invalidate(conn, "kind = ? AND scope IS NULL AND kth_score <= ?",
+                                      (kind, float(bounds.max())))
+            for country, best in bounds.groupby(level=0).max().items():
+                count += self._invalidate(conn, "kind = ? AND scope = ? AND kth_score <= ?",
+                                          (kind, country, float(best)))
+        return count
+
+    def _cf_active(self):
+        from ml_models.collaborative import get_cf_model
+        return get_cf_model() is not None
+
+    def _sync_users(self, conn):
+        users = get_table(self.users_file).drop_duplicates("user_id")
+        changed, removed, first = self._diff(conn, "users", _row_digests(users, "user_id"))
+        if first:
+            return self._invalidate(conn, "kind = 'adaptive'")
+        return self.invalidate_users(changed.union(removed), ["adaptive"])
+
+    def _sync_cf(self, conn):
+        from ml_models.collaborative import get_cf_model
+
+        model = get_cf_model()
+        if model is None:
+            return 0
+        seen = self._meta("cf", [None, 0])
+        self._set_meta(conn, "cf", [model.trained_at, model.history_rows])
+        if seen[0] != model.trained_at or seen[1] >= model.history_rows:
+            # Retrained (model_version changes) or nothing folded in
+            return 0
+        # Users folded in since the last sync have new CF vectors
+        folded = load_history(self.history_file).iloc[seen[1]:model.history_rows]
+        return self.invalidate_users(folded["user_id"].unique(), ["hybrid"])
+
+    def _source_tokens(self):
+        from ml_models.collaborative import MODEL_PATH as CF_MODEL_PATH
+
+        return {"catalog": list(source_mtime(self.poi_file)), "users": list(source_mtime(self.users_file)),
+                "cf": _file_token(CF_MODEL_PATH)}
+
+    def in_sync(self):
+        """True if every catalog, users-table and CF change has been synced, by any process; a few stat() calls."""
+        tokens = self._source_tokens()
+        if tokens != self._tokens and tokens == self._meta("tokens", {}):
+            self._tokens = tokens
+        return tokens == self._tokens
+
+    def sync(self):
+        """
+        Applies catalog, users-table, CF fold-in and interaction history
+        changes made since the last sync, by any process. Costs a few stat()
+        calls when nothing changed; the catalog and users diffs read those
+        tables whole, so this belongs off the read path.
+        """
+        count = self.follow_history()
+        tokens = self._source_tokens()
+        if tokens == self._tokens:
+            return count
+        with self._lock:
+            stored = self._meta("tokens", {})
+            with self._connection() as conn:
+                if tokens["catalog"] != stored.get("catalog"):
+                    count += self._sync_catalog(conn)
+                if tokens["users"] != stored.get("users"):
+                    count += self._sync_users(conn)
+                if tokens["cf"] != stored.get("cf"):
+                    count += self._sync_cf(conn)
+                self._set_meta(conn, "tokens", tokens)
+            self._tokens = tokens
+        return count
+
+    def follow_history(self, rescan=True):
+        """
+        Invalidates users with interactions committed since the last call,
+        by any process, reading only the new tail of the log. When the log
+        cannot be followed (compacted twice since the last call) the whole
+        history is rescanned, or, with rescan=False, None is returned.
+        """
+        token = log_token(self.history_file)
+        if token is not None and token == self._log_token:
+            return 0
+        with self._lock:
+            rows, cursor = read_log_since(self._meta("history_cursor"), self.history_file)
+            if rows is None:
+                if not rescan:
+                    return None
+                count = self.catch_up_history()
+            else:
+                count = self.invalidate_users(rows["user_id"])
+                with self._connection() as conn:
+                    self._set_meta(conn, "history_rows", self._meta("history_rows", 0) + len(rows))
+                    self._set_meta(conn, "history_cursor", cursor)
+            self._log_token = token
+        return count
+
+    def catch_up_history(self):
+        """Invalidates users with history rows written since the last full read (e.g. by other processes)."""
+        history, cursor = history_with_cursor(self.history_file)
+        seen = self._meta("history_rows", 0)
+        if len(history) < seen:
+            # Rewritten underneath us
+            with self._connection() as conn:
+                count = self._invalidate(conn, "1")
+        else:
+            count = self.invalidate_users(history["user_id"].iloc[seen:])
+        with self._connection() as conn:
+            self._set_meta(conn, "history_rows", len(history))
+            self._set_meta(conn, "history_cursor", cursor)
+        return count
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM topk").fetchone()[0]
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+def read_through(store, kind, user_id, top_n, compute):
+    """
+    The stored entry, or compute() -> (recommendations, scope, bounded)
+    stored and returned. Reads only the new log tail, so the cost does not
+    grow with history or catalog size; while a catalog, users-table or CF
+    change awaits sync() the store is bypassed.
+    """
+    if not store.in_sync() or store.follow_history(rescan=False) is None:
+        return compute()[0]
+    version = model_version(kind)
+    cached = store.get(kind, user_id, top_n, version)
+    if cached is not None:
+        return cached
+    recommendations, scope, bounded = compute()
+    store.put(kind, user_id, top_n, recommendations, scope, bounded, version)
+    return recommendations
+
+
+def recompute(store, kind, keys):
+    """Recomputes (user_id, top_n) entries of `kind` in batches; returns how many were stored."""
+    from ml_models.recommender import hybrid_recommend_many
+    from personalization.adaptive_recommender import recommend_pois_many
+
+    version = model_version(kind)
+    by_top_n = {}
+    for user_id, top_n in keys:
+        by_top_n.setdefault(int(top_n), []).append(int(user_id))
+
+    stored = 0
+    for top_n, user_ids in by_top_n.items():
+        if kind == "hybrid":
+            ranked = ((user_id, frame, scope, scope is not None) for user_id, frame, scope in
+                      hybrid_recommend_many(user_ids, top_n, store.poi_file, store.history_file))
+        else:
+            ranked = ((user_id, frame, None, not relaxed) for user_id, frame, relaxed in
+                      recommend_pois_many(user_ids, top_n, store.users_file, store.poi_file, store.history_file))
+        done = set()
+        entries = []
+        for user_id, frame, scope, bounded in ranked:
+            done.add(user_id)
+            entries.append((user_id, top_n, frame, scope, bounded))
+        stored += store.put_many(kind, entries, version)
+        store.delete(kind, [(user_id, top_n) for user_id in user_ids if user_id not in done])
+    return stored
+
+
+def _all_users(store, kind):
+    users = get_table(store.users_file)["user_id"]
+    if kind == "hybrid":
+        users = pd.concat([users, load_history(store.history_file)["user_id"]])
+    return [int(user_id) for user_id in pd.unique(users)]
+
+
+def precompute_recommendations(user_ids=None, top_n=None, kinds=KINDS, path=STORE_FILE,
+                               poi_file=POI_FILE, history_file=HISTORY_FILE, users_file=USERS_FILE):
+    """
+    Fills the store with every user's top-K (or `user_ids`') for each kind.
+    The catalog, users table and history are snapshotted first, so changes
+    made during or after the job invalidate the entries they affect.
+    """
+    store = _open_store(path, poi_file, history_file, users_file)
+    store.sync()
+
+    stored = 0
+    for kind in kinds:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown recommendation kind: '{kind}'. Choose from {KINDS}")
+        ids = _all_users(store, kind) if user_ids is None else list(user_ids)
+        start = time.perf_counter()
+        count = recompute(store, kind, [(user_id, top_n or DEFAULT_TOP_N[kind]) for user_id in ids])
+        stored += count
+        print(f"Materialised {count} {kind} recommendation lists in {time.perf_counter() - start:.2f}s.")
+    return store
+
+
+class RecommendationRefresher:
+    """
+    Keeps a store fresh: every save_interaction invalidates that user at
+    once (readers would otherwise pick it up from the log on their next
+    sync), and every `interval` seconds catalog, users and model changes are
+    synced and all invalidated or stale entries are recomputed in batches.
+    """
+
+    def __init__(self, store=None, interval=2.0):
+        self.store = store or get_recommendation_store()
+        if self.store is None:
+            raise ValueError(f"No recommendation store at {STORE_FILE}; run precompute_recommendations first.")
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _on_interaction(self, record):
+        self.store.invalidate_users([record["user_id"]])
+
+    def refresh(self):
+        self.store.sync()
+        return sum(recompute(self.store, kind, self.store.stale(kind, model_version(kind))) for kind in KINDS)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Recommendation refresh failed: {e}")
+
+    def start(self):
+        add_interaction_listener(self._on_interaction, self.store.history_file)
+        self._thread = threading.Thread(target=self._run, name="recommendation-refresher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        remove_interaction_listener(self._on_interaction, self.store.history_file)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _open_store(path, poi_file=POI_FILE, history_file=HISTORY_FILE, users_file=USERS_FILE):
+    key = os.path.abspath(path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = RecommendationStore(path, poi_file, history_file, users_file)
+            if len(_stores) == 1:
+                metrics.register_collector(_store_metrics)
+        return _stores[key]
+
+
+def get_recommendation_store(path=STORE_FILE):
+    """Process-wide store on `path`, or None if nothing has been materialised there."""
+    store = _stores.get(os.path.abspath(path))
+    if store is not None:
+        return store
+    if not os.path.exists(path):
+        return None
+    return _open_store(path)
+
+
+def _store_metrics():
+    samples = []
+    for path, store in list(_stores.items()):
+        samples.extend((f"recommendation_store_{name}", value, {"path": path})
+                       for name, value in store.stats().items())
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialise per-user top-K recommendations")
+    parser.add_argument("--users", type=int, nargs="*", default=None, help="User ids (default: all users).")
+    parser.add_argument("--top-n", type=int, default=None)
+    parser.add_argument("--kinds", nargs="*", default=KINDS, choices=KINDS)
+    parser.add_argument("--store", default=STORE_FILE)
+    args = parser.parse_args()
+    precompute_recommendations(args.users, args.top_n, args.kinds, args.store)
+
+
+if __name__ == "__main__":
+    main()
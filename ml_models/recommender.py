@@ -1,36 +1,128 @@
 import pandas as pd
-from ml_models.preference_scorer import score_pois_for_user
+from ml_models.preference_scorer import score_pois_for_user, score_all_pois
+from ml_models.recommendation_store import get_recommendation_store, read_through
+from ml_models.poi_catalog import get_catalog
+from ml_models.similarity_index import get_similarity_index
+from ml_models.collaborative import cf_scores_for_user
+from personalization.history_manager import load_history
+
+# Share of the final score taken by "similar to what you liked" when a similarity index exists
+SIMILARITY_WEIGHT = 0.3
+
+# Share taken by the collaborative-filtering score when a CF model is trained
+CF_WEIGHT = 0.2
+
+POI_FILE = "data/POIs_draft1.csv"
+HISTORY_FILE = "data/user_history_draft1.csv"
 
 def hybrid_recommend(
     user_id: int,
-    poi_file: str = "data/POIs_draft1.csv",
-    history_file: str = "data/user_history_draft1.csv",
-    top_n: int = 10
+    poi_file: str = POI_FILE,
+    history_file: str = HISTORY_FILE,
+    top_n: int = 10,
+    similarity_weight: float = SIMILARITY_WEIGHT,
+    cf_weight: float = CF_WEIGHT
 ) -> pd.DataFrame:
-    # Scoring POIs
-    scored_pois = score_pois_for_user(user_id, poi_file, history_file)
-    if scored_pois.empty:
-        raise ValueError("No POIs could be scored for this user.")
+    def rank():
+        # Scoring POIs
+        scored_pois = score_pois_for_user(user_id, poi_file, history_file)
+        if scored_pois.empty:
+            raise ValueError("No POIs could be scored for this user.")
+
+        user_history = load_history(history_file)
+        recommendations, scope = rank_for_user(
+            user_id, scored_pois, user_history[user_history["user_id"] == user_id],
+            poi_file, history_file, top_n, similarity_weight, cf_weight
+        )
+        return recommendations, scope, scope is not None
+
+    # Served from the materialised top-K when one exists for these sources
+    # and the default weights (see recommendation_store.py)
+    store = get_recommendation_store()
+    if (store is not None and store.serves(poi_file, history_file, users_file=None)
+            and (similarity_weight, cf_weight) == (SIMILARITY_WEIGHT, CF_WEIGHT)):
+        return read_through(store, "hybrid", user_id, top_n, rank)
+    return rank()[0]
+
+def hybrid_recommend_many(user_ids, top_n=10, poi_file=POI_FILE, history_file=HISTORY_FILE,
+                          similarity_weight=SIMILARITY_WEIGHT, cf_weight=CF_WEIGHT):
+    """
+    hybrid_recommend for many users, yielding (user_id, recommendations,
+    scope). The catalog is scored and the history read once for the batch.
+    Users with nothing to recommend are skipped.
+    """
+    scored_catalog = score_all_pois(poi_file)
+    history = load_history(history_file)
+    by_user = history.groupby("user_id", sort=False)
 
+    for user_id in user_ids:
+        user_history = by_user.get_group(user_id) if user_id in by_user.groups else history.iloc[:0]
+        # Same rows, order and sort as score_pois_for_user
+        unseen = scored_catalog[~scored_catalog["poi_id"].isin(user_history["poi_id"])]
+        if unseen.empty:
+            continue
+        scored_pois = unseen.sort_values(by="score", ascending=False, kind="stable")
+        recommendations, scope = rank_for_user(
+            user_id, scored_pois, user_history, poi_file, history_file, top_n, similarity_weight, cf_weight
+        )
+        yield user_id, recommendations, scope
+
+def rank_for_user(user_id, scored_pois, user_history, poi_file=POI_FILE, history_file=HISTORY_FILE,
+                  top_n=10, similarity_weight=SIMILARITY_WEIGHT, cf_weight=CF_WEIGHT):
+    """
+    Blends the extra score sources into a user's scored POIs and applies the
+    country selection. Returns (recommendations, scope): scope is the base
+    country when the list came from it, else None (any country can matter).
+    """
     # Determine user's base country from liked POIs
-    user_history = pd.read_csv(history_file)
-    pois = pd.read_csv(poi_file)
-    merged = user_history.merge(pois, on="poi_id")
-    user_likes = merged[(merged["user_id"] == user_id) & (merged["liked"] == 1)]
+    liked_ids = user_history[user_history["liked"] == 1]["poi_id"]
+    user_likes = get_catalog(poi_file).get(liked_ids)
+
+    # Extra score sources, each normalised to [0, 1] and given its weight;
+    # the Naive Bayes score keeps whatever share is left
+    sources = {}
+
+    # Content similarity to liked POIs (see similarity_index.py), from an
+    # index built on this catalog
+    index = get_similarity_index() if similarity_weight > 0 and not user_likes.empty else None
+    if index is not None and index.built_from(poi_file):
+        similarity = index.similar_to(liked_ids.to_numpy())
+        if not similarity.empty and similarity.iloc[0] > 0:
+            similarity = similarity / similarity.iloc[0]
+            sources["similarity"] = (similarity_weight, scored_pois["poi_id"].map(similarity).fillna(0.0).astype(float))
+
+    # What users with similar histories interacted with (see collaborative.py);
+    # None unless the model was trained on this history
+    cf = cf_scores_for_user(user_id, history_file) if cf_weight > 0 else None
+    if cf is not None:
+        cf = scored_pois["poi_id"].map(cf).astype(float)
+        low, high = cf.min(), cf.max()
+        if high > low:
+            sources["cf_score"] = (cf_weight, ((cf - low) / (high - low)).fillna(0.0))
+
+    if sources:
+        score = (1 - sum(weight for weight, _ in sources.values())) * scored_pois["score"]
+        for weight, values in sources.values():
+            score = score + weight * values
+        scored_pois = scored_pois.assign(
+            nb_score=scored_pois["score"],
+            **{name: values for name, (_, values) in sources.items()},
+            score=score,
+        ).sort_values("score", ascending=False, kind="stable")
 
     if not user_likes.empty:
         base_country = user_likes["country"].value_counts().idxmax()
         country_filtered = scored_pois[scored_pois["country"] == base_country]
         if len(country_filtered) >= top_n:
-            return country_filtered.head(top_n)
+            return country_filtered.head(top_n), base_country
 
     # Fallback: highest average scoring country
-    country_avg_scores = scored_pois.groupby("country")["score"].mean().sort_values(ascending=False)
+    country_avg_scores = scored_pois.groupby("country", observed=True)["score"].mean().sort_values(ascending=False)
     for country in country_avg_scores.index:
         country_filtered = scored_pois[scored_pois["country"] == country]
         if len(country_filtered) >= top_n:
-            return country_filtered.head(top_n)
+            return country_filtered.head(top_n), None
 
     # Final fallback: top_n overall
     print("Returning top_n POIs without country filter (insufficient regional density).")
-    return scored_pois.head(top_n)
+    return scored_pois.head(top_n), None
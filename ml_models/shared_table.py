@@ -0,0 +1,111 @@
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+
+def _block(size):
+    # Zero-size segments are not allowed
+    return shared_memory.SharedMemory(create=True, size=max(int(size), 1))
+
+
+def _attach(name):
+    try:
+        # Workers must not unlink the owner's segments when they exit
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedTable:
+    """
+    A DataFrame held in multiprocessing shared memory, so worker processes
+    read one physical copy instead of each loading their own. Numeric
+    columns are plain arrays, categoricals are integer codes plus their
+    (small) categories, and text is one UTF-8 buffer with offsets that is
+    only decoded for the rows a worker takes.
+
+    The creating process owns the segments and must call unlink(); workers
+    rebuild the table from `spec` (a small picklable dict) with attach().
+    """
+
+    def __init__(self, spec, blocks, owner=False):
+        self.spec = spec
+        self._blocks = blocks
+        self._owner = owner
+        self.columns = {}
+        for col, (kind, parts, extra) in spec["columns"].items():
+            arrays = [np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf) for name, dtype, shape in parts]
+            self.columns[col] = (kind, arrays, extra)
+
+    @classmethod
+    def create(cls, frame):
+        blocks, columns = {}, {}
+
+        def put(values):
+            values = np.ascontiguousarray(values)
+            block = _block(values.nbytes)
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[...] = values
+            blocks[block.name] = block
+            return block.name, values.dtype.str, values.shape
+
+        for col in frame.columns:
+            series = frame[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                columns[col] = ("categorical", [put(series.cat.codes.to_numpy())], list(series.cat.categories))
+            elif pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+                columns[col] = ("numeric", [put(series.to_numpy())], None)
+            else:
+                encoded = [str(value).encode("utf-8") for value in series.to_numpy()]
+                offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+                offsets[1:] = np.cumsum([len(value) for value in encoded])
+                data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+                columns[col] = ("text", [put(data), put(offsets)], None)
+
+        spec = {"rows": len(frame), "columns": columns}
+        return cls(spec, blocks, owner=True)
+
+    @classmethod
+    def attach(cls, spec):
+        names = {name for _, parts, _ in spec["columns"].values() for name, _, _ in parts}
+        return cls(spec, {name: _attach(name) for name in names})
+
+    def __len__(self):
+        return self.spec["rows"]
+
+    def codes(self, col, values):
+        """Categorical codes of `values` in column `col` (-1 where absent)."""
+        categories = {value: code for code, value in enumerate(self.columns[col][2])}
+        return np.array([categories.get(value, -1) for value in values], dtype=np.int64)
+
+    def where(self, **equals):
+        """Row positions whose categorical columns equal the given values."""
+        mask = np.ones(len(self), dtype=bool)
+        for col, value in equals.items():
+            mask &= self.columns[col][1][0] == self.codes(col, [value])[0]
+        return np.flatnonzero(mask)
+
+    def take(self, positions):
+        """The rows at `positions` as an ordinary (private) DataFrame."""
+        positions = np.asarray(positions, dtype=np.int64)
+        data = {}
+        for col, (kind, arrays, extra) in self.columns.items():
+            if kind == "categorical":
+                data[col] = pd.Categorical.from_codes(arrays[0][positions], categories=extra)
+            elif kind == "numeric":
+                data[col] = arrays[0][positions].copy()
+            else:
+                buffer, offsets = arrays
+                data[col] = [bytes(buffer[offsets[i]:offsets[i + 1]]).decode("utf-8") for i in positions]
+        return pd.DataFrame(data, index=pd.RangeIndex(len(positions)))
+
+    def close(self):
+        self.columns = {}
+        for block in self._blocks.values():
+            block.close()
+
+    def unlink(self):
+        """Closes and frees the segments (owner only)."""
+        self.close()
+        if self._owner:
+            for block in self._blocks.values():
+                block.unlink()
@@ -0,0 +1,288 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from ml_models.poi_catalog import get_catalog, POI_FILE
+
+INDEX_DIR = "models/similarity_index"
+
+# Neighbours kept per POI
+DEFAULT_K = 20
+
+# Feature weights: how far apart two POIs are per unit of difference.
+# Category is not a feature: neighbours are only searched within a category.
+CLIMATES = ["cold", "temperate", "warm"]
+BUDGET_LEVELS = {"low": 0, "medium": 1, "high": 2}
+WEIGHTS = {"climate": 1.0, "budget": 0.5, "duration": 0.25, "rating": 1.0, "geo": 2.0}
+
+# Distance (km) at which two POIs count as one unit apart geographically
+GEO_SCALE_KM = 50.0
+EARTH_RADIUS_KM = 6371.0
+
+ARRAYS = ["poi_ids", "neighbours", "similarities", "features", "blocks"]
+
+
+def poi_features(pois):
+    """
+    Dense feature rows plus a block key per POI. Neighbours are only searched
+    within a block: the category, or (category, location) when the catalog
+    has no coordinates to measure closeness with.
+    """
+    climate = pois["climate"].astype(str).str.strip().str.lower()
+    budget = pois["budget"].astype(str).str.strip().str.lower().map(BUDGET_LEVELS).fillna(1).to_numpy()
+    columns = [
+        np.column_stack([(climate == c).to_numpy() for c in CLIMATES]) * WEIGHTS["climate"],
+        (budget / 2.0)[:, None] * WEIGHTS["budget"],
+        pd.to_numeric(pois["duration_hours"], errors="coerce").fillna(2).to_numpy()[:, None] * WEIGHTS["duration"],
+        (pd.to_numeric(pois["rating"], errors="coerce").fillna(0).to_numpy() / 5.0)[:, None] * WEIGHTS["rating"],
+    ]
+
+    category = pois["category"].astype(str).str.strip()
+    has_coords = all(col in pois.columns for col in ["latitude", "longitude"]) \
+        and pois[["latitude", "longitude"]].notna().all().all()
+    if has_coords:
+        # Unit-sphere coordinates: chord length ~ great-circle distance at city scale
+        lat = np.radians(pois["latitude"].to_numpy(dtype=float))
+        lon = np.radians(pois["longitude"].to_numpy(dtype=float))
+        xyz = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+        columns.append(xyz * (EARTH_RADIUS_KM / GEO_SCALE_KM) * WEIGHTS["geo"])
+        blocks = category
+    else:
+        columns.append(np.zeros((len(pois), 3)))
+        blocks = category + "|" + pois["location"].astype(str).str.strip()
+
+    return np.hstack(columns).astype(np.float32), blocks.to_numpy(dtype=str)
+
+
+def _neighbours_in_block(features, k, query=None):
+    """k nearest rows of `features` for each row of `query` (default: itself, excluding self)."""
+    from scipy.spatial import cKDTree
+
+    self_query = query is None
+    query = features if self_query else query
+    wanted = min(k + self_query, len(features))
+    if wanted == 0:
+        return np.empty((len(query), 0), dtype=np.int64), np.empty((len(query), 0))
+    distances, rows = cKDTree(features).query(query, k=wanted)
+    distances, rows = distances.reshape(len(query), wanted), rows.reshape(len(query), wanted)
+    if self_query:
+        # Drop each row's own entry (duplicates may come first, so mask by identity)
+        own = rows == np.arange(len(query))[:, None]
+        own[own.sum(axis=1) == 0, -1] = True
+        keep = ~own
+        rows = rows[keep].reshape(len(query), wanted - 1)
+        distances = distances[keep].reshape(len(query), wanted - 1)
+    return rows, distances
+
+
+def _similarity(distances):
+    return (1.0 / (1.0 + distances)).astype(np.float32)
+
+
+def _pad(rows, sims, k):
+    """Pads neighbour lists to width k (-1 / 0.0) so every POI has a fixed-size row."""
+    n = len(rows)
+    out_rows = np.full((n, k), -1, dtype=np.int64)
+    out_sims = np.zeros((n, k), dtype=np.float32)
+    width = min(k, rows.shape[1])
+    out_rows[:, :width] = rows[:, :width]
+    out_sims[:, :width] = sims[:, :width]
+    return out_rows, out_sims
+
+
+class SimilarityIndex:
+    """
+    Top-K content neighbours per POI, stored as fixed-width arrays in .npy
+    files under `index_dir`: row i holds the neighbour POI ids and
+    similarities of poi_ids[i] (sorted, so lookups are a binary search).
+    Opened with mmap, so worker processes share the pages instead of
+    each holding a copy.
+    """
+
+    def __init__(self, poi_ids, neighbours, similarities, features, blocks, k=DEFAULT_K, version=1,
+                 poi_file=None):
+        self.poi_ids = poi_ids
+        self.neighbours = neighbours
+        self.similarities = similarities
+        self.features = features
+        self.blocks = blocks
+        self.k = k
+        self.version = version
+        # Catalog the index was built from (None: built before it was recorded, i.e. POI_FILE)
+        self.poi_file = poi_file
+
+    @classmethod
+    def build(cls, pois, k=DEFAULT_K):
+        pois = pois.sort_values("poi_id", kind="stable")
+        poi_ids = pois["poi_id"].to_numpy(dtype=np.int64)
+        features, blocks = poi_features(pois)
+
+        neighbours = np.full((len(pois), k), -1, dtype=np.int64)
+        similarities = np.zeros((len(pois), k), dtype=np.float32)
+        for positions in pd.Series(np.arange(len(pois))).groupby(blocks, sort=False).indices.values():
+            rows, distances = _neighbours_in_block(features[positions], k)
+            rows, sims = _pad(positions[rows], _similarity(distances), k)
+            neighbours[positions] = np.where(rows >= 0, poi_ids[np.maximum(rows, 0)], -1)
+            similarities[positions] = sims
+        return cls(poi_ids, neighbours, similarities, features, blocks, k)
+
+    @classmethod
+    def load(cls, index_dir=INDEX_DIR, mmap=True):
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS}
+        return cls(k=meta["k"], version=meta["version"], poi_file=meta.get("poi_file"), **arrays)
+
+    def save(self, index_dir=INDEX_DIR):
+        """Writes every array to a temp file and renames it into place, meta.json last."""
+        os.makedirs(index_dir, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp.npy"
+        for name in ARRAYS:
+            path = os.path.join(index_dir, f"{name}.npy")
+            np.save(path + suffix, np.asarray(getattr(self, name)))
+            os.replace(path + suffix, path)
+        meta_path = os.path.join(index_dir, "meta.json")
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"k": self.k, "version": self.version, "size": len(self.poi_ids),
+                       "poi_file": self.poi_file}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def __len__(self):
+        return len(self.poi_ids)
+
+    def built_from(self, poi_file):
+        """True if the index covers the catalog in `poi_file`."""
+        return os.path.abspath(poi_file) == os.path.abspath(self.poi_file or POI_FILE)
+
+    def _rows(self, poi_ids):
+        poi_ids = np.asarray(poi_ids, dtype=np.int64).ravel()
+        if len(self.poi_ids) == 0 or len(poi_ids) == 0:
+            return np.empty(0, dtype=np.intp)
+        rows = np.minimum(np.searchsorted(self.poi_ids, poi_ids), len(self.poi_ids) - 1)
+        return rows[np.asarray(self.poi_ids[rows]) == poi_ids]
+
+    def neighbours_of(self, poi_id):
+        """(neighbour ids, similarities) for one POI, best first; empty if unknown."""
+        rows = self._rows([poi_id])
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids, sims = np.asarray(self.neighbours[rows[0]]), np.asarray(self.similarities[rows[0]])
+        return ids[ids >= 0], sims[ids >= 0]
+
+    def similar_to(self, poi_ids, exclude=(), top_n=None):
+        """
+        Candidates similar to any of `poi_ids`, scored by summed similarity
+        (a POI close to several liked ones ranks higher). Returns a Series
+        of similarity indexed by poi_id, best first, without `poi_ids`/`exclude`.
+        """
+        rows = self._rows(poi_ids)
+        if len(rows) == 0:
+            return pd.Series(dtype=np.float32, name="similarity")
+        ids = np.asarray(self.neighbours[rows]).ravel()
+        sims = np.asarray(self.similarities[rows]).ravel()
+        keep = (ids >= 0) & ~np.isin(ids, np.asarray(list(poi_ids) + list(exclude), dtype=np.int64))
+        if not keep.any():
+            return pd.Series(dtype=np.float32, name="similarity")
+
+        candidates, inverse = np.unique(ids[keep], return_inverse=True)
+        totals = np.bincount(inverse, weights=sims[keep]).astype(np.float32)
+        order = np.argsort(-totals, kind="stable")
+        if top_n is not None:
+            order = order[:top_n]
+        return pd.Series(totals[order], index=pd.Index(candidates[order], name="poi_id"), name="similarity")
+
+    def add_pois(self, pois):
+        """
+        Adds new POIs: each gets its own top-K within its block, and existing
+        POIs that the newcomers are closer to than their current K-th
+        neighbour take them in. Only the newcomers' neighbourhoods are
+        searched, so this is an approximate reverse-kNN update; a full
+        rebuild restores exact lists.
+        """
+        pois = pois[~pois["poi_id"].isin(self.poi_ids)].sort_values("poi_id", kind="stable")
+        if pois.empty:
+            return 0
+
+        new_ids = pois["poi_id"].to_numpy(dtype=np.int64)
+        new_features, new_blocks = poi_features(pois)
+        poi_ids = np.concatenate([np.asarray(self.poi_ids), new_ids])
+        features = np.vstack([np.asarray(self.features), new_features])
+        blocks = np.concatenate([np.asarray(self.blocks), new_blocks])
+        neighbours = np.vstack([np.asarray(self.neighbours), np.full((len(pois), self.k), -1, dtype=np.int64)])
+        similarities = np.vstack([np.asarray(self.similarities), np.zeros((len(pois), self.k), dtype=np.float32)])
+
+        new_rows = np.arange(len(self.poi_ids), len(poi_ids))
+        block_of = pd.Series(np.arange(len(poi_ids))).groupby(blocks, sort=False).indices
+        for block in np.unique(new_blocks):
+            members = block_of[block]
+            query_rows = new_rows[new_blocks == block]
+            rows, distances = _neighbours_in_block(features[members], self.k + 1, features[query_rows])
+            sims = _similarity(distances)
+            for query_row, found, found_sims in zip(query_rows, members[rows], sims):
+                others = found != query_row
+                found, found_sims = found[others][:self.k], found_sims[others][:self.k]
+                neighbours[query_row, :len(found)] = poi_ids[found]
+                similarities[query_row, :len(found)] = found_sims
+                # Reverse update: an existing neighbour keeps the newcomer if it beats its weakest entry
+                for other, sim in zip(found, found_sims):
+                    if other in query_rows:
+                        continue
+                    weakest = int(np.argmin(similarities[other]))
+                    if sim > similarities[other, weakest] or neighbours[other, weakest] < 0:
+                        neighbours[other, weakest] = poi_ids[query_row]
+                        similarities[other, weakest] = sim
+                        order = np.argsort(-similarities[other], kind="stable")
+                        neighbours[other], similarities[other] = neighbours[other, order], similarities[other, order]
+
+        order = np.argsort(poi_ids, kind="stable")
+        self.poi_ids, self.features, self.blocks = poi_ids[order], features[order], blocks[order]
+        self.neighbours, self.similarities = neighbours[order], similarities[order]
+        self.version += 1
+        return len(pois)
+
+
+def build_similarity_index(poi_file=POI_FILE, k=DEFAULT_K, index_dir=INDEX_DIR):
+    index = SimilarityIndex.build(get_catalog(poi_file).frame(), k)
+    index.poi_file = os.path.abspath(poi_file)
+    index.save(index_dir)
+    _indexes.pop(os.path.abspath(index_dir), None)
+    print(f"Similarity index built for {len(index)} POIs (k={k}).")
+    return index
+
+
+def update_similarity_index(poi_file=POI_FILE, index_dir=INDEX_DIR):
+    """Adds catalog POIs missing from the saved index; returns how many were added."""
+    index = SimilarityIndex.load(index_dir, mmap=False)
+    added = index.add_pois(get_catalog(poi_file).frame())
+    if added:
+        index.poi_file = os.path.abspath(poi_file)
+        index.save(index_dir)
+        _indexes.pop(os.path.abspath(index_dir), None)
+    return added
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_similarity_index(index_dir=INDEX_DIR):
+    """
+    Memory-mapped index for `index_dir`, or None if none has been built.
+    Reopened when meta.json changes (a rebuild or update in any process).
+    """
+    meta_path = os.path.join(index_dir, "meta.json")
+    try:
+        mtime = os.stat(meta_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    key = os.path.abspath(index_dir)
+    cached = _indexes.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _indexes_lock:
+        index = SimilarityIndex.load(index_dir)
+        _indexes[key] = (mtime, index)
+    return index
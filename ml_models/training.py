@@ -0,0 +1,216 @@
+import argparse
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from ml_models import destination_classifier, preference_scorer
+from ml_models.poi_catalog import get_catalog
+from ml_models.model_registry import (
+    registry, atomic_write_text, write_manifest, publish_lock, new_version, prune_versions,
+    CURRENT_FILE, VERSIONS_DIR, KEEP_VERSIONS
+)
+from personalization.history_manager import history_with_cursor
+
+POI_FILE = "data/POIs_draft1.csv"
+HISTORY_FILE = "data/user_history_draft1.csv"
+
+# Catalog columns label-encoded once, on the whole catalog, for both models
+ENCODED_COLS = ["climate", "category", "budget", "location", "country"]
+SHARED_ENCODERS = "encoders.pkl"
+
+# Hyperparameter search: CV_FOLDS-fold cross-validation, N_JOBS=-1 uses all cores
+CV_FOLDS = 3
+N_JOBS = -1
+DESTINATION_GRID = {"max_depth": [None, 8, 16, 32], "min_samples_leaf": [1, 2, 5]}
+PREFERENCE_GRID = {"var_smoothing": [1e-9, 1e-7, 1e-5, 1e-3]}
+
+
+def build_feature_store(poi_file=POI_FILE, history_file=HISTORY_FILE):
+    """
+    Reads the catalog and the history once. Returns a dict with the shared
+    encoders (one LabelEncoder per ENCODED_COLS column), `pois`: the catalog
+    features as codes, and `positions`/`liked`: each history row's catalog
+    position and label. Rows for POIs missing from the catalog are dropped,
+    as the merge in preference_scorer does. `history_rows`/`history_cursor`
+    checkpoint the history snapshot read.
+    """
+    from sklearn.preprocessing import LabelEncoder
+
+    pois = get_catalog(poi_file).frame()
+    history, cursor = history_with_cursor(history_file)
+
+    encoders, features = {}, {}
+    for col in ENCODED_COLS:
+        le = LabelEncoder()
+        features[col] = le.fit_transform(pois[col])
+        encoders[col] = le
+    for col in ["duration_hours", "rating"]:
+        features[col] = pois[col].to_numpy()
+
+    positions = pd.Index(pois["poi_id"]).get_indexer(history["poi_id"])
+    known = positions >= 0
+    return {
+        "encoders": encoders,
+        "pois": pd.DataFrame(features),
+        "positions": positions[known],
+        "liked": history["liked"].to_numpy()[known],
+        "history_rows": len(history),
+        "history_cursor": cursor,
+    }
+
+
+def _fit(estimator, grid, X, y):
+    """
+    The best estimator of a cross-validated grid search (refitted on all
+    rows) and its search summary. Too few rows to cross-validate fits
+    `estimator` as is.
+    """
+    from sklearn.model_selection import GridSearchCV
+
+    counts = np.unique(y, return_counts=True)[1]
+    folds = min(CV_FOLDS, int(counts.max())) if len(counts) else 0
+    if len(counts) < 2 or folds < 2:
+        return estimator.fit(X, y), {"params": estimator.get_params(), "cv_score": None}
+
+    search = GridSearchCV(estimator, grid, cv=folds, n_jobs=N_JOBS)
+    search.fit(X, y)
+    return search.best_estimator_, {"params": search.best_params_, "cv_score": float(search.best_score_)}
+
+
+def train_destination(store, build_lookup=True):
+    """Destination classifier on the shared codes; returns (model, lookup table or None, summary)."""
+    from sklearn.tree import DecisionTreeClassifier
+
+    pois = store["pois"]
+    model, summary = _fit(DecisionTreeClassifier(random_state=0), DESTINATION_GRID,
+                          pois[destination_classifier.FEATURE_COLS], pois["category"].to_numpy())
+
+    encoders = store["encoders"]
+    lookup_size = np.prod([len(encoders[col].classes_) for col in destination_classifier.FEATURE_COLS])
+    lookup = None
+    if build_lookup and lookup_size <= destination_classifier.MAX_LOOKUP_SIZE:
+        lookup = destination_classifier.build_lookup_table(model, encoders)
+    return model, lookup, summary
+
+
+def train_preference(store):
+    """Naive Bayes preference scorer on the shared codes; returns (model, summary)."""
+    from sklearn.naive_bayes import GaussianNB
+
+    data = store["pois"].take(store["positions"])
+    model, summary = _fit(GaussianNB(), PREFERENCE_GRID, data[preference_scorer.FEATURE_COLS], store["liked"])
+    # Checkpoint for incremental updates (see update_preference_model)
+    model.history_rows_ = store["history_rows"]
+    model.history_cursor_ = store["history_cursor"]
+    model.version_ = 1
+    return model, summary
+
+
+def publish(artifacts, directory, info=None, keep=KEEP_VERSIONS):
+    """
+    Writes `artifacts` ({legacy name: (obj, file, mmap)}) as a new version
+    under directory/versions and points CURRENT at it. The version is
+    written to a hidden staging directory and renamed into place before
+    CURRENT is replaced, so readers see either the old version or the whole
+    new one. Objects sharing a file are written once; a None object is
+    listed but not written (the registry then finds no file for it).
+    Returns the manifest.
+    """
+    from joblib import dump
+
+    versions_dir = os.path.join(directory, VERSIONS_DIR)
+    os.makedirs(versions_dir, exist_ok=True)
+    version = new_version(versions_dir)
+    staging = os.path.join(versions_dir, f".{version}.{os.getpid()}.tmp")
+    os.makedirs(staging)
+    try:
+        entries, sizes = {}, {}
+        for name, (obj, file, mmap) in artifacts.items():
+            if obj is not None and file not in sizes:
+                # Uncompressed, so numpy arrays can be memory-mapped on load
+                dump(obj, os.path.join(staging, file))
+                sizes[file] = os.path.getsize(os.path.join(staging, file))
+            entries[name] = {"file": file, "bytes": sizes.get(file), "mmap": mmap}
+
+        manifest = {"version": version, "created_at": time.time(), **(info or {}), "artifacts": entries}
+        write_manifest(staging, manifest)
+        os.rename(staging, os.path.join(versions_dir, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    with publish_lock(directory):
+        atomic_write_text(version, os.path.join(directory, CURRENT_FILE))
+        registry.invalidate()
+        prune_versions(directory, keep)
+    return manifest
+
+
+def train_models(poi_file=POI_FILE, history_file=HISTORY_FILE, build_lookup=True, keep=KEEP_VERSIONS):
+    """
+    One training pass for the destination classifier and the preference
+    scorer: the data is read and encoded once, both models are searched
+    and fitted in parallel, and the artifacts are published together as a
+    new version of the models directory. Returns the manifest.
+    """
+    paths = {
+        "destination_model": destination_classifier.MODEL_PATH,
+        "destination_encoders": destination_classifier.ENCODER_PATH,
+        "destination_lookup": destination_classifier.LOOKUP_PATH,
+        "preference_model": preference_scorer.MODEL_PATH,
+        "preference_encoders": preference_scorer.ENCODER_PATH,
+    }
+    directories = {os.path.dirname(os.path.abspath(path)) for path in paths.values()}
+    if len(directories) != 1:
+        raise ValueError("Model paths must share one directory to be published as a version.")
+
+    start = time.perf_counter()
+    store = build_feature_store(poi_file, history_file)
+    encoded = time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        destination = pool.submit(train_destination, store, build_lookup)
+        preference = pool.submit(train_preference, store)
+        destination_model, lookup, destination_summary = destination.result()
+        preference_model, preference_summary = preference.result()
+
+    names = {key: os.path.basename(path) for key, path in paths.items()}
+    encoders = store["encoders"]
+    artifacts = {
+        names["destination_model"]: (destination_model, names["destination_model"], False),
+        names["destination_lookup"]: (lookup, names["destination_lookup"], True),
+        names["preference_model"]: (preference_model, names["preference_model"], False),
+        names["destination_encoders"]: (encoders, SHARED_ENCODERS, False),
+        names["preference_encoders"]: (encoders, SHARED_ENCODERS, False),
+    }
+    info = {
+        "poi_file": poi_file,
+        "history_file": history_file,
+        "catalog_rows": len(store["pois"]),
+        "history_rows": store["history_rows"],
+        "encode_seconds": encoded,
+        "train_seconds": time.perf_counter() - start,
+        "models": {"destination": destination_summary, "preference": preference_summary},
+    }
+    manifest = publish(artifacts, directories.pop(), info, keep)
+
+    print(f"Models trained in {info['train_seconds']:.1f}s and published as version {manifest['version']}.")
+    for model, summary in info["models"].items():
+        print(f"{model}: {summary['params']} (cv score: {summary['cv_score']})")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and publish the destination and preference models")
+    parser.add_argument("--pois", default=POI_FILE)
+    parser.add_argument("--history", default=HISTORY_FILE)
+    parser.add_argument("--no-lookup", action="store_true", help="Skip the compiled destination lookup table.")
+    parser.add_argument("--keep", type=int, default=KEEP_VERSIONS, help="Older versions to keep.")
+    args = parser.parse_args()
+    train_models(args.pois, args.history, build_lookup=not args.no_lookup, keep=args.keep)
+
+
+if __name__ == "__main__":
+    main()
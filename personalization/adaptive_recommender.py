@@ -1,55 +1,108 @@
-import pandas as pd
+import heapq
+import numpy as np
+from ml_models.poi_catalog import get_catalog
+from personalization.history_manager import load_history
+from ml_models.recommendation_store import get_recommendation_store, read_through
+from storage.columnar import get_table, split_interests
+
+# users table -> {user_id: row position}, rebuilt when get_table reloads it
+_user_rows = {}
 
 def load_user(user_id, users_csv="data/users_draft1.csv"):
-    df = pd.read_csv(users_csv)
-    user = df[df["user_id"] == user_id]
-    if user.empty:
+    df = get_table(users_csv)
+    cached = _user_rows.get(users_csv)
+    if cached is None or cached[0] is not df:
+        # First row wins for duplicated ids
+        rows = dict(zip(df["user_id"].to_numpy()[::-1].tolist(), range(len(df) - 1, -1, -1)))
+        cached = _user_rows[users_csv] = (df, rows)
+    position = cached[1].get(user_id)
+    if position is None:
         raise ValueError(f"No user found with user_id={user_id}")
-    return user.iloc[0]
+    return df.iloc[position]
 
 def load_pois(pois_csv="data/POIs_draft1.csv"):
-    return pd.read_csv(pois_csv)
+    return get_catalog(pois_csv).frame()
 
 def load_user_history(user_id, history_csv="data/user_history_draft1.csv"):
-    df = pd.read_csv(history_csv)
+    df = load_history(history_csv)
     return df[df["user_id"] == user_id]
 
-def recommend_pois(user_id, top_n=5):
-    user = load_user(user_id)
-    pois = load_pois()
-    history = load_user_history(user_id)
-
-    # Basic personalization filters
-    preferred_climate = user["preferred_climate"]
-    preferred_budget = user["preferred_budget"]
-    interests = [cat.strip() for cat in user["interest_categories"].split(",")]
-
-    # Filter POIs by climate and budget matching user preferences
-    filtered = pois[
-        (pois["climate"].str.lower() == preferred_climate.lower()) &
-        (pois["budget"].str.lower() == preferred_budget.lower()) &
-        (pois["category"].str.lower().isin([i.lower() for i in interests]))
-    ].copy()
-
-    if filtered.empty:
+def candidate_pois(user, catalog):
+    """
+    POIs matching the user's climate, budget and interests, from the
+    catalog's normalised (climate, budget, category) index; without the
+    climate when nothing matches. Returns (candidates, relaxed).
+    """
+    interests = split_interests(user["interest_categories"])
+    candidates = catalog.matching(user["preferred_climate"], user["preferred_budget"], interests)
+    relaxed = candidates.empty
+    if relaxed:
         print("No POIs match your preferences exactly. Relaxing filters...")
         # Relax the filter by only budget and interest category
-        filtered = pois[
-            (pois["budget"].str.lower() == preferred_budget.lower()) &
-            (pois["category"].str.lower().isin([i.lower() for i in interests]))
-        ].copy()
+        candidates = catalog.matching(None, user["preferred_budget"], interests)
+    return candidates, relaxed
+
+def top_candidates(candidates, history, top_n=5):
+    # Score POIs by rating (normalised to 0-1) plus 0.5 for POIs the user liked
+    liked = np.isin(candidates["poi_id"].to_numpy(), history.loc[history["liked"] == 1, "poi_id"].to_numpy())
+    final_score = candidates["rating"].to_numpy(dtype=float) / 5.0 + np.where(liked, 0.5, 0.0)
+
+    # Only candidates reaching the N-th best score can be picked; nlargest
+    # then keeps their (catalog) order among ties, like a stable sort
+    if len(final_score) > top_n > 0:
+        contenders = np.flatnonzero(final_score >= np.partition(final_score, -top_n)[-top_n])
+    else:
+        contenders = range(len(final_score))
+    best = heapq.nlargest(top_n, contenders, key=final_score.__getitem__)
+    recommendations = candidates.iloc[best][["poi_id", "name", "category", "rating"]]
+    return recommendations.assign(final_score=final_score[best])
+
+def rank_pois(user, catalog, history, top_n=5):
+    """
+    Top POIs for a loaded user row and that user's history. Returns
+    (recommendations, relaxed); relaxed is True when nothing matched the
+    climate preference and the filter was dropped. Costs O(candidates),
+    not O(catalog).
+    """
+    candidates, relaxed = candidate_pois(user, catalog)
+    return top_candidates(candidates, history, top_n), relaxed
+
+def recommend_pois(user_id, top_n=5):
+    def rank():
+        recommendations, relaxed = rank_pois(load_user(user_id), get_catalog(), load_user_history(user_id), top_n)
+        return recommendations, None, not relaxed
 
-    # Score POIs by rating and user history (liked or booked increases score)
-    filtered["score"] = filtered["rating"] / 5.0  # normalize rating between 0-1
+    # Served from the materialised top-K when one exists (see recommendation_store.py)
+    store = get_recommendation_store()
+    if store is not None and store.serves():
+        return read_through(store, "adaptive", user_id, top_n, rank)
+    return rank()[0]
 
-    liked_pois = history[history["liked"] == 1]["poi_id"].tolist()
-    filtered["final_score"] = filtered.apply(
-        lambda row: row["score"] + (0.5 if row["poi_id"] in liked_pois else 0), axis=1
-    )
+def recommend_pois_many(user_ids, top_n=5, users_csv="data/users_draft1.csv", pois_csv="data/POIs_draft1.csv",
+                        history_csv="data/user_history_draft1.csv"):
+    """
+    recommend_pois for many users, yielding (user_id, recommendations,
+    relaxed). The tables are read once for the batch and users with the
+    same preferences share one candidate lookup; unknown users are skipped.
+    """
+    catalog = get_catalog(pois_csv)
+    history = load_history(history_csv)
+    by_user = history.groupby("user_id", sort=False)
+    profiles = {}
 
-    recommendations = filtered.sort_values("final_score", ascending=False).head(top_n)
+    for user_id in user_ids:
+        try:
+            user = load_user(user_id, users_csv)
+        except ValueError:
+            continue
+        interests = split_interests(user["interest_categories"])
+        profile = (user["preferred_climate"], user["preferred_budget"], tuple(interests))
+        if profile not in profiles:
+            profiles[profile] = candidate_pois(user, catalog)
+        candidates, relaxed = profiles[profile]
 
-    return recommendations[["poi_id", "name", "category", "rating", "final_score"]]
+        user_history = by_user.get_group(user_id) if user_id in by_user.groups else history.iloc[:0]
+        yield user_id, top_candidates(candidates, user_history, top_n), relaxed
 
 def main():
     user_id = 2  #testing
@@ -1,31 +1,356 @@
 import pandas as pd
+import csv
+import io
 import os
+import threading
+import time
+from contextlib import contextmanager
+from storage.columnar import read_table, table_exists, columnar_path, write_columnar
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
 
 HISTORY_FILE = "data/user_history_draft1.csv"
+HISTORY_COLUMNS = ["user_id", "poi_id", "liked", "interaction_type", "timestamp"]
+
+# How long a commit leader waits for other writers to join its batch
+COMMIT_DELAY = 0.002
+
+
+def log_path(history_file=HISTORY_FILE):
+    return history_file + ".log"
+
+
+def rotated_log_path(history_file=HISTORY_FILE):
+    # The log as it was at the last compaction (already folded into the base)
+    return log_path(history_file) + ".1"
+
+
+def _generation(history_file):
+    # Number of log rotations so far; a log cursor is (generation, offset)
+    try:
+        with open(log_path(history_file) + ".gen") as handle:
+            return int(handle.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+@contextmanager
+def _file_lock(history_file, exclusive):
+    # Advisory lock shared by every process touching this history table
+    with open(history_file + ".lock", "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _read_log(path, offset=0):
+    """Complete rows of the log at `path` after byte `offset`, and the offset just past them."""
+    try:
+        with open(path, "rb") as handle:
+            handle.seek(offset)
+            data = handle.read()
+    except FileNotFoundError:
+        return pd.DataFrame(columns=HISTORY_COLUMNS), offset
+    # A crash mid-write can leave a partial last line; it was never committed
+    data = data[:data.rfind(b"\n") + 1]
+    if not data:
+        return pd.DataFrame(columns=HISTORY_COLUMNS), offset
+    return pd.read_csv(io.BytesIO(data), names=HISTORY_COLUMNS, header=None), offset + len(data)
+
+
+def _truncate_partial_line(path, block_size=65536):
+    # The partial last line _read_log skips must go before the next append,
+    # or the first committed row would be glued onto it and lost
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as handle:
+        end = handle.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        handle.seek(end - 1)
+        if handle.read(1) == b"\n":
+            return
+        while end > 0:
+            start = max(0, end - block_size)
+            handle.seek(start)
+            newline = handle.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                handle.truncate(start + newline + 1)
+                return
+            end = start
+        handle.truncate(0)
+
+
+def _read_snapshot(history_file):
+    """The committed rows and the log cursor just past them (see read_log_since)."""
+    base = read_table(history_file) if table_exists(history_file) else pd.DataFrame(columns=HISTORY_COLUMNS)
+    log, offset = _read_log(log_path(history_file))
+    cursor = [_generation(history_file), offset]
+    if log.empty:
+        return base, cursor
+    if base.empty:
+        return log, cursor
+    return pd.concat([base, log], ignore_index=True), cursor
+
+
+class InteractionLog:
+    """
+    Append-only log in front of the history CSV with group commit.
+
+    Concurrent save_interaction calls queue their rows; one caller becomes
+    the commit leader, appends the whole batch under the file lock and
+    fsyncs once, then wakes everyone in the batch. A write costs O(1)
+    regardless of history size; compact() folds the log into the base CSV.
+    """
+
+    def __init__(self, history_file=HISTORY_FILE, commit_delay=COMMIT_DELAY):
+        self.history_file = history_file
+        self.commit_delay = commit_delay
+        self._cond = threading.Condition()
+        self._pending = []
+        self._appended = 0
+        self._committed = 0
+        self._flushing = False
+        self._failures = []
+        self.commits = 0
+
+    def append(self, record):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerow([record[col] for col in HISTORY_COLUMNS])
+
+        with self._cond:
+            self._pending.append(buffer.getvalue())
+            self._appended += 1
+            seq = self._appended
+
+            while self._committed < seq:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                self._flushing = True
+                self._cond.release()
+                try:
+                    time.sleep(self.commit_delay)
+                finally:
+                    self._cond.acquire()
+                batch, self._pending = self._pending, []
+                first, last = self._committed + 1, self._appended
+
+                self._cond.release()
+                error = None
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    error = e
+                finally:
+                    self._cond.acquire()
+                    self._flushing = False
+                    self._committed = last
+                    if error is not None:
+                        self._failures = self._failures[-31:] + [(first, last, error)]
+                    self._cond.notify_all()
+
+            for first, last, error in self._failures:
+                if first <= seq <= last:
+                    raise error
+
+    def _write(self, lines):
+        with _file_lock(self.history_file, exclusive=True):
+            _truncate_partial_line(log_path(self.history_file))
+            with open(log_path(self.history_file), "a", newline="") as handle:
+                handle.write("".join(lines))
+                handle.flush()
+                os.fsync(handle.fileno())
+        self.commits += 1
+
+    def snapshot(self):
+        return self.snapshot_with_cursor()[0]
+
+    def snapshot_with_cursor(self):
+        """The committed rows and the log cursor just past them (see read_log_since)."""
+        with _file_lock(self.history_file, exclusive=False):
+            return _read_snapshot(self.history_file)
+
+    def compact(self):
+        """Rewrites the base CSV with the log folded in, then starts a new log."""
+        with _file_lock(self.history_file, exclusive=True):
+            history, _ = _read_snapshot(self.history_file)
+            tmp_path = self.history_file + ".compact.tmp"
+            history.to_csv(tmp_path, index=False)
+            with open(tmp_path, "rb+") as handle:
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, self.history_file)
+            # Keep an existing columnar copy current, or readers would fall back to the CSV
+            if os.path.exists(columnar_path(self.history_file)):
+                write_columnar(history, self.history_file)
+            path = log_path(self.history_file)
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                # Rotated rather than emptied, so a reader following the log
+                # by cursor can still finish the part it had not read yet
+                os.replace(path, rotated_log_path(self.history_file))
+                open(path, "w").close()
+                tmp_path = path + ".gen.tmp"
+                with open(tmp_path, "w") as handle:
+                    handle.write(str(_generation(self.history_file) + 1))
+                os.replace(tmp_path, path + ".gen")
+        return len(history)
+
+    def write_columnar(self):
+        """Writes the columnar copy of the base CSV (the log is still read on top of it)."""
+        with _file_lock(self.history_file, exclusive=True):
+            return write_columnar(pd.read_csv(self.history_file), self.history_file)
 
-def load_history():
-    if os.path.exists(HISTORY_FILE):
-        return pd.read_csv(HISTORY_FILE)
-    else:
-        return pd.DataFrame(columns=["user_id", "poi_id", "liked", "interaction_type", "timestamp"])
 
-def get_user_history(user_id):
-    history = load_history()
+_logs = {}
+_logs_lock = threading.Lock()
+_listeners = {}
+
+
+def get_interaction_log(history_file=HISTORY_FILE):
+    key = os.path.abspath(history_file)
+    with _logs_lock:
+        if key not in _logs:
+            _logs[key] = InteractionLog(key)
+        return _logs[key]
+
+
+def start_compaction(interval=300.0, history_file=HISTORY_FILE):
+    """Daemon thread that compacts the interaction log every `interval` seconds."""
+    interaction_log = get_interaction_log(history_file)
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                interaction_log.compact()
+            except Exception as e:
+                print(f"History compaction failed: {e}")
+
+    thread = threading.Thread(target=run, name="history-compaction", daemon=True)
+    thread.start()
+    return thread
+
+
+def add_interaction_listener(callback, history_file=HISTORY_FILE):
+    """Calls `callback(record)` after every committed save_interaction on this file."""
+    with _logs_lock:
+        _listeners.setdefault(os.path.abspath(history_file), []).append(callback)
+
+
+def remove_interaction_listener(callback, history_file=HISTORY_FILE):
+    with _logs_lock:
+        callbacks = _listeners.get(os.path.abspath(history_file), [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+
+def compact_history(history_file=HISTORY_FILE):
+    return get_interaction_log(history_file).compact()
+
+
+def write_columnar_history(history_file=HISTORY_FILE):
+    return get_interaction_log(history_file).write_columnar()
+
+
+def _read_log_since(history_file, cursor):
+    # Caller holds the history lock, so no compaction runs meanwhile
+    generation, offset = cursor
+    current = _generation(history_file)
+    if generation == current:
+        rows, offset = _read_log(log_path(history_file), offset)
+        return rows, [current, offset]
+    if generation != current - 1:
+        return None, cursor
+    rotated, _ = _read_log(rotated_log_path(history_file), offset)
+    rows, offset = _read_log(log_path(history_file))
+    if not rotated.empty:
+        rows = pd.concat([rotated, rows], ignore_index=True) if not rows.empty else rotated
+    return rows, [current, offset]
+
+
+@contextmanager
+def locked_history(history_file=HISTORY_FILE):
+    """
+    Holds the history's exclusive lock (writers in every process wait) for
+    read-modify-write jobs that must apply each row exactly once. Yields
+    read(since=None): (committed rows, log cursor), or with a cursor the
+    rows after it as read_log_since returns them. load_history would wait
+    on the lock, so use the yielded reader inside.
+    """
+    def read(since=None):
+        if since is None:
+            return _read_snapshot(history_file)
+        return _read_log_since(history_file, since)
+
+    with _file_lock(history_file, exclusive=True):
+        yield read
+
+
+def history_with_cursor(history_file=HISTORY_FILE):
+    """
+    The committed rows and the log cursor just past them, read together,
+    so a job trained on the rows can follow the log from the cursor with
+    read_log_since and never skip or repeat a row.
+    """
+    return get_interaction_log(history_file).snapshot_with_cursor()
+
+
+def read_log_since(cursor, history_file=HISTORY_FILE):
+    """
+    Rows committed after `cursor` and the cursor past them, reading only
+    the new part of the log (cost independent of total history). Returns
+    (None, cursor) when the rows can no longer be told apart, i.e. the log
+    was compacted more than once since `cursor` was taken or there is no
+    cursor; callers then fall back to a full read.
+    """
+    if cursor is None:
+        return None, cursor
+    with _file_lock(history_file, exclusive=False):
+        return _read_log_since(history_file, cursor)
+
+
+def log_token(history_file=HISTORY_FILE):
+    """(size, mtime) of the interaction log; changes with every commit, in any process."""
+    try:
+        stat = os.stat(log_path(history_file))
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def load_history(history_file=HISTORY_FILE):
+    return get_interaction_log(history_file).snapshot()
+
+def get_user_history(user_id, history_file=HISTORY_FILE):
+    history = load_history(history_file)
     return history[history["user_id"] == user_id]
 
-def get_positive_interactions(user_id):
-    history = get_user_history(user_id)
+def get_positive_interactions(user_id, history_file=HISTORY_FILE):
+    history = get_user_history(user_id, history_file)
     return history[history["liked"] == 1]
 
-def save_interaction(user_id, poi_id, liked, interaction_type="clicked"):
-    history = load_history()
-    new_entry = pd.DataFrame([{
+def save_interaction(user_id, poi_id, liked, interaction_type="clicked", history_file=HISTORY_FILE):
+    record = {
         "user_id": user_id,
         "poi_id": poi_id,
         "liked": liked,
         "interaction_type": interaction_type,
         "timestamp": pd.Timestamp.now()
-    }])
-    history = pd.concat([history, new_entry], ignore_index=True)
-    history.to_csv(HISTORY_FILE, index=False)
+    }
+    get_interaction_log(history_file).append(record)
     print(f"Interaction saved for user {user_id} ({'liked' if liked else 'not liked'}).")
+
+    with _logs_lock:
+        callbacks = list(_listeners.get(os.path.abspath(history_file), []))
+    for callback in callbacks:
+        try:
+            callback(record)
+        except Exception as e:
+            print(f"Interaction listener failed: {e}")
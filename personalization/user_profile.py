@@ -1,5 +1,4 @@
-import pandas as pd
-import os
+from storage.columnar import get_table, table_exists, split_interests
 
 USERS_FILE = "data/users_draft1.csv"
 
@@ -14,10 +13,10 @@ class UserProfile:
         self.load_user_profile()
 
     def load_user_profile(self):
-        if not os.path.exists(USERS_FILE):
+        if not table_exists(USERS_FILE):
             raise FileNotFoundError(f"{USERS_FILE} not found.")
 
-        df = pd.read_csv(USERS_FILE)
+        df = get_table(USERS_FILE)
         user_data = df[df["user_id"] == self.user_id]
 
         if user_data.empty:
@@ -27,7 +26,7 @@ class UserProfile:
         self.name = user["name"]
         self.preferred_climate = user["preferred_climate"]
         self.preferred_budget = user["preferred_budget"]
-        self.interest_categories = [cat.strip() for cat in user["interest_categories"].split(",")]
+        self.interest_categories = split_interests(user["interest_categories"])
         self.trip_duration_days = int(user["trip_duration_days"])
 
     def __repr__(self):
@@ -0,0 +1,169 @@
+import argparse
+import os
+import threading
+import pandas as pd
+
+# A columnar copy sits next to its CSV (data/POIs_draft1.csv -> data/POIs_draft1.parquet)
+# and is used instead of the CSV whenever it is at least as new.
+SUFFIX = ".parquet"
+
+DATA_FILES = ["data/POIs_draft1.csv", "data/users_draft1.csv"]
+
+# Low-cardinality text stored dictionary-encoded; read back as pandas categoricals
+CATEGORICAL_COLS = [
+    "category", "location", "country", "climate", "budget",
+    "preferred_climate", "preferred_budget", "interaction_type",
+]
+
+# Comma-separated text stored pre-split as list columns
+LIST_COLS = ["interest_categories"]
+
+# Text columns stored as real timestamps
+TIMESTAMP_COLS = ["timestamp"]
+
+
+def columnar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + SUFFIX
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def has_columnar(csv_path):
+    """True if the columnar copy exists and the CSV has not changed since it was written."""
+    columnar = _mtime(columnar_path(csv_path))
+    if columnar is None:
+        return False
+    source = _mtime(csv_path)
+    return source is None or columnar >= source
+
+
+def table_exists(csv_path):
+    return os.path.exists(csv_path) or has_columnar(csv_path)
+
+
+def source_mtime(csv_path):
+    """Changes whenever either copy of the table changes (for mtime-keyed caches)."""
+    mtimes = (_mtime(csv_path), _mtime(columnar_path(csv_path)))
+    if mtimes == (None, None):
+        raise FileNotFoundError(csv_path)
+    return mtimes
+
+
+def split_interests(value):
+    """Interest list from either form: "museum, landmark" (CSV) or a pre-split list (columnar)."""
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    if value is None or (isinstance(value, float) and value != value):
+        return []
+    return [str(item) for item in value]
+
+
+def normalise(frame):
+    """
+    The cleaning every reader of a table used to repeat (stripped text,
+    categoricals, split lists, parsed timestamps) plus the narrowest integer types.
+    """
+    frame = frame.copy()
+    for col in frame.columns:
+        if frame[col].dtype == object:
+            frame[col] = frame[col].where(frame[col].isna(), frame[col].astype(str).str.strip())
+    for col in CATEGORICAL_COLS:
+        if col in frame.columns:
+            frame[col] = frame[col].astype("category")
+    for col in LIST_COLS:
+        if col in frame.columns:
+            frame[col] = frame[col].map(split_interests)
+    for col in frame.columns:
+        if pd.api.types.is_integer_dtype(frame[col].dtype):
+            frame[col] = pd.to_numeric(frame[col], downcast="integer")
+    for col in TIMESTAMP_COLS:
+        if col in frame.columns:
+            parsed = pd.to_datetime(frame[col], errors="coerce", format="mixed")
+            # Keep the text if any value would be lost
+            if parsed.notna().sum() == frame[col].notna().sum():
+                frame[col] = parsed
+    return frame
+
+
+def write_columnar(frame, csv_path):
+    """Writes `frame` (normalised first) as the columnar copy of `csv_path`, atomically."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = columnar_path(csv_path)
+    table = pa.Table.from_pandas(normalise(frame), preserve_index=False)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def convert(csv_path):
+    path = write_columnar(pd.read_csv(csv_path), csv_path)
+    print(f"Converted {csv_path} -> {path}")
+    return path
+
+
+def read_table(csv_path):
+    """
+    The table behind `csv_path`: the columnar copy when it is fresh,
+    otherwise the CSV as-is. Readers that need interests should go through
+    split_interests, which accepts both forms.
+    """
+    if has_columnar(csv_path):
+        return _read_columnar(columnar_path(csv_path))
+    return pd.read_csv(csv_path)
+
+
+def _read_columnar(path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # List columns stay in Arrow buffers (one object per row would cost more
+    # than the CSV text); self_destruct frees each column once converted
+    table = pq.read_table(path, memory_map=True)
+    return table.to_pandas(
+        types_mapper=lambda arrow_type: pd.ArrowDtype(arrow_type) if pa.types.is_list(arrow_type) else None,
+        split_blocks=True, self_destruct=True,
+    )
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_table(csv_path):
+    """read_table cached per path until either copy changes. Shared, so copy before mutating."""
+    key = os.path.abspath(csv_path)
+    mtime = source_mtime(csv_path)
+    cached = _tables.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _tables_lock:
+        table = read_table(csv_path)
+        _tables[key] = (mtime, table)
+    return table
+
+
+def main():
+    from personalization.history_manager import HISTORY_FILE, write_columnar_history
+
+    parser = argparse.ArgumentParser(description="Convert the data/ CSVs to columnar (Parquet) copies")
+    parser.add_argument("--pois", default=DATA_FILES[0])
+    parser.add_argument("--users", default=DATA_FILES[1])
+    parser.add_argument("--history", default=HISTORY_FILE)
+    args = parser.parse_args()
+
+    convert(args.pois)
+    convert(args.users)
+    write_columnar_history(args.history)
+    print(f"Converted {args.history} -> {columnar_path(args.history)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+
+METRICS_FILE = "logs/metrics.prom"
+
+# Latency buckets in seconds, shared by every histogram
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and latency histograms, rendered in the Prometheus text
+    format. Recording is a dict update under one lock; nothing is written
+    until render()/write() is called. Collectors are callables returning
+    [(name, value, labels)] gauges read at render time, so existing stats
+    (caches, model registry) are exported without touching their hot paths.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0}
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    hist["buckets"][i] += 1
+                    break
+            hist["count"] += 1
+            hist["sum"] += seconds
+
+    def register_collector(self, collector):
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def histogram(self, name, **labels):
+        with self._lock:
+            hist = self._histograms.get((name, _label_key(labels)))
+            return None if hist is None else {"count": hist["count"], "sum": hist["sum"]}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def render(self, collectors=()):
+        """Prometheus text exposition; `collectors` are extra ones for this call only."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: {"buckets": list(h["buckets"]), "count": h["count"], "sum": h["sum"]}
+                          for key, h in self._histograms.items()}
+            collectors = list(self._collectors) + list(collectors)
+
+        for collector in collectors:
+            for name, value, labels in collector():
+                gauges[(name, _label_key(labels))] = value
+
+        lines = []
+        for kind, series in [("counter", counters), ("gauge", gauges)]:
+            for name in sorted({name for name, _ in series}):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (series_name, key), value in sorted(series.items()):
+                    if series_name == name:
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+
+        for name in sorted({name for name, _ in histograms}):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for (series_name, key), hist in sorted(histograms.items()):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS, hist["buckets"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {hist['count']}")
+                lines.append(f"{name}_sum{_format_labels(key)} {hist['sum']}")
+                lines.append(f"{name}_count{_format_labels(key)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path=METRICS_FILE):
+        """Writes the text exposition atomically, for a node-exporter textfile collector."""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def start_exporter(interval=15.0, path=METRICS_FILE, registry=None):
+    """Background thread rewriting the metrics file every `interval` seconds."""
+    registry = registry or metrics
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                registry.write(path)
+            except OSError as e:
+                print(f"Writing metrics to {path} failed: {e}")
+
+    thread = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+    thread.start()
+    return thread
+
+
+# Shared registry; disabled (every call returns at once) until telemetry is configured
+metrics = MetricsRegistry(enabled=os.environ.get("TRIP_TELEMETRY", "") not in ("", "0"))
+
+metrics.describe("stage_seconds", "Time spent in each pipeline stage.")
+metrics.describe("llm_calls_total", "LLM explanation calls by outcome (ok, error, timeout, rejected).")
+metrics.describe("llm_call_seconds", "LLM call latency.")
+metrics.describe("llm_fallbacks_total", "Explanations that fell back to the template text.")
+metrics.describe("llm_prompt_tokens_total", "Prompt tokens sent to the LLM (whitespace-split estimate).")
+metrics.describe("llm_completion_tokens_total", "Completion tokens received (whitespace-split estimate).")
+metrics.describe("model_load_seconds", "Time to unpickle a model artifact.")
+metrics.describe("llm_attempt_seconds", "Latency of each LLM attempt, including hedged ones (hedge=1).")
+metrics.describe("llm_hedges_total", "Second attempts started for a slow (reason=slow) or failed (reason=error) call.")
+metrics.describe("llm_timeouts_total", "LLM calls abandoned at their deadline.")
+metrics.describe("llm_deadline_exceeded_total", "LLM calls not started because the request deadline had passed.")
+metrics.describe("llm_circuit_open", "1 while the LLM circuit breaker is open.")
+metrics.describe("llm_circuit_opened_total", "Times the LLM circuit breaker opened.")
+metrics.describe("llm_circuit_rejections_total", "LLM calls refused while the circuit breaker was open.")
+metrics.describe("llm_in_flight", "LLM attempts running, including abandoned ones still waiting on the backend.")
+metrics.describe("llm_abandoned_total", "LLM attempts left running on the backend when their call timed out.")
+metrics.describe("llm_busy_rejections_total", "LLM attempts not started because every in-flight slot was taken.")
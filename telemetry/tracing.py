@@ -0,0 +1,232 @@
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from telemetry.metrics import metrics
+
+TRACE_FILE = "logs/traces.jsonl"
+
+# Fraction of requests traced (0 disables tracing; profiled requests are always traced)
+SAMPLE_RATE = float(os.environ.get("TRIP_TRACE_SAMPLE", "0") or 0)
+
+# Rows kept from the cProfile / tracemalloc reports of a profiled request
+PROFILE_TOP = 25
+
+_current = contextvars.ContextVar("trip_trace_span", default=None)
+_write_lock = threading.Lock()
+# cProfile and tracemalloc are process-wide, so one profiled request at a time
+_profile_lock = threading.Lock()
+
+
+def configure(enabled=None, sample_rate=None, trace_file=None):
+    """Turns metrics on/off and sets the trace sampling rate and output file."""
+    global SAMPLE_RATE, TRACE_FILE
+    if enabled is not None:
+        metrics.enabled = enabled
+    if sample_rate is not None:
+        SAMPLE_RATE = sample_rate
+    if trace_file is not None:
+        TRACE_FILE = trace_file
+
+
+class Span:
+    __slots__ = ("trace", "name", "parent", "attrs", "start", "duration", "error", "span_id")
+
+    def __init__(self, trace, name, parent, attrs):
+        self.trace = trace
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+        self.span_id = trace.next_id() if trace is not None else 0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def record(self):
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "name": self.name,
+            "offset_ms": round((self.start - self.trace.start) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Returned when nothing is being traced, so callers can always call .set()."""
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, name, attrs):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span.record())
+
+
+def current_span():
+    span = _current.get()
+    return span if span is not None else NOOP_SPAN
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times one stage. With metrics enabled the duration feeds the
+    stage_seconds histogram; inside a sampled trace it is also recorded as
+    a child span. Otherwise this is a no-op.
+    """
+    parent = _current.get()
+    if parent is None and not metrics.enabled:
+        yield NOOP_SPAN
+        return
+
+    current = Span(parent.trace if parent is not None else None, name, parent, attrs)
+    token = _current.set(current) if parent is not None else None
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        if token is not None:
+            _current.reset(token)
+        metrics.observe("stage_seconds", current.duration, stage=name)
+        if current.trace is not None:
+            current.trace.add(current)
+
+
+def _profile_report(profiler):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+    return out.getvalue()
+
+
+def _memory_report(snapshot, peak):
+    top = snapshot.statistics("lineno")[:PROFILE_TOP]
+    return {
+        "peak_kb": round(peak / 1024, 1),
+        "top": [{"where": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in top],
+    }
+
+
+@contextmanager
+def trace(name, profile=False, **attrs):
+    """
+    Root of one request. A request is traced with probability SAMPLE_RATE
+    (always when `profile` is set); its spans are written as one JSON line
+    to TRACE_FILE. With `profile`, cProfile (calling thread only) and
+    tracemalloc reports are attached to the trace record.
+    """
+    if _current.get() is not None or not (profile or (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE)):
+        with span(name, **attrs) as root:
+            yield root
+        return
+
+    record = Trace(name, attrs)
+    root = Span(record, name, None, record.attrs)
+    token = _current.set(root)
+
+    profiler = None
+    if profile and _profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        tracing_memory = tracemalloc.is_tracing()
+        if not tracing_memory:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger or coverage tool) owns the hook
+            profiler = None
+            if not tracing_memory:
+                tracemalloc.stop()
+            _profile_lock.release()
+    try:
+        yield root
+    except BaseException as e:
+        root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        root.duration = time.perf_counter() - root.start
+        _current.reset(token)
+        metrics.observe("stage_seconds", root.duration, stage=name)
+
+        entry = {
+            "trace_id": record.trace_id,
+            "name": name,
+            "timestamp": record.started_at,
+            "duration_ms": round(root.duration * 1000, 3),
+            "attrs": record.attrs,
+            "error": root.error,
+            "spans": sorted(record.spans, key=lambda s: s["offset_ms"]),
+        }
+        if profiler is not None:
+            profiler.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if not tracing_memory:
+                tracemalloc.stop()
+            _profile_lock.release()
+            entry["profile"] = {"cpu": _profile_report(profiler), "memory": _memory_report(snapshot, peak)}
+        elif profile:
+            entry["profile"] = {"skipped": "another request was being profiled"}
+        write_trace(entry)
+
+
+def write_trace(entry, path=None):
+    path = path or TRACE_FILE
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    line = json.dumps(entry, default=str) + "\n"
+    with _write_lock:
+        with open(path, "a") as f:
+            f.write(line)
+
+
+def bind(fn):
+    """`fn` bound to the caller's trace context, for work handed to another thread."""
+    parent = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
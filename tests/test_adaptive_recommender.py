@@ -0,0 +1,35 @@
+import pandas as pd
+from benchmarks.synthetic import write_dataset
+from personalization.adaptive_recommender import recommend_pois_many
+from personalization.history_manager import load_history
+from storage.columnar import get_table, split_interests
+
+def full_scan(user, pois, history, top_n):
+    # The straightforward filter-and-sort over the whole table
+    interests = [i.lower() for i in split_interests(user["interest_categories"])]
+    matches = (pois["budget"].str.lower() == user["preferred_budget"].lower()) & \
+              pois["category"].str.lower().isin(interests)
+    filtered = pois[matches & (pois["climate"].str.lower() == user["preferred_climate"].lower())]
+    if filtered.empty:
+        filtered = pois[matches]
+    liked = history[history["liked"] == 1]["poi_id"]
+    final_score = filtered["rating"] / 5.0 + filtered["poi_id"].isin(liked) * 0.5
+    filtered = filtered.assign(final_score=final_score)
+    return filtered.sort_values("final_score", ascending=False, kind="stable").head(top_n)
+
+def test_index_retrieval_matches_a_full_scan(tmp_path):
+    paths = write_dataset(str(tmp_path), n_pois=3_000, n_users=40, n_history=800, seed=7)
+    pois = pd.read_csv(paths["pois"])
+    # Mixed-case values must still match the users' lowercase preferences
+    pois.loc[::7, "climate"] = pois.loc[::7, "climate"].str.upper()
+    pois.loc[::5, "category"] = pois.loc[::5, "category"].str.title()
+    pois.to_csv(paths["pois"], index=False)
+
+    users = get_table(paths["users"]).set_index("user_id", drop=False)
+    history = load_history(paths["history"])
+    scanned = pd.read_csv(paths["pois"])
+    for user_id, recommendations, relaxed in recommend_pois_many(range(1, 41), 5, paths["users"], paths["pois"],
+                                                                 paths["history"]):
+        expected = full_scan(users.loc[user_id], scanned, history[history["user_id"] == user_id], 5)
+        assert list(recommendations["poi_id"]) == list(expected["poi_id"]), f"user {user_id}"
+        assert list(recommendations["final_score"]) == list(expected["final_score"])
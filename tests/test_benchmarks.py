@@ -0,0 +1,35 @@
+import json
+import subprocess
+import sys
+from benchmarks.synthetic import generate_pois, generate_users, generate_history
+from benchmarks.run_benchmarks import compare
+
+def test_synthetic_data_is_seeded_and_skewed():
+    pois = generate_pois(5_000, seed=3)
+    assert pois.equals(generate_pois(5_000, seed=3))
+    sizes = pois["location"].value_counts()
+    print(f"{len(sizes)} cities, largest {sizes.iloc[0]}, median {sizes.median()}")
+    assert sizes.iloc[0] > 5 * sizes.median()
+
+    history = generate_history(10_000, pois, 500, seed=3)
+    assert history["poi_id"].isin(pois["poi_id"]).all()
+    assert history["user_id"].between(1, 500).all()
+    assert len(generate_users(500, seed=3)) == 500
+
+def test_benchmark_smoke_and_baseline(tmp_path):
+    output = tmp_path / "results.json"
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run_benchmarks", "--pois", "500", "--users", "50",
+         "--history", "2000", "--requests", "3", "--stages", "predict_category", "optimize_itinerary",
+         "recommend_pois", "--workdir", str(tmp_path / "work"), "--output", str(output)],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    results = json.loads(output.read_text())
+    assert [s["stage"] for s in results["stages"]] == ["predict_category", "optimize_itinerary", "recommend_pois"]
+
+    assert compare(results, results) == []
+    slower = json.loads(output.read_text())
+    for stage in slower["stages"]:
+        stage["p95_ms"] = stage["p95_ms"] * 2 + 1
+    assert len(compare(slower, results)) == 3
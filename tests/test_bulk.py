@@ -0,0 +1,74 @@
+import json
+import os
+import pandas as pd
+import pytest
+from ml_models.poi_catalog import get_catalog
+from ml_models.shared_table import SharedTable
+from trip_agents.bulk import run_bulk, read_results, part_path
+from trip_agents.stages import template_itinerary
+
+REQUESTS = """user_id,location,country,budget,climate,trip_days
+1,Paris,France,medium,warm,3
+2,Paris,France,medium,warm,3
+3,,Greece,medium,warm,3
+4,Atlantis,Nowhere,low,warm,2
+5,Rome,Italy,high,,
+"""
+
+def test_shared_table_round_trip():
+    frame = get_catalog().frame()
+    table = SharedTable.create(frame)
+    try:
+        worker = SharedTable.attach(table.spec)
+        positions = worker.where(country="France", location="Paris")
+        taken = worker.take(positions)
+        expected = frame.iloc[positions].reset_index(drop=True)
+        pd.testing.assert_frame_equal(taken, expected, check_categorical=False)
+        worker.close()
+    finally:
+        table.unlink()
+
+def test_bulk_job_matches_single_requests_and_resumes(tmp_path, capsys):
+    requests_file = tmp_path / "requests.csv"
+    requests_file.write_text(REQUESTS)
+    output_dir = str(tmp_path / "out")
+
+    run_bulk(str(requests_file), output_dir, workers=2, chunk_size=2)
+    log = capsys.readouterr().out
+    print(log)
+    assert "Chunk 1/3: 2 requests, 1 new itineraries solved" in log, "Identical requests should be solved once."
+
+    results = read_results(output_dir)
+    print(results[["request_index", "day", "time_of_day", "name", "error"]])
+    assert sorted(results["request_index"].unique()) == [0, 1, 2, 3, 4]
+
+    # Same itinerary and explanations as the interactive template path
+    single = template_itinerary(1, "Paris", "France", "medium", "warm", 3)
+    first = results[results["request_index"] == 0]
+    assert list(first["poi_id"]) == list(single["poi_id"])
+    assert list(first["explanation"]) == list(single["explanation"])
+    assert list(results[results["request_index"] == 1]["poi_id"]) == list(single["poi_id"])
+
+    assert (results["time_of_day"] == "Transfer").sum() == 1
+    assert results.loc[results["request_index"] == 3, "error"].iloc[0].startswith("No POIs found")
+    assert results.loc[results["request_index"] == 4, "climate"].iloc[0] == "warm"
+
+    # Crash after chunk 1: only the unfinished chunks run again
+    manifest_file = os.path.join(output_dir, "manifest.json")
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+    manifest["done"] = [0]
+    with open(manifest_file, "w") as f:
+        json.dump(manifest, f)
+    first_part = os.stat(part_path(output_dir, 0)).st_mtime_ns
+    os.remove(part_path(output_dir, 2))
+
+    capsys.readouterr()
+    run_bulk(str(requests_file), output_dir, workers=2, chunk_size=2)
+    log = capsys.readouterr().out
+    assert "Chunk 1/3" not in log and "Chunk 3/3" in log
+    assert os.stat(part_path(output_dir, 0)).st_mtime_ns == first_part
+    pd.testing.assert_frame_equal(read_results(output_dir), results)
+
+    with pytest.raises(ValueError):
+        run_bulk(str(requests_file), output_dir, workers=2, chunk_size=3)
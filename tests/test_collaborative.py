@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+from ml_models import recommender
+from ml_models.collaborative import (
+    interaction_matrix, train_als, train_cf_model, update_cf_model, cf_scores_for_user,
+    CollaborativeModel
+)
+
+def two_groups(n_users=40):
+    # Even users use POIs 1-5, odd users POIs 6-10
+    rows = []
+    for user in range(1, n_users + 1):
+        pois = range(1, 6) if user % 2 == 0 else range(6, 11)
+        for poi in pois:
+            rows.append({"user_id": user, "poi_id": poi, "liked": 1, "interaction_type": "clicked"})
+    return pd.DataFrame(rows)
+
+def test_interaction_matrix_weights_types_and_sums_repeats():
+    history = pd.DataFrame({
+        "user_id": [1, 1, 1, 2, 2],
+        "poi_id": [10, 10, 20, 20, 30],
+        "liked": [1, 1, 0, 1, 1],
+        "interaction_type": ["viewed", "booked", "booked", "clicked", "Booked "],
+    })
+    matrix, user_ids, poi_ids = interaction_matrix(history)
+    print(matrix.toarray())
+
+    assert list(user_ids) == [1, 2] and list(poi_ids) == [10, 20, 30]
+    assert np.allclose(matrix.toarray(), [[5.0, 1.0, 0.0], [0.0, 2.0, 4.0]])
+
+def test_als_recovers_co_interaction_structure_and_folds_in_new_users():
+    matrix, user_ids, poi_ids = interaction_matrix(two_groups())
+    user_factors, item_factors = train_als(matrix, factors=4, iterations=10)
+    model = CollaborativeModel(user_ids, poi_ids, user_factors, item_factors)
+
+    # A new user who clicked two "even" POIs gets the rest of that group first
+    vector = model.fold_in([1, 2], [2.0, 2.0])
+    top = model.recommend(vector, top_n=3, exclude=[1, 2])
+    print(top)
+    assert set(top.index) == {3, 4, 5}
+
+    # Folding in a known user's history approximates their trained vector
+    # (which was solved against the previous iteration's item factors)
+    row = matrix.getrow(0)
+    folded = model.fold_in(poi_ids[row.indices], row.data)
+    assert np.allclose(folded, user_factors[0], rtol=0.05, atol=0.01)
+
+def test_update_cf_model_folds_in_only_new_rows(tmp_path):
+    history_file = str(tmp_path / "history.csv")
+    path = str(tmp_path / "cf_model.npz")
+    two_groups().assign(timestamp="2025-09-01 10:00:00").to_csv(history_file, index=False)
+
+    model = train_cf_model(history_file, factors=4, iterations=5, path=path)
+    assert update_cf_model(history_file, path).version == model.version
+
+    new_user = pd.DataFrame({"user_id": [99, 99], "poi_id": [6, 7], "liked": [1, 1],
+                             "interaction_type": ["booked", "booked"], "timestamp": "2025-09-02 10:00:00"})
+    new_user.to_csv(history_file, mode="a", header=False, index=False)
+    updated = update_cf_model(history_file, path)
+
+    assert updated.version == model.version + 1
+    assert updated.user_vector(99) is not None
+    assert np.array_equal(updated.user_vector(2), model.user_vector(2))
+    scores = cf_scores_for_user(99, history_file, path)
+    assert scores.drop([6, 7]).idxmax() in {8, 9, 10}
+
+def test_hybrid_recommend_blends_cf_scores(tmp_path, monkeypatch):
+    path = str(tmp_path / "cf_model.npz")
+    train_cf_model(factors=4, iterations=5, path=path)
+    monkeypatch.setattr(recommender, "get_similarity_index", lambda: None)
+    monkeypatch.setattr(recommender, "cf_scores_for_user",
+                        lambda user_id, history_file: cf_scores_for_user(user_id, history_file, path))
+
+    blended = recommender.hybrid_recommend(1, top_n=5)
+    print(blended[["name", "nb_score", "cf_score", "score"]])
+    expected = 0.8 * blended["nb_score"] + 0.2 * blended["cf_score"]
+    assert np.allclose(blended["score"], expected)
+    assert blended["cf_score"].between(0, 1).all()
+    assert "cf_score" not in recommender.hybrid_recommend(1, top_n=5, cf_weight=0).columns
+
+def test_cf_model_only_scores_the_history_it_was_trained_on(tmp_path):
+    path = str(tmp_path / "cf_model.npz")
+    train_cf_model(factors=4, iterations=5, path=path)
+    other_file = str(tmp_path / "history.csv")
+    pd.read_csv(recommender.HISTORY_FILE).to_csv(other_file, index=False)
+
+    assert cf_scores_for_user(1, recommender.HISTORY_FILE, path) is not None
+    assert cf_scores_for_user(1, other_file, path) is None
@@ -0,0 +1,70 @@
+import os
+import pandas as pd
+from benchmarks.synthetic import write_dataset
+from ml_models.poi_catalog import PoiCatalog
+from ml_models.preference_scorer import load_and_prepare_data
+from personalization import user_profile
+from personalization.adaptive_recommender import load_user
+from personalization.history_manager import (
+    load_history, save_interaction, compact_history, write_columnar_history
+)
+from storage.columnar import convert, columnar_path, has_columnar, read_table
+
+def converted_dataset(tmp_path):
+    paths = write_dataset(str(tmp_path), n_pois=200, n_users=20, n_history=500)
+    convert(paths["pois"])
+    convert(paths["users"])
+    write_columnar_history(paths["history"])
+    return paths
+
+def test_loaders_use_columnar_copy(tmp_path, monkeypatch):
+    paths = converted_dataset(tmp_path)
+    assert all(has_columnar(path) for path in paths.values())
+
+    users = read_table(paths["users"])
+    print(users.dtypes)
+    assert isinstance(users["preferred_budget"].dtype, pd.CategoricalDtype)
+    assert isinstance(users["interest_categories"].iloc[0], list), "Interests should be stored pre-split."
+
+    # Same rows as the CSV, whatever the storage types
+    csv_users = pd.read_csv(paths["users"])
+    assert list(users["user_id"]) == list(csv_users["user_id"])
+    assert [", ".join(i) for i in users["interest_categories"]] == list(csv_users["interest_categories"])
+
+    monkeypatch.setattr(user_profile, "USERS_FILE", paths["users"])
+    profile = user_profile.UserProfile(3)
+    assert profile.interest_categories == csv_users.loc[2, "interest_categories"].split(", ")
+    assert load_user(3, paths["users"])["name"] == "User 3"
+
+    catalog = PoiCatalog(paths["pois"])
+    assert len(catalog) == 200
+    assert catalog.get([5])["name"].iloc[0] == pd.read_csv(paths["pois"]).set_index("poi_id").loc[5, "name"]
+
+    merged = load_and_prepare_data(paths["pois"], paths["history"])
+    assert len(merged) == 500
+
+def test_history_log_and_compaction_keep_columnar_copy_current(tmp_path):
+    paths = converted_dataset(tmp_path)
+    history_file = paths["history"]
+
+    save_interaction(7, 3, 1, "booked", history_file=history_file)
+    history = load_history(history_file)
+    assert len(history) == 501
+    assert history.iloc[-1]["user_id"] == 7
+
+    compact_history(history_file)
+    assert has_columnar(history_file), "Compaction should rewrite the columnar copy."
+    assert len(read_table(history_file)) == 501
+    assert len(load_history(history_file)) == 501
+
+def test_stale_columnar_copy_is_ignored(tmp_path):
+    paths = converted_dataset(tmp_path)
+    poi_file = paths["pois"]
+
+    pois = pd.read_csv(poi_file).head(10)
+    pois.to_csv(poi_file, index=False)
+    stat = os.stat(columnar_path(poi_file))
+    os.utime(poi_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert not has_columnar(poi_file)
+    assert len(PoiCatalog(poi_file)) == 10
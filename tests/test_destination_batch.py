@@ -0,0 +1,33 @@
+import os
+import pandas as pd
+from ml_models.model_registry import registry
+from ml_models.destination_classifier import (
+    train_model, predict_category, predict_category_batch, LOOKUP_PATH
+)
+
+REQUESTS = [
+    ("warm", "Paris", "medium"),
+    ("cold", "Beijing", "low"),
+    ("warm", "Atlantis", "medium"),  # unseen location -> fallback class
+    ("tropical", "Paris", "luxury"),
+]
+
+def test_lookup_table_matches_model():
+    train_model(build_lookup=True)
+    assert os.path.exists(LOOKUP_PATH), "Lookup table was not compiled."
+    compiled = [predict_category(*request) for request in REQUESTS]
+    assert list(predict_category_batch(REQUESTS * 1000)) == compiled * 1000
+
+    # Same model without the table falls back to DecisionTreeClassifier.predict
+    os.remove(LOOKUP_PATH)
+    registry.invalidate(LOOKUP_PATH)
+    single = [predict_category(*request) for request in REQUESTS]
+    batch = predict_category_batch(pd.DataFrame(REQUESTS, columns=["climate", "location", "budget"]))
+    assert single == compiled
+    assert list(batch) == compiled
+
+def test_train_without_lookup_removes_stale_table():
+    train_model(build_lookup=True)
+    train_model(build_lookup=False)
+    assert not os.path.exists(LOOKUP_PATH)
+    assert len(predict_category_batch([])) == 0
@@ -0,0 +1,59 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from benchmarks.fake_ollama import FakeOllamaServer, OllamaHTTPClient
+from trip_agents.explanation_cache import ExplanationCache, cache_key
+from trip_agents.explanations import explain_rows, PROMPT_VERSION
+
+ROW = {"poi_id": 1, "name": "Eiffel Tower", "location": "Paris", "category": "culture", "rating": 4.7, "budget": "medium"}
+
+def test_repeat_itinerary_is_served_from_cache(tmp_path):
+    cache = ExplanationCache(str(tmp_path / "explanations.sqlite"))
+    rows = [ROW, dict(ROW, poi_id=4, name="Louvre Museum", category="museums")]
+
+    with FakeOllamaServer(latency=0.2) as server:
+        llm = OllamaHTTPClient(server.url)
+        first = explain_rows(llm, rows, cache=cache)
+        second = explain_rows(llm, rows, cache=cache)
+
+    assert first == second
+    assert server.requests == 2, "Cached explanations were regenerated."
+    stats = cache.stats()
+    print(stats)
+    assert stats["memory_hits"] == 2 and stats["misses"] == 2
+    assert stats["hit_rate"] == 0.5
+
+def test_key_changes_with_prompt_version_and_model():
+    key = cache_key(ROW, PROMPT_VERSION, "ollama/mistral")
+    assert key == cache_key(dict(ROW), PROMPT_VERSION, "ollama/mistral")
+    assert key != cache_key(ROW, "v0", "ollama/mistral")
+    assert key != cache_key(ROW, PROMPT_VERSION, "ollama/llama3")
+    assert key != cache_key(dict(ROW, rating=4.8), PROMPT_VERSION, "ollama/mistral")
+
+def test_ttl_and_size_bound(tmp_path):
+    cache = ExplanationCache(str(tmp_path / "explanations.sqlite"), max_entries=3, ttl_seconds=60, evict_every=1)
+    for i in range(5):
+        cache.put(f"key-{i}", f"text-{i}")
+    cache.get("key-2")
+    cache.put("key-5", "text-5")
+
+    fresh = ExplanationCache(cache.path, max_entries=3)
+    assert fresh.get("key-0") is None, "Least recently used entry was not evicted."
+    assert fresh.get("key-5") == "text-5"
+
+    expired = ExplanationCache(cache.path, ttl_seconds=0)
+    assert expired.get("key-5") is None
+
+def _write_entries(path, worker):
+    cache = ExplanationCache(path)
+    for i in range(20):
+        cache.put(f"worker-{worker}-{i}", f"text-{i}")
+    return worker
+
+def test_cache_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "explanations.sqlite")
+    ExplanationCache(path)
+    with ProcessPoolExecutor(max_workers=3, mp_context=multiprocessing.get_context("spawn")) as pool:
+        assert sorted(pool.map(_write_entries, [path] * 3, range(3))) == [0, 1, 2]
+
+    cache = ExplanationCache(path)
+    assert all(cache.get(f"worker-{w}-19") == "text-19" for w in range(3))
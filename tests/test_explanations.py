@@ -0,0 +1,32 @@
+from benchmarks.fake_ollama import FakeOllamaServer, OllamaHTTPClient
+from trip_agents.explanations import explain_rows, template_explanation
+
+ROWS = [
+    {"name": name, "location": "Paris", "category": category, "rating": 4.7, "budget": "low"}
+    for name, category in [
+        ("Eiffel Tower", "culture"), ("Louvre Museum", "museums"), ("Montmartre", "culture"),
+        ("Jardin des Tuileries", "gardens"), ("Canal Saint-Martin", "walking"), ("Luxembourg Gardens", "gardens"),
+    ]
+]
+
+def test_concurrent_explanations_keep_order():
+    with FakeOllamaServer(latency=0.3) as server:
+        llm = OllamaHTTPClient(server.url)
+        explanations = explain_rows(llm, ROWS, max_concurrency=6)
+
+    print(f"6 explanations (max in flight: {server.max_in_flight})")
+    assert [f"Fake explanation for {row['name']}." for row in ROWS] == explanations
+    assert server.max_in_flight > 1, "Prompts were not sent concurrently."
+
+def test_concurrency_limit_is_respected():
+    with FakeOllamaServer(latency=0.1) as server:
+        explain_rows(OllamaHTTPClient(server.url), ROWS, max_concurrency=2)
+    assert server.max_in_flight <= 2
+
+def test_failed_rows_fall_back_to_template():
+    with FakeOllamaServer(fail_for={"Louvre Museum"}) as server:
+        explanations = explain_rows(OllamaHTTPClient(server.url), ROWS, max_concurrency=3)
+
+    assert explanations[1] == template_explanation(ROWS[1])
+    assert explanations[0] == "Fake explanation for Eiffel Tower."
+    assert explanations[2] == "Fake explanation for Montmartre."
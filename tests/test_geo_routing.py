@@ -0,0 +1,56 @@
+import tracemalloc
+import numpy as np
+import pandas as pd
+from ml_models.geo import neighbourhoods, order_route, project_km, TravelTimeCache
+from ml_models.optimizer import optimize_itinerary
+
+def _two_district_city():
+    # Four POIs in the west and four in the east, ~20 km apart
+    rows = []
+    for i, (lon, category) in enumerate([
+        (2.20, "museums"), (2.21, "parks"), (2.22, "food"), (2.23, "culture"),
+        (2.48, "museums"), (2.49, "parks"), (2.50, "food"), (2.51, "culture"),
+    ]):
+        rows.append({"poi_id": i + 1, "name": f"POI {i + 1}", "category": category, "location": "Paris",
+                     "budget": "low", "duration_hours": 2, "rating": 4.5, "score": 0.9 - 0.01 * (i % 4),
+                     "latitude": 48.86, "longitude": lon})
+    return pd.DataFrame(rows)
+
+def test_days_stay_within_one_neighbourhood():
+    itinerary = optimize_itinerary(_two_district_city(), trip_days=2, slots_per_day=4)
+    print(itinerary)
+    assert len(itinerary) == 8
+    for _, day in itinerary.groupby("day"):
+        assert day["poi_id"].max() - day["poi_id"].min() <= 3, "A day mixes both ends of the city."
+        assert day["travel_minutes"].max() < 10
+
+def test_route_ordering_beats_score_order():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 10, size=(8, 2))
+    minutes = np.sqrt(((points[:, None] - points[None]) ** 2).sum(axis=2))
+    route = order_route(minutes)
+    length = sum(minutes[a, b] for a, b in zip(route, route[1:]))
+    assert sorted(route) == list(range(8))
+    assert length <= sum(minutes[a, a + 1] for a in range(7))
+
+def test_neighbourhoods_scale_without_pairwise_matrix():
+    rng = np.random.default_rng(1)
+    lat = 48.85 + rng.normal(0, 0.05, size=200_000)
+    lon = 2.35 + rng.normal(0, 0.08, size=200_000)
+    points = project_km(lat, lon)
+    tracemalloc.start()
+    labels, centroids = neighbourhoods(points, 5)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"Peak {peak / 2**20:.1f} MiB for 200k points")
+    # A pairwise matrix would need 200k^2 floats; clustering needs a few n x k arrays
+    assert peak < 8 * len(points) * 5 * 8
+    assert len(centroids) == 5 and set(labels) == set(range(5))
+
+def test_travel_times_are_cached_per_city():
+    cache = TravelTimeCache()
+    lat, lon = [48.85, 48.86, 48.87], [2.30, 2.35, 2.40]
+    first = cache.matrix("Paris", [1, 2, 3], lat, lon)
+    second = cache.matrix("Paris", [3, 2, 1], lat[::-1], lon[::-1])
+    assert cache.misses == 3 and cache.hits == 3
+    assert np.allclose(first, second[::-1, ::-1])
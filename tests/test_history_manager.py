@@ -0,0 +1,98 @@
+import threading
+import pandas as pd
+from personalization.history_manager import (
+    InteractionLog, HISTORY_COLUMNS, log_path, load_history, save_interaction, compact_history,
+    history_with_cursor, read_log_since
+)
+
+def _seed(tmp_path, rows=3):
+    history_file = str(tmp_path / "history.csv")
+    pd.DataFrame(
+        [[1, i, 1, "viewed", "2025-09-12 14:00:00"] for i in range(rows)], columns=HISTORY_COLUMNS
+    ).to_csv(history_file, index=False)
+    return history_file
+
+def test_save_interaction_appends_without_rewriting_base(tmp_path):
+    history_file = _seed(tmp_path)
+    with open(history_file) as f:
+        base_before = f.read()
+
+    save_interaction(7, 42, 1, "booked", history_file=history_file)
+
+    with open(history_file) as f:
+        assert f.read() == base_before, "Base history table was rewritten on save."
+    history = load_history(history_file)
+    assert len(history) == 4
+    assert history.iloc[-1][["user_id", "poi_id", "interaction_type"]].tolist() == [7, 42, "booked"]
+
+def test_concurrent_writers_are_group_committed(tmp_path):
+    history_file = _seed(tmp_path)
+    interaction_log = InteractionLog(history_file, commit_delay=0.01)
+
+    def write(user_id):
+        for poi_id in range(10):
+            interaction_log.append({"user_id": user_id, "poi_id": poi_id, "liked": 1,
+                                    "interaction_type": "clicked", "timestamp": "2025-10-01 10:00:00"})
+
+    threads = [threading.Thread(target=write, args=(u,)) for u in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    history = interaction_log.snapshot()
+    print(f"{len(history) - 3} writes in {interaction_log.commits} commits")
+    assert len(history) == 3 + 200, "Concurrent writes were lost."
+    assert interaction_log.commits < 200, "Writes were not batched into group commits."
+
+def test_compaction_folds_log_into_base(tmp_path):
+    history_file = _seed(tmp_path)
+    for poi_id in range(5):
+        save_interaction(2, poi_id, 0, history_file=history_file)
+    before = load_history(history_file)
+
+    assert compact_history(history_file) == 8
+    with open(log_path(history_file)) as f:
+        assert f.read() == ""
+    pd.testing.assert_frame_equal(load_history(history_file), before)
+
+def test_partial_log_line_is_ignored(tmp_path):
+    history_file = _seed(tmp_path)
+    with open(log_path(history_file), "w") as f:
+        f.write("4,9,1,clicked,2025-10-01 10:00:00\n5,1")
+    assert len(load_history(history_file)) == 4
+
+def test_write_after_partial_line_is_not_merged_into_it(tmp_path):
+    history_file = _seed(tmp_path)
+    with open(log_path(history_file), "w") as f:
+        f.write("4,9,1,clicked,2025-10-01 10:00:00\n5,1")
+
+    save_interaction(6, 3, 1, "booked", history_file=history_file)
+
+    with open(log_path(history_file)) as f:
+        assert f.read().splitlines()[:1] == ["4,9,1,clicked,2025-10-01 10:00:00"]
+    history = load_history(history_file)
+    assert len(history) == 5
+    assert history.iloc[-1][["user_id", "poi_id", "interaction_type"]].tolist() == [6, 3, "booked"]
+
+def test_log_cursor_follows_new_rows_across_a_compaction(tmp_path):
+    history_file = _seed(tmp_path)
+    save_interaction(2, 10, 1, history_file=history_file)
+    history, cursor = history_with_cursor(history_file)
+    assert len(history) == 4
+
+    save_interaction(3, 11, 1, history_file=history_file)
+    compact_history(history_file)
+    save_interaction(4, 12, 0, history_file=history_file)
+    rows, cursor = read_log_since(cursor, history_file)
+    assert rows["user_id"].tolist() == [3, 4]
+
+    rows, cursor = read_log_since(cursor, history_file)
+    assert rows.empty
+
+    # Two compactions with unread rows in between: the tail is gone
+    save_interaction(5, 13, 1, history_file=history_file)
+    compact_history(history_file)
+    save_interaction(6, 14, 1, history_file=history_file)
+    compact_history(history_file)
+    assert read_log_since(cursor, history_file)[0] is None
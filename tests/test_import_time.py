@@ -0,0 +1,28 @@
+import subprocess
+import sys
+import pytest
+from benchmarks.import_time import IMPORT_BUDGETS, heavy_imports, parse_importtime
+
+@pytest.mark.parametrize("module", IMPORT_BUDGETS)
+def test_entry_points_do_not_import_heavy_modules(module):
+    forbidden = IMPORT_BUDGETS[module][1]
+    assert heavy_imports(module, forbidden) == [], f"{module} imports heavy modules at import time"
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   json.decoder\n"
+        "import time:       300 |        420 | json\n"
+    )
+    assert parse_importtime(stderr) == {"json.decoder": (120, 120), "json": (300, 420)}
+
+def test_template_itinerary_runs_without_crewai():
+    code = (
+        "import sys\n"
+        "from trip_agents.stages import template_itinerary\n"
+        "itinerary = template_itinerary(1, 'Paris', 'France', 'low', 'warm', 2)\n"
+        "assert not itinerary.empty and itinerary['explanation'].notna().all()\n"
+        "assert 'crewai' not in sys.modules, 'crewai was imported'\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
@@ -0,0 +1,87 @@
+import shutil
+from personalization import history_manager
+from ml_models.model_registry import registry
+from ml_models.preference_scorer import (
+    train_preference_model, update_preference_model, catch_up_preference_model,
+    PreferenceModelUpdater, MODEL_PATH
+)
+from personalization.history_manager import save_interaction
+
+def _history_copy(tmp_path):
+    history_file = str(tmp_path / "history.csv")
+    shutil.copy("data/user_history_draft1.csv", history_file)
+    return history_file
+
+def test_partial_fit_publishes_new_version(tmp_path):
+    history_file = _history_copy(tmp_path)
+    train_preference_model(history_file=history_file)
+    before = registry.get(MODEL_PATH)
+
+    used = update_preference_model([
+        {"user_id": 1, "poi_id": 1, "liked": 1, "interaction_type": "booked", "timestamp": "2025-10-01 10:00:00"},
+        {"user_id": 1, "poi_id": 8, "liked": 1, "interaction_type": "clicked", "timestamp": "2025-10-01 10:05:00"},
+    ])
+
+    after = registry.get(MODEL_PATH)
+    assert used == 2
+    assert after.version_ == before.version_ + 1
+    assert after.class_count_.sum() == before.class_count_.sum() + 2
+    assert before.class_count_.sum() == 10, "Published model was mutated in place."
+
+def test_background_updater_consumes_saved_interactions(tmp_path):
+    history_file = _history_copy(tmp_path)
+    train_preference_model(history_file=history_file)
+    version = registry.get(MODEL_PATH).version_
+
+    updater = PreferenceModelUpdater(history_file=history_file, interval=0.05).start()
+    try:
+        save_interaction(2, 25, 1, "booked", history_file=history_file)
+        save_interaction(3, 24, 0, "viewed", history_file=history_file)
+    finally:
+        updater.stop()
+
+    model = registry.get(MODEL_PATH)
+    assert model.version_ > version
+    assert model.history_rows_ == 12
+    assert catch_up_preference_model(history_file=history_file) == 0, "Checkpoint did not advance."
+
+def test_catch_up_reads_only_the_log_after_the_checkpoint(tmp_path, monkeypatch):
+    history_file = _history_copy(tmp_path)
+    train_preference_model(history_file=history_file)
+    save_interaction(2, 25, 1, "booked", history_file=history_file)
+    save_interaction(3, 24, 0, "viewed", history_file=history_file)
+
+    def full_read(*args):
+        raise AssertionError("Catch-up should not read the whole history")
+    monkeypatch.setattr(history_manager, "_read_snapshot", full_read)
+    version = registry.get(MODEL_PATH).version_
+    catch_up_preference_model(history_file=history_file)
+    model = registry.get(MODEL_PATH)
+    assert model.history_rows_ == 12 and model.version_ == version + 1
+
+def _save_batch(history_file):
+    for poi_id in range(1, 21):
+        save_interaction(4, poi_id, poi_id % 2, "clicked", history_file=history_file)
+
+def test_concurrent_updaters_apply_each_logged_row_once(tmp_path):
+    # Reference: the same rows applied by one catch-up
+    (tmp_path / "serial").mkdir()
+    serial_file = _history_copy(tmp_path / "serial")
+    train_preference_model(history_file=serial_file)
+    _save_batch(serial_file)
+    catch_up_preference_model(history_file=serial_file)
+    expected = registry.get(MODEL_PATH).class_count_
+
+    history_file = _history_copy(tmp_path)
+    train_preference_model(history_file=history_file)
+    updaters = [PreferenceModelUpdater(history_file=history_file, interval=0.01).start() for _ in range(2)]
+    try:
+        _save_batch(history_file)
+    finally:
+        for updater in updaters:
+            updater.stop()
+
+    model = registry.get(MODEL_PATH)
+    print(f"{model.version_ - 1} updates; class counts {model.class_count_} vs {expected}")
+    assert model.history_rows_ == 30
+    assert (model.class_count_ == expected).all(), "Rows were dropped or applied twice."
@@ -0,0 +1,38 @@
+from joblib import dump
+from ml_models.model_registry import ModelRegistry, atomic_dump, registry
+from ml_models.destination_classifier import train_model, predict_category
+
+def test_registry_caches_and_hot_swaps(tmp_path):
+    path = str(tmp_path / "model.pkl")
+    dump({"version": 1}, path)
+
+    models = ModelRegistry(check_interval=0)
+    assert models.get(path)["version"] == 1
+    assert models.get(path)["version"] == 1
+
+    stats = models.stats()
+    assert stats["loads"] == 1 and stats["hits"] == 1, f"Unexpected registry stats: {stats}"
+
+    dump({"version": 2, "padding": "x" * 64}, path)
+    assert models.get(path)["version"] == 2, "Registry did not pick up the retrained model."
+    assert models.stats()["loads"] == 2
+
+def test_steady_state_predictions_skip_disk():
+    train_model()
+    predict_category("warm", "Paris", "medium")
+
+    registry.reset_stats()
+    for _ in range(20):
+        predict_category("warm", "Paris", "medium")
+
+    stats = registry.stats()
+    print(stats)
+    assert stats["loads"] == 0, "Steady-state predictions reloaded a model from disk."
+    assert stats["hits"] == 40
+
+def test_atomic_dump_invalidates_shared_registry(tmp_path):
+    path = str(tmp_path / "encoders.pkl")
+    atomic_dump(["a"], path)
+    assert registry.get(path) == ["a"]
+    atomic_dump(["a", "b"], path)
+    assert registry.get(path) == ["a", "b"]
@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import generate_pois
+from ml_models.multi_city import allocate_days, plan_multi_city, get_pool
+from ml_models.optimizer import optimize_itinerary
+from trip_agents import stages
+
+def country_pois():
+    pois = generate_pois(400, n_cities=8, seed=3)
+    # A handful of sights per city, so no single city fills the whole trip
+    pois = pois[pois["country"] == "Country 0"].groupby("location").head(4).copy()
+    pois["score"] = pois["rating"] / 5.0
+    return pois
+
+def test_allocate_days_adds_cities_only_when_worth_a_transfer():
+    # One deep city: a transfer day would cost more than a small city adds
+    deep = {"A": np.array([2.0, 1.9, 1.8, 1.7]), "B": np.array([1.0, 0.0, 0.0, 0.0])}
+    assert allocate_days(deep, trip_days=4) == {"A": 4}
+
+    # Shallow cities: one good day each is worth the travel
+    shallow = {c: np.array([2.0, 0.1, 0.1, 0.1, 0.1]) for c in "ABC"}
+    assert allocate_days(shallow, trip_days=5) == {"A": 1, "B": 1, "C": 1}
+
+def test_plan_multi_city_merges_cities_with_transfer_days():
+    pois = country_pois()
+    assert pois["location"].nunique() > 1
+
+    itinerary = plan_multi_city(pois, trip_days=7, slots_per_day=2, max_budget="high", workers=1)
+    print(itinerary)
+    solution = itinerary.attrs["solution"]
+    cities = solution["cities"]
+    print(cities)
+
+    assert len(cities) > 1
+    assert sum(c["days"] for c in cities) + len(cities) - 1 == 7
+    assert itinerary["day"].is_monotonic_increasing
+    assert itinerary["day"].max() <= 7
+
+    transfers = itinerary[itinerary["time_of_day"] == "Transfer"]
+    assert len(transfers) == len(cities) - 1
+    assert list(transfers["location"]) == [c["location"] for c in cities[1:]]
+
+    # Each city's block is exactly that city optimised over its own days
+    first = cities[0]
+    alone = optimize_itinerary(pois[pois["location"] == first["location"]], trip_days=first["days"],
+                               slots_per_day=2, max_budget="high")
+    block = itinerary[(itinerary["location"] == first["location"]) & (itinerary["time_of_day"] != "Transfer")]
+    assert list(block["poi_id"]) == list(alone["poi_id"])
+
+def test_process_pool_matches_inline_solve():
+    pois = country_pois()
+    inline = plan_multi_city(pois, trip_days=7, max_budget="high", workers=1)
+    pooled = plan_multi_city(pois, trip_days=7, max_budget="high", workers=2)
+    pd.testing.assert_frame_equal(inline, pooled)
+
+def test_concurrent_plans_share_one_pool():
+    pois = country_pois()
+    pool = get_pool()
+    with ThreadPoolExecutor(max_workers=3) as threads:
+        plans = list(threads.map(lambda workers: plan_multi_city(pois, trip_days=7, max_budget="high",
+                                                                 workers=workers), [2, 4, 8]))
+    # A caller asking for more workers never replaces the pool others are using
+    assert get_pool() is pool
+    for plan in plans[1:]:
+        pd.testing.assert_frame_equal(plan, plans[0])
+
+def test_country_wide_request_plans_every_city():
+    pois = stages.score_pois(1, "", "Greece")
+    assert set(pois["location"]) == {"Athens", "Santorini"}
+
+    itinerary = stages.explain_itinerary(None, stages.build_itinerary(pois, 3, 2, "medium"))
+    print(itinerary[["day", "time_of_day", "location", "name", "explanation"]])
+    assert list(itinerary["time_of_day"]).count("Transfer") == 1
+    assert set(itinerary["location"]) == {"Athens", "Santorini"}
+    assert "travel day" in itinerary.loc[itinerary["time_of_day"] == "Transfer", "explanation"].iloc[0]
+
+def test_whole_country_trip_uses_real_cities_and_mode_aware_transfers(capsys):
+    category = stages.plan_trip("", "medium", "warm", "USA")
+    assert category is not None
+    assert "Unseen label" not in capsys.readouterr().out
+
+    pois = stages.score_pois(1, "", "USA")
+    itinerary = stages.build_itinerary(pois, 4, 2, "high")
+    transfer = itinerary[itinerary["time_of_day"] == "Transfer"].iloc[0]
+    print(transfer[["name", "duration_hours"]].tolist())
+    # New York and Anaheim are a flight apart, not days of driving
+    assert "by plane" in transfer["name"] and transfer["duration_hours"] < 12
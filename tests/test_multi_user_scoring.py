@@ -0,0 +1,20 @@
+import pytest
+from ml_models.preference_scorer import train_preference_model, score_pois_for_user, score_pois_for_users
+from personalization.history_manager import load_history
+
+@pytest.fixture(scope="module")
+def trained_model():
+    train_preference_model()
+
+def test_multi_user_scoring_matches_single_user(trained_model):
+    user_ids = [1, 2, 3, 4, 5, 99]
+    top = score_pois_for_users(user_ids, top_k=5)
+    history = load_history()
+
+    for uid in user_ids:
+        mine = top[top["user_id"] == uid]
+        single = score_pois_for_user(uid).head(5)
+        assert list(mine["rank"]) == list(range(1, len(mine) + 1))
+        assert mine["score"].round(12).tolist() == single["score"].round(12).tolist()
+        seen = set(history[history["user_id"] == uid]["poi_id"])
+        assert not seen & set(mine["poi_id"]), f"User {uid} was recommended an interacted POI."
@@ -0,0 +1,69 @@
+import itertools
+import numpy as np
+import pandas as pd
+from ml_models.optimizer import optimize_itinerary
+
+def _candidates(n, seed=0, categories=12):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "poi_id": np.arange(n),
+        "name": [f"POI {i}" for i in range(n)],
+        "category": rng.choice([f"cat{c}" for c in range(categories)], size=n),
+        "location": "Paris",
+        "budget": rng.choice(["low", "medium", "high"], size=n),
+        "duration_hours": rng.integers(1, 7, size=n),
+        "rating": rng.uniform(3.5, 5.0, size=n).round(1),
+        "score": rng.uniform(0, 1, size=n),
+    })
+
+def _brute_force(pois, trip_days, slots_per_day, hours_per_day):
+    # Best total score over every assignment of up to days*slots POIs to days
+    rows = pois[pois["budget"] != "high"].to_dict("records")
+    best = 0.0
+    for size in range(trip_days * slots_per_day + 1):
+        for combo in itertools.combinations(rows, size):
+            for days in itertools.product(range(trip_days), repeat=size):
+                ok = all(
+                    sum(1 for d in days if d == day) <= slots_per_day
+                    and sum(r["duration_hours"] for r, d in zip(combo, days) if d == day) <= hours_per_day
+                    and len({r["category"] for r, d in zip(combo, days) if d == day}) == sum(1 for d in days if d == day)
+                    for day in range(trip_days)
+                )
+                if ok:
+                    best = max(best, sum(r["score"] for r in combo))
+    return best
+
+def test_exact_solver_matches_brute_force():
+    for seed in range(3):
+        pois = _candidates(9, seed=seed, categories=3)
+        itinerary = optimize_itinerary(pois, trip_days=2, slots_per_day=2, hours_per_day=6, solver="exact")
+        solution = itinerary.attrs["solution"]
+        assert solution["optimal"]
+        assert abs(solution["objective"] - _brute_force(pois, 2, 2, 6)) < 1e-9
+
+def test_constraints_hold_for_every_solver():
+    pois = _candidates(300, seed=1)
+    for solver in ["greedy", "exact", "auto"]:
+        itinerary = optimize_itinerary(pois, trip_days=3, slots_per_day=3, hours_per_day=8, solver=solver)
+        per_day = itinerary.groupby("day")
+        assert per_day["duration_hours"].sum().max() <= 8
+        assert per_day.size().max() <= 3
+        assert (per_day["category"].nunique() == per_day.size()).all(), "Category repeated within a day."
+        assert set(itinerary["budget"]) <= {"low", "medium"}
+
+def test_large_candidate_set_is_solved_near_optimally():
+    pois = _candidates(20_000, seed=2, categories=40)
+    itinerary = optimize_itinerary(pois, trip_days=5, slots_per_day=3, time_limit=0.5)
+
+    solution = itinerary.attrs["solution"]
+    print(f"20k candidates: {solution}")
+    assert len(itinerary) == 15
+    assert solution["quality"] > 0.95
+
+def test_skipped_category_is_tried_in_a_later_day():
+    pois = pd.DataFrame({
+        "poi_id": [1, 2, 3], "name": ["A", "B", "C"], "category": ["museums", "museums", "parks"],
+        "location": "Paris", "budget": "low", "duration_hours": 2, "rating": 4.5, "score": [0.9, 0.8, 0.7],
+    })
+    itinerary = optimize_itinerary(pois, trip_days=2, slots_per_day=2)
+    assert sorted(itinerary["poi_id"]) == [1, 2, 3]
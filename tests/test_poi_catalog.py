@@ -0,0 +1,53 @@
+import os
+from ml_models.poi_catalog import PoiCatalog, get_catalog
+
+def test_catalog_lookups():
+    catalog = get_catalog()
+    assert catalog is get_catalog("data/POIs_draft1.csv"), "Catalog should be shared per file."
+
+    paris = catalog.in_location("France", "Paris")
+    assert not paris.empty, "No POIs indexed for Paris."
+    assert set(paris["location"]) == {"Paris"}
+
+    # Whitespace in the raw data ("warm ") is normalised on load
+    assert "warm " not in set(catalog.frame()["climate"])
+
+    eiffel = catalog.get([1])
+    assert list(eiffel["name"]) == ["Eiffel Tower"]
+    assert catalog.get([99999]).empty
+
+    low = catalog.with_budget("low")
+    assert set(low["budget"]) == {"low"}
+    assert set(catalog.with_category(["gardens", "walking"])["category"]) == {"gardens", "walking"}
+
+def test_catalog_reloads_on_mtime_change(tmp_path):
+    poi_file = tmp_path / "pois.csv"
+    header = "poi_id,name,category,location,country,climate,budget,duration_hours,rating\n"
+    poi_file.write_text(header + "1,Old Town,culture,Riga,Latvia,cold,low,2,4.1\n")
+
+    catalog = PoiCatalog(str(poi_file))
+    assert len(catalog) == 1
+
+    poi_file.write_text(header + "1,Old Town,culture,Riga,Latvia,cold,low,2,4.1\n"
+                                 "2,Central Market,food,Riga,Latvia,cold,low,1,4.3\n")
+    stat = os.stat(poi_file)
+    os.utime(poi_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert len(catalog.in_location("Latvia", "Riga")) == 2, "Catalog did not reload after file change."
+    assert catalog.version == 2
+
+def test_matching_is_case_insensitive_and_in_catalog_order(tmp_path):
+    poi_file = tmp_path / "pois.csv"
+    poi_file.write_text(
+        "poi_id,name,category,location,country,climate,budget,duration_hours,rating\n"
+        "1,Gallery,Museums,Oslo,Norway,cold,low,2,4.1\n"
+        "2,Fjord Walk,nature,Oslo,Norway,COLD,Low,3,4.6\n"
+        "3,Beach,beaches,Nice,France,warm,low,3,4.2\n"
+        "4,Old Museum,museums,Oslo,Norway,cold,medium,2,4.0\n"
+    )
+    catalog = PoiCatalog(str(poi_file))
+
+    matched = catalog.matching(" Cold", "low", ["nature", "MUSEUMS"])
+    assert list(matched["poi_id"]) == [1, 2]
+    assert list(catalog.matching(None, "low", ["beaches", "nature"])["poi_id"]) == [2, 3]
+    assert catalog.matching("warm", "high", ["museums"]).empty
@@ -0,0 +1,115 @@
+import pandas as pd
+import pytest
+from benchmarks.synthetic import write_dataset
+from ml_models import preference_scorer, recommender, recommendation_store
+from ml_models.recommendation_store import (
+    precompute_recommendations, model_version, RecommendationRefresher, KINDS
+)
+from personalization.adaptive_recommender import recommend_pois_many
+from personalization.history_manager import save_interaction
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    paths = write_dataset(str(tmp_path / "data"), n_pois=400, n_users=30, n_history=600, n_cities=8, seed=3)
+    monkeypatch.setattr(preference_scorer, "MODEL_PATH", str(tmp_path / "nb.pkl"))
+    monkeypatch.setattr(preference_scorer, "ENCODER_PATH", str(tmp_path / "encoders.pkl"))
+    preference_scorer.train_preference_model(paths["pois"], paths["history"])
+    return paths
+
+def precompute(tmp_path, paths):
+    return precompute_recommendations(path=str(tmp_path / "store.sqlite"), poi_file=paths["pois"],
+                                      history_file=paths["history"], users_file=paths["users"])
+
+def live(kind, user_id, top_n, paths):
+    if kind == "hybrid":
+        return recommender.hybrid_recommend(user_id, paths["pois"], paths["history"], top_n)
+    return next(recommend_pois_many([user_id], top_n, paths["users"], paths["pois"], paths["history"]))[1]
+
+def assert_store_matches_live(store, paths):
+    for kind in KINDS:
+        version = model_version(kind)
+        entries = store._connection().execute("SELECT user_id, top_n FROM topk WHERE kind = ?", (kind,))
+        for user_id, top_n in entries.fetchall():
+            stored = store.get(kind, user_id, top_n, version)
+            assert stored is not None, f"{kind} entry for user {user_id} is stale"
+            pd.testing.assert_frame_equal(stored, live(kind, user_id, top_n, paths))
+
+def test_precomputed_lists_match_live_and_are_served_without_scoring(tmp_path, dataset, monkeypatch):
+    monkeypatch.setattr(recommender, "get_recommendation_store", lambda: None)
+    store = precompute(tmp_path, dataset)
+    assert len(store) == 30 * 2
+    assert_store_matches_live(store, dataset)
+
+    monkeypatch.setattr(recommender, "get_recommendation_store", lambda: store)
+    def no_scoring(*args):
+        raise AssertionError("A materialised read should not score the catalog")
+    monkeypatch.setattr(recommender, "score_pois_for_user", no_scoring)
+    served = recommender.hybrid_recommend(7, dataset["pois"], dataset["history"], 10)
+    print(served)
+    assert len(served) == 10 and store.stats()["hits"] > 0
+
+def test_interaction_invalidates_only_that_user(tmp_path, dataset, monkeypatch):
+    monkeypatch.setattr(recommender, "get_recommendation_store", lambda: None)
+    store = precompute(tmp_path, dataset)
+    refresher = RecommendationRefresher(store, interval=60).start()
+    try:
+        save_interaction(5, 1, 1, "booked", history_file=dataset["history"])
+        stale = {kind: store.stale(kind, model_version(kind)) for kind in KINDS}
+        print(stale)
+        assert stale == {"hybrid": [(5, 10)], "adaptive": [(5, 5)]}
+
+        assert refresher.refresh() == 2
+        assert all(not store.stale(kind, model_version(kind)) for kind in KINDS)
+        assert_store_matches_live(store, dataset)
+    finally:
+        refresher.stop()
+
+def test_interaction_is_seen_by_readers_without_a_refresher(tmp_path, dataset, monkeypatch):
+    monkeypatch.setattr(recommender, "get_recommendation_store", lambda: None)
+    store = precompute(tmp_path, dataset)
+    monkeypatch.setattr(recommender, "get_recommendation_store", lambda: store)
+    before = recommender.hybrid_recommend(1, dataset["pois"], dataset["history"], 10)
+
+    booked = int(before["poi_id"].iloc[0])
+    save_interaction(1, booked, 1, "booked", history_file=dataset["history"])
+    # Reads follow the log tail only: no full history read, no catalog diff
+    def full_read(*args):
+        raise AssertionError("The read path should not read whole tables")
+    with monkeypatch.context() as m:
+        for name in ["load_history", "history_with_cursor", "_row_digests"]:
+            m.setattr(recommendation_store, name, full_read)
+        after = recommender.hybrid_recommend(1, dataset["pois"], dataset["history"], 10)
+    print(before["poi_id"].tolist(), after["poi_id"].tolist())
+    assert booked not in after["poi_id"].tolist()
+    monkeypatch.setattr(recommender, "get_recommendation_store", lambda: None)
+    pd.testing.assert_frame_equal(after, live("hybrid", 1, 10, dataset))
+    # Other users' lists are still served from the store
+    assert store.stale("hybrid", model_version("hybrid")) == []
+    assert store.stale("adaptive", model_version("adaptive")) == [(1, 5)]
+
+def test_catalog_change_invalidates_affected_entries_only(tmp_path, dataset, monkeypatch):
+    monkeypatch.setattr(recommender, "get_recommendation_store", lambda: None)
+    store = precompute(tmp_path, dataset)
+
+    pois = pd.read_csv(dataset["pois"])
+    pois.loc[pois["poi_id"] == 17, "rating"] = 2.0
+    pois.loc[pois["poi_id"] == 42, "budget"] = "high"
+    pois = pois[pois["poi_id"] != 99]
+    added = pois.iloc[[0]].assign(poi_id=401, name="New sight", rating=3.5)
+    pd.concat([pois, added]).to_csv(dataset["pois"], index=False)
+
+    # Until the change is synced off the read path, reads bypass the store
+    monkeypatch.setattr(recommender, "get_recommendation_store", lambda: store)
+    hits = store.stats()["hits"]
+    served = recommender.hybrid_recommend(7, dataset["pois"], dataset["history"], 10)
+    assert store.stats()["hits"] == hits
+    monkeypatch.setattr(recommender, "get_recommendation_store", lambda: None)
+    pd.testing.assert_frame_equal(served, live("hybrid", 7, 10, dataset))
+
+    invalidated = store.sync()
+    stale = sum(len(store.stale(kind, model_version(kind))) for kind in KINDS)
+    print(f"{invalidated} of {len(store)} entries invalidated")
+    assert 0 < stale < len(store), "Only entries a changed POI can affect should be invalidated"
+
+    RecommendationRefresher(store).refresh()
+    assert_store_matches_live(store, dataset)
@@ -0,0 +1,119 @@
+import time
+import pandas as pd
+import pytest
+from benchmarks.fake_ollama import FakeOllamaServer, OllamaHTTPClient
+from telemetry import tracing
+from telemetry.metrics import metrics
+from telemetry.tracing import configure
+from trip_agents.explanations import explain_rows, iter_explanations, template_explanation
+from trip_agents.resilient_llm import ResilientLLM, CircuitBreaker, LLMTimeoutError, LLMBusyError
+from trip_agents.stages import explain_itinerary
+
+ROWS = [
+    {"name": name, "location": "Rome", "category": category, "rating": 4.5, "budget": "medium"}
+    for name, category in [
+        ("Colosseum", "history"), ("Pantheon", "history"), ("Trevi Fountain", "culture"),
+        ("Villa Borghese", "gardens"), ("Trastevere", "walking"), ("Vatican Museums", "museums"),
+    ]
+]
+TEMPLATES = [template_explanation(row) for row in ROWS]
+
+@pytest.fixture
+def telemetry(tmp_path):
+    saved = (metrics.enabled, tracing.SAMPLE_RATE, tracing.TRACE_FILE)
+    metrics.reset()
+    configure(enabled=True, sample_rate=1.0, trace_file=str(tmp_path / "traces.jsonl"))
+    yield
+    configure(*saved)
+    metrics.reset()
+
+class SlowFirstClient(OllamaHTTPClient):
+    """The first call stalls for `stall` seconds, as a straggling backend replica would."""
+
+    def __init__(self, base_url, stall):
+        super().__init__(base_url)
+        self.stall = stall
+        self.calls = 0
+
+    def call(self, prompt):
+        self.calls += 1
+        if self.calls == 1:
+            time.sleep(self.stall)
+        return super().call(prompt)
+
+def test_slow_backend_falls_back_at_the_call_deadline(telemetry):
+    with FakeOllamaServer(latency=5.0) as server:
+        llm = ResilientLLM(OllamaHTTPClient(server.url), call_timeout=0.3)
+        explanations = explain_rows(llm, ROWS, max_concurrency=6)
+        # Rows got their text while the backend was still working on them
+        still_running = server.in_flight
+
+    assert explanations == TEMPLATES
+    assert still_running > 0
+    assert metrics.counter_value("llm_calls_total", outcome="timeout") == len(ROWS)
+
+def test_request_deadline_bounds_itinerary_latency():
+    with FakeOllamaServer(latency=0.3) as server:
+        llm = OllamaHTTPClient(server.url)
+        itinerary = explain_itinerary(llm, pd.DataFrame(ROWS), max_concurrency=1, use_cache=False, timeout=0.5)
+
+    explanations = list(itinerary["explanation"])
+    print(f"{server.requests} LLM requests: {explanations}")
+    # Serial rows: those explained before the deadline, then templates only,
+    # and rows past the deadline never reach the backend
+    answered = sum(text.startswith("Fake explanation") for text in explanations)
+    assert explanations[answered:] == TEMPLATES[answered:]
+    assert server.requests <= answered + 1 < len(ROWS)
+
+def test_open_circuit_serves_templates_without_calling_the_backend(telemetry):
+    names = {row["name"] for row in ROWS}
+    with FakeOllamaServer(fail_for=names) as server:
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.3)
+        llm = ResilientLLM(OllamaHTTPClient(server.url), breaker=breaker)
+
+        assert explain_rows(llm, ROWS, max_concurrency=1) == TEMPLATES
+        # Two failed calls (each retried once) open the circuit; the other rows never reach the server
+        assert server.requests == 4 and breaker.state == "open"
+        assert metrics.counter_value("llm_calls_total", outcome="rejected") == len(ROWS) - 2
+
+        # After reset_timeout one trial call goes through and closes the circuit again
+        server.fail_for.clear()
+        time.sleep(0.35)
+        assert breaker.state == "half_open"
+        assert explain_rows(llm, ROWS[:2], max_concurrency=1) == [
+            "Fake explanation for Colosseum.", "Fake explanation for Pantheon."
+        ]
+        assert breaker.state == "closed"
+
+def test_hedged_attempt_beats_a_straggler(telemetry):
+    with FakeOllamaServer() as server:
+        client = SlowFirstClient(server.url, stall=5.0)
+        llm = ResilientLLM(client, hedge_after=0.1)
+        text = llm.call("Explain why Colosseum in Rome was chosen")
+
+    # The hedge answered while the first attempt was still stalled
+    assert text == "Fake explanation for Colosseum." and client.calls == 2
+    assert metrics.counter_value("llm_hedges_total", reason="slow") == 1
+    assert metrics.histogram("llm_attempt_seconds", outcome="ok", hedge=1)["count"] == 1
+    assert metrics.histogram("llm_attempt_seconds", outcome="ok", hedge=0) is None
+
+def test_stalled_stream_ends_with_the_template():
+    with FakeOllamaServer(token_latency=0.5) as server:
+        llm = ResilientLLM(OllamaHTTPClient(server.url), call_timeout=0.3)
+        with pytest.raises(LLMTimeoutError):
+            list(llm.stream("Explain why Colosseum in Rome was chosen"))
+
+        events = list(iter_explanations(llm, ROWS[:2], tokens=True))
+    final = {index: text for kind, index, text in events if kind == "explanation"}
+    assert final == {0: TEMPLATES[0], 1: TEMPLATES[1]}
+
+def test_abandoned_attempts_are_bounded_and_extra_calls_fail_fast(telemetry):
+    with FakeOllamaServer(latency=5.0, token_latency=5.0) as server:
+        llm = ResilientLLM(OllamaHTTPClient(server.url), call_timeout=0.2, max_in_flight=2)
+        assert explain_rows(llm, ROWS, max_concurrency=1) == TEMPLATES
+        # Two timed-out attempts still hold their slots (and threads); the other rows never start one
+        assert llm.in_flight == 2
+        assert server.requests == 2
+        assert metrics.counter_value("llm_busy_rejections_total") == len(ROWS) - 2
+        with pytest.raises(LLMBusyError):
+            list(llm.stream("Explain why Colosseum in Rome was chosen"))
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+import pandas as pd
+from aiohttp.test_utils import TestClient, TestServer
+from trip_agents.service import ItineraryService, create_app
+
+PARIS = {"user_id": 1, "location": "Paris", "country": "France", "budget": "low", "climate": "warm", "trip_days": 2}
+
+class SlowGenerator:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, **request):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        if request["location"] == "Atlantis":
+            raise ValueError("No POIs found in Atlantis, Nowhere")
+        return pd.DataFrame([{"day": 1, "time_of_day": "AM", "name": f"Sight in {request['location']}"}])
+
+def _run(service, scenario):
+    async def go():
+        async with TestClient(TestServer(create_app(service))) as client:
+            return await scenario(client)
+    return asyncio.run(go())
+
+def test_identical_inflight_requests_are_coalesced():
+    generator = SlowGenerator(0.3)
+    service = ItineraryService(generate=generator, max_workers=4)
+
+    async def scenario(client):
+        responses = await asyncio.gather(*[client.post("/itinerary", json=PARIS) for _ in range(10)])
+        return [await r.json() for r in responses], [r.status for r in responses]
+
+    bodies, statuses = _run(service, scenario)
+    assert statuses == [200] * 10
+    assert generator.calls == 1, "Identical in-flight requests were not coalesced."
+    assert all(body["itinerary"][0]["name"] == "Sight in Paris" for body in bodies)
+    assert service.stats["coalesced"] == 9
+
+def test_distinct_requests_run_concurrently():
+    generator = SlowGenerator(0.3)
+    service = ItineraryService(generate=generator, max_workers=8)
+
+    async def scenario(client):
+        responses = await asyncio.gather(*[
+            client.post("/itinerary", json=dict(PARIS, user_id=uid)) for uid in range(8)
+        ])
+        return [r.status for r in responses]
+
+    assert _run(service, scenario) == [200] * 8
+    assert generator.max_in_flight > 1, "Distinct requests were generated one at a time."
+
+def test_backpressure_and_timeouts():
+    service = ItineraryService(generate=SlowGenerator(0.5), max_workers=1, max_pending=2, timeout=0.2)
+
+    async def scenario(client):
+        responses = await asyncio.gather(*[
+            client.post("/itinerary", json=dict(PARIS, user_id=uid)) for uid in range(4)
+        ])
+        return sorted(r.status for r in responses)
+
+    assert _run(service, scenario) == [503, 503, 504, 504]
+
+def test_bad_and_unplannable_requests():
+    service = ItineraryService(generate=SlowGenerator(0))
+
+    async def scenario(client):
+        missing = await client.post("/itinerary", json={"location": "Paris"})
+        not_objects = [(await client.post(path, json=body)).status
+                       for path in ["/itinerary", "/itinerary/stream"] for body in [[], "Paris", 3]]
+        unknown = await client.post("/itinerary", json=dict(PARIS, location="Atlantis", country="Nowhere"))
+        health = await (await client.get("/health")).json()
+        return missing.status, not_objects, unknown.status, health
+
+    missing, not_objects, unknown, health = _run(service, scenario)
+    assert (missing, unknown) == (400, 422)
+    assert not_objects == [400] * 6
+    assert health["errors"] == 1 and health["pending"] == 0
+
+def test_metrics_endpoint():
+    service = ItineraryService(generate=SlowGenerator(0))
+
+    async def scenario(client):
+        await client.post("/itinerary", json=PARIS)
+        response = await client.get("/metrics")
+        return response.status, await response.text()
+
+    status, text = _run(service, scenario)
+    assert status == 200
+    assert "# TYPE service_requests gauge" in text
+    assert "service_requests 1" in text and "service_pending 0" in text
@@ -0,0 +1,95 @@
+import time
+import numpy as np
+from benchmarks.synthetic import generate_pois
+from ml_models import recommender
+from ml_models.poi_catalog import get_catalog
+from ml_models.similarity_index import SimilarityIndex, build_similarity_index, get_similarity_index
+
+def test_neighbours_share_category_and_index_is_memory_mapped(tmp_path):
+    index_dir = str(tmp_path / "index")
+    build_similarity_index(k=5, index_dir=index_dir)
+    index = get_similarity_index(index_dir)
+    pois = get_catalog().frame().set_index("poi_id")
+
+    assert isinstance(index.neighbours, np.memmap)
+    ids, sims = index.neighbours_of(13)  # Louvre Museum (museums, Paris)
+    print(pois.loc[ids, ["name", "category", "location"]], sims)
+    assert len(ids) > 0 and 13 not in ids
+    assert (pois.loc[ids, "category"] == pois.loc[13, "category"]).all()
+    assert np.all(np.diff(sims) <= 0)
+
+    similar = index.similar_to([1, 13], exclude=[7])
+    assert not set(similar.index) & {1, 13, 7}
+    assert index.similar_to([999_999]).empty
+
+def test_incremental_add_matches_rebuild():
+    pois = generate_pois(3_000, seed=5)
+    index = SimilarityIndex.build(pois.iloc[:2_500], k=10)
+    assert index.add_pois(pois) == 500
+    assert index.add_pois(pois) == 0
+
+    rebuilt = SimilarityIndex.build(pois, k=10)
+    assert np.array_equal(index.poi_ids, rebuilt.poi_ids)
+    new_rows = index._rows(pois["poi_id"].iloc[2_500:])
+    assert np.array_equal(index.neighbours[new_rows], rebuilt.neighbours[new_rows])
+    overlap = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(index.neighbours, rebuilt.neighbours)])
+    print(f"Neighbour overlap with a full rebuild: {overlap:.3f}")
+    assert overlap > 0.95
+
+def test_neighbour_retrieval_sums_neighbour_similarities(tmp_path):
+    pois = generate_pois(100_000, seed=2)
+    SimilarityIndex.build(pois, k=20).save(str(tmp_path))
+    index = SimilarityIndex.load(str(tmp_path))
+    liked = [np.random.default_rng(i).choice(pois["poi_id"], 20, replace=False) for i in range(200)]
+
+    index.similar_to(liked[0])
+    start = time.perf_counter()
+    for poi_ids in liked:
+        index.similar_to(poi_ids, top_n=20)
+    print(f"{(time.perf_counter() - start) / len(liked) * 1000:.3f} ms per user")
+
+    # Only the liked POIs' neighbour lists are read: summing them by hand gives the same scores
+    expected = {}
+    for poi_id in liked[0]:
+        for neighbour, similarity in zip(*index.neighbours_of(poi_id)):
+            if neighbour >= 0 and neighbour not in set(liked[0]):
+                expected[neighbour] = expected.get(neighbour, 0.0) + float(similarity)
+    result = index.similar_to(liked[0])
+    assert set(result.index) == set(expected)
+    assert np.allclose([expected[poi_id] for poi_id in result.index], result.to_numpy(), rtol=1e-5)
+
+def test_hybrid_recommend_blends_similarity(tmp_path, monkeypatch):
+    index_dir = str(tmp_path / "index")
+    build_similarity_index(k=5, index_dir=index_dir)
+    monkeypatch.setattr(recommender, "get_similarity_index", lambda: get_similarity_index(index_dir))
+    monkeypatch.setattr(recommender, "cf_scores_for_user", lambda *args: None)
+
+    blended = recommender.hybrid_recommend(1, top_n=20)
+    print(blended[["name", "nb_score", "similarity", "score"]])
+    expected = 0.7 * blended["nb_score"] + 0.3 * blended["similarity"]
+    assert np.allclose(blended["score"], expected)
+    assert (blended["similarity"] > 0).any()
+    assert "similarity" not in recommender.hybrid_recommend(1, top_n=3, similarity_weight=0).columns
+
+def test_similarity_is_skipped_for_zero_scores_and_other_catalogs(tmp_path, monkeypatch):
+    index_dir = str(tmp_path / "index")
+    build_similarity_index(k=5, index_dir=index_dir)
+    index = get_similarity_index(index_dir)
+    monkeypatch.setattr(recommender, "get_similarity_index", lambda: index)
+    monkeypatch.setattr(recommender, "cf_scores_for_user", lambda *args: None)
+
+    # A zero top similarity leaves nothing to normalise by
+    similar_to = index.similar_to
+    monkeypatch.setattr(index, "similar_to", lambda *args, **kwargs: similar_to(*args, **kwargs) * 0)
+    blended = recommender.hybrid_recommend(1, top_n=20)
+    assert "similarity" not in blended.columns
+    assert blended["score"].notna().all()
+    monkeypatch.undo()
+
+    # The index only serves the catalog it was built from
+    monkeypatch.setattr(recommender, "get_similarity_index", lambda: index)
+    monkeypatch.setattr(recommender, "cf_scores_for_user", lambda *args: None)
+    other_file = str(tmp_path / "pois.csv")
+    get_catalog().frame().to_csv(other_file, index=False)
+    assert index.built_from(recommender.POI_FILE) and not index.built_from(other_file)
+    assert "similarity" not in recommender.hybrid_recommend(1, top_n=20, poi_file=other_file).columns
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import pandas as pd
+from aiohttp.test_utils import TestClient, TestServer
+from benchmarks.fake_ollama import FakeOllamaServer, OllamaHTTPClient
+from trip_agents.explanations import iter_explanations
+from trip_agents.stages import stream_explanations, stream_template_itinerary, aiter_events
+from trip_agents.service import ItineraryService, create_app
+
+ITINERARY = pd.DataFrame([
+    {"day": day, "time_of_day": slot, "name": name, "location": "Paris", "category": category,
+     "rating": 4.6, "budget": "low"}
+    for day, slot, name, category in [
+        (1, "AM", "Eiffel Tower", "culture"), (1, "PM", "Louvre Museum", "museums"),
+        (2, "AM", "Montmartre", "walking"), (2, "PM", "Luxembourg Gardens", "gardens"),
+    ]
+])
+
+def test_schedule_arrives_before_any_llm_call_finishes():
+    with FakeOllamaServer(latency=0.3) as server:
+        events = stream_explanations(OllamaHTTPClient(server.url), ITINERARY, max_concurrency=4, use_cache=False)
+        first = next(events)
+        requests_before_schedule = server.requests
+        rest = list(events)
+
+    assert first["event"] == "schedule" and len(first["itinerary"]) == 4
+    assert requests_before_schedule == 0, "The schedule waited for LLM calls."
+    assert [e["event"] for e in rest] == ["explanation"] * 4 + ["done"]
+    assert sorted(e["index"] for e in rest[:4]) == [0, 1, 2, 3]
+    assert list(rest[-1]["itinerary"]["explanation"]) == [
+        f"Fake explanation for {name}." for name in ITINERARY["name"]
+    ]
+
+def test_explanations_stream_in_completion_order_with_fallbacks():
+    rows = ITINERARY.to_dict("records")
+    with FakeOllamaServer(latency=0.05, fail_for={"Montmartre"}) as server:
+        events = list(iter_explanations(OllamaHTTPClient(server.url), rows, max_concurrency=4))
+    texts = {index: text for kind, index, text in events}
+    assert "was selected because" in texts[2]
+    assert texts[0] == "Fake explanation for Eiffel Tower."
+
+def test_token_events():
+    rows = ITINERARY.to_dict("records")[:2]
+    with FakeOllamaServer(token_latency=0.01) as server:
+        events = list(iter_explanations(OllamaHTTPClient(server.url), rows, max_concurrency=1, tokens=True))
+    tokens = "".join(text for kind, index, text in events if kind == "token" and index == 0)
+    assert tokens.strip() == "Fake explanation for Eiffel Tower."
+    assert [kind for kind, _, _ in events].count("explanation") == 2
+
+def test_async_iterator_over_template_stream():
+    async def collect():
+        return [e async for e in aiter_events(stream_template_itinerary(1, "Paris", "France", "low", "warm", 2))]
+
+    events = asyncio.run(collect())
+    assert events[0]["event"] == "schedule" and events[-1]["event"] == "done"
+    assert events[-1]["itinerary"]["explanation"].notna().all()
+
+def test_service_streams_ndjson():
+    def stream(**request):
+        if request["location"] == "Atlantis":
+            raise ValueError("No POIs found in Atlantis, Nowhere")
+        return stream_explanations(None, ITINERARY.copy())
+
+    service = ItineraryService(generate=lambda **r: ITINERARY, stream=stream)
+    body = {"user_id": 1, "location": "Paris", "country": "France"}
+
+    async def scenario(client):
+        response = await client.post("/itinerary/stream", json=body)
+        lines = [json.loads(line) async for line in response.content if line.strip()]
+        unknown = await client.post("/itinerary/stream", json=dict(body, location="Atlantis"))
+        return response.status, lines, unknown.status
+
+    async def go():
+        async with TestClient(TestServer(create_app(service))) as client:
+            return await scenario(client)
+
+    status, lines, unknown = asyncio.run(go())
+    assert status == 200 and unknown == 422
+    assert [line["event"] for line in lines] == ["schedule"] + ["explanation"] * 4 + ["done"]
+    assert lines[0]["itinerary"][0]["name"] == "Eiffel Tower"
+    assert service._pending == 0
@@ -0,0 +1,97 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from benchmarks.fake_ollama import FakeOllamaServer, OllamaHTTPClient
+from telemetry import tracing
+from telemetry.metrics import metrics, MetricsRegistry
+from telemetry.tracing import configure, span, trace, bind, NOOP_SPAN
+from trip_agents.explanations import explain_rows
+
+@pytest.fixture
+def telemetry(tmp_path):
+    saved = (metrics.enabled, tracing.SAMPLE_RATE, tracing.TRACE_FILE)
+    trace_file = str(tmp_path / "traces.jsonl")
+    metrics.reset()
+    configure(enabled=True, sample_rate=1.0, trace_file=trace_file)
+    yield trace_file
+    configure(*saved)
+    metrics.reset()
+
+def _traces(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_disabled_telemetry_is_a_noop(tmp_path):
+    saved = (metrics.enabled, tracing.SAMPLE_RATE, tracing.TRACE_FILE)
+    configure(enabled=False, sample_rate=0.0, trace_file=str(tmp_path / "traces.jsonl"))
+    try:
+        with trace("request") as root, span("classify") as stage:
+            assert root is NOOP_SPAN and stage is NOOP_SPAN
+        assert metrics.histogram("stage_seconds", stage="classify") is None
+        assert not (tmp_path / "traces.jsonl").exists()
+    finally:
+        configure(*saved)
+
+def test_sampled_trace_collects_spans_across_threads(telemetry):
+    def work(i):
+        with span("llm_call", index=i):
+            return i
+
+    with trace("generate_itinerary", user_id=1):
+        with span("score") as stage:
+            stage.set(candidates=7)
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            assert list(pool.map(bind(work), range(3))) == [0, 1, 2]
+
+    [record] = _traces(telemetry)
+    names = [s["name"] for s in record["spans"]]
+    print(names)
+    assert record["attrs"] == {"user_id": 1}
+    assert sorted(names) == ["llm_call", "llm_call", "llm_call", "score"]
+    assert record["spans"][0]["attrs"] == {"candidates": 7}
+    assert {s["parent_id"] for s in record["spans"]} == {1}
+    assert metrics.histogram("stage_seconds", stage="llm_call")["count"] == 3
+
+def test_profiled_request_and_errors_are_recorded(telemetry):
+    configure(sample_rate=0.0)
+    with pytest.raises(ValueError):
+        with trace("generate_itinerary", profile=True):
+            sum(i * i for i in range(10_000))
+            raise ValueError("No POIs found")
+
+    [record] = _traces(telemetry)
+    assert record["error"] == "ValueError: No POIs found"
+    assert "cumulative" in record["profile"]["cpu"] or "skipped" in record["profile"]
+    assert "peak_kb" in record["profile"].get("memory", {"peak_kb": None})
+
+def test_llm_metrics_count_fallbacks(telemetry):
+    rows = [{"name": name, "location": "Paris", "category": "culture", "rating": 4.7, "budget": "low"}
+            for name in ["Eiffel Tower", "Louvre Museum", "Montmartre"]]
+    with FakeOllamaServer(fail_for={"Louvre Museum"}) as server:
+        with trace("explain"):
+            explain_rows(OllamaHTTPClient(server.url), rows, max_concurrency=3)
+
+    assert metrics.counter_value("llm_calls_total", outcome="ok") == 2
+    assert metrics.counter_value("llm_fallbacks_total") == 1
+    assert metrics.counter_value("llm_prompt_tokens_total") > 0
+    outcomes = sorted(s["attrs"]["outcome"] for s in _traces(telemetry)[0]["spans"])
+    assert outcomes == ["fallback", "ok", "ok"]
+
+def test_prometheus_text_format(tmp_path):
+    registry = MetricsRegistry(enabled=True)
+    registry.describe("llm_calls_total", "LLM calls.")
+    registry.inc("llm_calls_total", outcome="ok")
+    registry.inc("llm_calls_total", 2, outcome="ok")
+    registry.observe("stage_seconds", 0.02, stage="score")
+    registry.register_collector(lambda: [("cache_hit_rate", 0.5, {})])
+
+    path = tmp_path / "metrics.prom"
+    registry.write(str(path))
+    text = path.read_text()
+    print(text)
+    assert '# HELP llm_calls_total LLM calls.' in text
+    assert 'llm_calls_total{outcome="ok"} 3' in text
+    assert 'stage_seconds_bucket{stage="score",le="0.01"} 0' in text
+    assert 'stage_seconds_bucket{stage="score",le="0.025"} 1' in text
+    assert 'stage_seconds_count{stage="score"} 1' in text
+    assert "cache_hit_rate 0.5" in text
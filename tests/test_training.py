@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import write_dataset
+from ml_models import destination_classifier, preference_scorer
+from ml_models.model_registry import registry
+from ml_models.training import train_models, build_feature_store
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    paths = write_dataset(str(tmp_path / "data"), n_pois=300, n_users=20, n_history=2_000, n_cities=6, seed=5)
+    models = tmp_path / "models"
+    for module, names in [(destination_classifier, ["MODEL_PATH", "ENCODER_PATH", "LOOKUP_PATH"]),
+                          (preference_scorer, ["MODEL_PATH", "ENCODER_PATH"])]:
+        for name in names:
+            monkeypatch.setattr(module, name, str(models / os.path.basename(getattr(module, name))))
+    yield paths, models
+    registry.invalidate()
+
+def train(paths, **kwargs):
+    return train_models(paths["pois"], paths["history"], **kwargs)
+
+def test_one_pass_publishes_a_version_both_models_load(dataset):
+    paths, models = dataset
+    manifest = train(paths)
+    print(json.dumps(manifest, indent=2, default=str))
+
+    assert (models / "CURRENT").read_text() == manifest["version"]
+    artifacts = manifest["artifacts"]
+    assert artifacts["destination_label_encoders.pkl"]["file"] == artifacts["nb_label_encoders.pkl"]["file"]
+    assert not list(models.glob("*.pkl")), "Artifacts belong in the version directory only"
+
+    # Shared encoders: one fit on the whole catalog serves both models
+    encoders = registry.get(destination_classifier.ENCODER_PATH)
+    assert registry.get(preference_scorer.ENCODER_PATH).keys() == encoders.keys()
+
+    table = registry.get(destination_classifier.LOOKUP_PATH)
+    assert isinstance(table, np.memmap), "The lookup table should be memory-mapped"
+    model = registry.get(destination_classifier.MODEL_PATH)
+    requests = pd.read_csv(paths["pois"])[destination_classifier.FEATURE_COLS].head(50)
+    codes = pd.DataFrame({col: encoders[col].transform(requests[col]) for col in destination_classifier.FEATURE_COLS})
+    expected = encoders["category"].classes_[model.predict(codes)]
+    assert list(destination_classifier.predict_category_batch(requests)) == list(expected)
+
+    scored = preference_scorer.score_pois_for_user(1, paths["pois"], paths["history"])
+    assert len(scored) > 0 and scored["score"].between(0, 1).all()
+
+def test_feature_store_matches_the_merge(dataset):
+    paths, _ = dataset
+    store = build_feature_store(paths["pois"], paths["history"])
+    merged = preference_scorer.load_and_prepare_data(paths["pois"], paths["history"])
+    assert len(store["positions"]) == len(merged)
+    assert (store["liked"] == merged["liked"].to_numpy()).all()
+
+def test_readers_switch_versions_atomically(dataset):
+    paths, models = dataset
+    first = train(paths, keep=1)
+    assert registry.get(preference_scorer.MODEL_PATH).version_ == 1
+
+    errors, stop = [], threading.Event()
+    def read():
+        while not stop.is_set():
+            try:
+                destination_classifier.predict_category("warm", "City 1", "medium")
+                preference_scorer.score_all_pois(paths["pois"])
+            except Exception as e:
+                errors.append(e)
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for _ in range(3):
+            latest = train(paths, keep=1)
+    finally:
+        stop.set()
+        reader.join()
+
+    assert not errors, errors
+    assert latest["version"] != first["version"]
+    versions = sorted(os.listdir(models / "versions"))
+    assert len(versions) == 2 and latest["version"] in versions
+
+    # Incremental updates and legacy retrains publish new versions; a published one never changes
+    published = models / "versions" / latest["version"]
+    files = {f.name: f.stat().st_mtime_ns for f in published.iterdir()}
+    preference_scorer.update_preference_model(pd.read_csv(paths["history"]).head(100), paths["pois"])
+    assert registry.get(preference_scorer.MODEL_PATH).version_ == 2
+    updated = (models / "CURRENT").read_text()
+    assert updated != latest["version"]
+    assert json.loads((models / "versions" / updated / "manifest.json").read_text())["base_version"] == latest["version"]
+
+    destination_classifier.train_model(paths["pois"])
+    assert (models / "CURRENT").read_text() not in (latest["version"], updated)
+    assert {f.name: f.stat().st_mtime_ns for f in published.iterdir()} == files
+    assert not list(models.glob("*.pkl")), "Artifacts belong in the version directory only"
+    assert destination_classifier.predict_category("warm", "City 1", "medium")
@@ -0,0 +1,69 @@
+import threading
+import time
+import pandas as pd
+from trip_agents import trip_agents
+from trip_agents.trip_agents import TripPipeline, get_pipeline, PlannerAgent, ScoringAgent, OptimizerAgent, ExplanationAgent
+
+def _slow(result, latency=0.3, tracker=None):
+    def stage(self, *args, **kwargs):
+        if tracker is not None:
+            tracker.enter()
+        time.sleep(latency)
+        if tracker is not None:
+            tracker.leave()
+        return result
+    return stage
+
+class Overlap:
+    """Most stages seen running at once."""
+
+    def __init__(self):
+        self.running = 0
+        self.most = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+
+    def leave(self):
+        with self._lock:
+            self.running -= 1
+
+def test_pipeline_is_built_once():
+    assert get_pipeline() is get_pipeline()
+
+def test_independent_stages_run_concurrently(monkeypatch):
+    pois = pd.DataFrame([{"poi_id": 1, "name": "Louvre"}])
+    overlap = Overlap()
+    monkeypatch.setattr(PlannerAgent, "plan_trip", _slow("museum", tracker=overlap))
+    monkeypatch.setattr(ScoringAgent, "score_pois", _slow(pois, tracker=overlap))
+    monkeypatch.setattr(OptimizerAgent, "build_itinerary", lambda self, pois, *args: pois.copy())
+    monkeypatch.setattr(ExplanationAgent, "explain_itinerary", lambda self, df: df.assign(explanation="ok"))
+
+    pipeline = TripPipeline()
+    planner = pipeline.planner
+    for _ in range(3):
+        result = pipeline.run(1, "Paris", "France", "low", "warm", 2)
+
+    assert list(result["explanation"]) == ["ok"]
+    assert pipeline.planner is planner
+    assert overlap.most == 2, "plan_trip and score_pois did not overlap."
+
+def test_empty_itinerary_raises(monkeypatch):
+    monkeypatch.setattr(PlannerAgent, "plan_trip", _slow("museum", 0))
+    monkeypatch.setattr(ScoringAgent, "score_pois", _slow(pd.DataFrame(), 0))
+    monkeypatch.setattr(OptimizerAgent, "build_itinerary", lambda self, pois, *args: pd.DataFrame())
+    monkeypatch.setattr(ExplanationAgent, "explain_itinerary", lambda self, df: df)
+    monkeypatch.setattr(trip_agents, "_pipeline", TripPipeline())
+
+    try:
+        trip_agents.generate_itinerary(1, "Atlantis", "Nowhere")
+        assert False, "Expected ValueError for an empty itinerary."
+    except ValueError:
+        pass
+
+def test_crew_is_built_on_demand():
+    crew = TripPipeline().build_crew(1, "Paris", "France", "low", "warm", 2)
+    assert len(crew.agents) == 4 and len(crew.tasks) == 4
@@ -0,0 +1,277 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from trip_agents.explanations import template_explanation, explain_rows, is_transfer, MAX_CONCURRENCY
+from trip_agents.resilient_llm import resilient
+from trip_agents.stages import parse_locations, score_candidates, build_itinerary
+
+OUTPUT_DIR = "output/bulk"
+MANIFEST = "manifest.json"
+
+# Requests per output part (and per manifest checkpoint)
+CHUNK_SIZE = 1_000
+
+REQUEST_COLUMNS = ["user_id", "location", "country", "budget", "climate", "trip_days"]
+REQUEST_DEFAULTS = {"budget": "medium", "climate": "warm", "trip_days": 3}
+
+
+def read_requests(path):
+    """Requests from a CSV or Parquet file, with defaults filled in and text stripped."""
+    requests = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    for col in ["user_id", "location", "country"]:
+        if col not in requests.columns:
+            raise ValueError(f"Missing required column in requests: '{col}'")
+    for col, default in REQUEST_DEFAULTS.items():
+        requests[col] = requests[col].fillna(default) if col in requests.columns else default
+    for col in ["location", "country", "budget", "climate"]:
+        requests[col] = requests[col].fillna("").astype(str).str.strip()
+    requests["budget"] = requests["budget"].str.lower()
+    requests["climate"] = requests["climate"].str.lower()
+    requests["trip_days"] = requests["trip_days"].astype(int)
+    return requests[REQUEST_COLUMNS].reset_index(drop=True)
+
+
+# Worker state: the catalog in shared memory (see ml_models/shared_table.py)
+_table = None
+_positions = {}
+
+
+def _init_worker(spec):
+    from ml_models.shared_table import SharedTable
+
+    global _table
+    _table = SharedTable.attach(spec)
+
+
+def _candidates(location, country):
+    # Same rows, in the same order, as stages.score_pois reads from the catalog
+    parts = []
+    for city in parse_locations(location) or [None]:
+        key = (country, city)
+        if key not in _positions:
+            _positions[key] = _table.where(country=country, location=city) if city else _table.where(country=country)
+        parts.append(_positions[key])
+    return _table.take(np.concatenate(parts))
+
+
+def _solve(key):
+    """One (location, country, budget, trip_days, slots_per_day) itinerary, or the error it raised."""
+    location, country, budget, trip_days, slots_per_day = key
+    try:
+        pois = _candidates(location, country)
+        if pois.empty:
+            raise ValueError(f"No POIs found in {location}, {country}")
+        itinerary = build_itinerary(score_candidates(pois), trip_days, slots_per_day, budget, workers=1)
+        if itinerary.empty:
+            raise ValueError("No itinerary generated. Try different parameters or check data.")
+        return key, itinerary, None
+    except ValueError as e:
+        return key, None, str(e)
+
+
+def _classify(batch):
+    from ml_models.destination_classifier import predict_category_batch
+
+    features = pd.DataFrame({
+        "climate": batch["climate"],
+        "location": [(parse_locations(location) or [location])[0] for location in batch["location"]],
+        "budget": batch["budget"],
+    })
+    unique = features.drop_duplicates()
+    predicted = pd.Series(predict_category_batch(unique), index=pd.MultiIndex.from_frame(unique))
+    return predicted.reindex(pd.MultiIndex.from_frame(features)).to_numpy()
+
+
+def _assemble(batch, keys, categories, solved):
+    """One row per itinerary slot per request; failed requests get a single row with `error`."""
+    requests = pd.DataFrame({
+        "request_index": batch.index.to_numpy(),
+        "user_id": batch["user_id"].to_numpy(),
+        "requested_location": batch["location"].to_numpy(),
+        "country": batch["country"].to_numpy(),
+        "requested_budget": batch["budget"].to_numpy(),
+        "climate": batch["climate"].to_numpy(),
+        "trip_days": batch["trip_days"].to_numpy(),
+        "trip_category": categories,
+    })
+
+    ok = np.array([solved[key][1] is None for key in keys])
+    used = [key for key in dict.fromkeys(keys) if solved[key][1] is None]
+    parts = []
+    if used:
+        stacked = pd.concat([solved[key][0] for key in used], ignore_index=True)
+        sizes = np.array([len(solved[key][0]) for key in used])
+        starts = dict(zip(used, np.concatenate([[0], np.cumsum(sizes)[:-1]])))
+        lengths = dict(zip(used, sizes))
+        ok_keys = [key for key, good in zip(keys, ok) if good]
+        rows = np.concatenate([np.arange(starts[key], starts[key] + lengths[key]) for key in ok_keys])
+        owners = np.repeat(np.flatnonzero(ok), [lengths[key] for key in ok_keys])
+        slots = stacked.iloc[rows].reset_index(drop=True)
+        parts.append(pd.concat([requests.iloc[owners].reset_index(drop=True), slots], axis=1))
+    if not ok.all():
+        failed = requests[~ok].assign(error=[solved[key][1] for key, good in zip(keys, ok) if not good])
+        parts.append(failed)
+
+    frame = pd.concat(parts, ignore_index=True)
+    if "error" not in frame.columns:
+        frame["error"] = None
+    if "day" in frame.columns:
+        frame["day"] = frame["day"].astype("Int64")   # missing on failed requests
+    return frame.sort_values("request_index", kind="stable").reset_index(drop=True)
+
+
+def _explanation_key(row):
+    return ("transfer", row["name"]) if is_transfer(row) else ("poi", int(row["poi_id"]))
+
+
+def _explain(frame, llm, explained, max_concurrency, cache):
+    """Fills `explanation`; each POI is explained once per job, whatever the number of requests."""
+    slots = frame[frame["error"].isna()]
+    records = slots.to_dict("records")
+    keys = [_explanation_key(row) for row in records]
+    new = {key: row for key, row in zip(keys, records) if key not in explained}
+    if new:
+        rows = list(new.values())
+        texts = ([template_explanation(row) for row in rows] if llm is None
+                 else explain_rows(llm, rows, max_concurrency, cache))
+        explained.update(zip(new, texts))
+    frame["explanation"] = None
+    frame.loc[slots.index, "explanation"] = [explained[key] for key in keys]
+    return frame
+
+
+def _write_json(path, payload):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def part_path(output_dir, chunk):
+    return os.path.join(output_dir, f"part-{chunk:05d}.parquet")
+
+
+def _write_part(output_dir, chunk, frame):
+    path = part_path(output_dir, chunk)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(output_dir, job):
+    """The job's manifest; a directory holding a different job is refused rather than mixed."""
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {"job": job, "done": []}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest["job"] != job:
+        raise ValueError(f"{output_dir} holds a different bulk job: {manifest['job']}")
+    return manifest
+
+
+def run_bulk(
+    requests_file: str,
+    output_dir: str = OUTPUT_DIR,
+    workers: int = None,
+    chunk_size: int = CHUNK_SIZE,
+    slots_per_day: int = 2,
+    llm=None,
+    max_concurrency: int = MAX_CONCURRENCY,
+    use_cache: bool = True
+):
+    """
+    Generates an itinerary for every request in `requests_file`.
+
+    The POI catalog is copied once into shared memory and a process pool
+    solves each distinct (location, country, budget, trip_days) only once
+    per job; classification is batched and each POI is explained once.
+    Results go to one Parquet part per chunk of requests, and manifest.json
+    records finished chunks, so rerunning after a crash resumes where it
+    stopped. With llm=None explanations are template text.
+    """
+    from ml_models.poi_catalog import get_catalog
+    from ml_models.shared_table import SharedTable
+    from ml_models.multi_city import process_context
+
+    requests = read_requests(requests_file)
+    job = {"requests_file": os.path.abspath(requests_file), "requests": len(requests),
+           "chunk_size": chunk_size, "slots_per_day": slots_per_day}
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir, job)
+    done = set(manifest["done"])
+    n_chunks = (len(requests) + chunk_size - 1) // chunk_size
+    todo = [c for c in range(n_chunks) if c not in done]
+    if not todo:
+        print(f"Bulk job already complete: {len(requests)} requests in {output_dir}")
+        return manifest
+
+    # Per-call deadlines and the circuit breaker, but no job-wide deadline
+    llm = resilient(llm) if llm is not None else None
+    cache = None
+    if llm is not None and use_cache:
+        from trip_agents.explanation_cache import get_explanation_cache
+        cache = get_explanation_cache()
+
+    workers = workers or os.cpu_count() or 1
+    table = SharedTable.create(get_catalog().frame())
+    solved, explained = {}, {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=process_context(),
+                                 initializer=_init_worker, initargs=(table.spec,)) as pool:
+            for chunk in todo:
+                start = time.perf_counter()
+                batch = requests.iloc[chunk * chunk_size:(chunk + 1) * chunk_size]
+                keys = list(zip(batch["location"], batch["country"], batch["budget"],
+                                batch["trip_days"].astype(int), [slots_per_day] * len(batch)))
+                missing = [key for key in dict.fromkeys(keys) if key not in solved]
+                for key, itinerary, error in pool.map(_solve, missing,
+                                                      chunksize=max(1, len(missing) // (4 * workers))):
+                    solved[key] = (itinerary, error)
+
+                frame = _assemble(batch, keys, _classify(batch), solved)
+                frame = _explain(frame, llm, explained, max_concurrency, cache)
+                _write_part(output_dir, chunk, frame)
+
+                done.add(chunk)
+                manifest["done"] = sorted(done)
+                _write_json(os.path.join(output_dir, MANIFEST), manifest)
+                print(f"Chunk {chunk + 1}/{n_chunks}: "
+                      f"{len(batch)} requests, {len(missing)} new itineraries solved "
+                      f"in {time.perf_counter() - start:.2f}s")
+    finally:
+        table.unlink()
+    return manifest
+
+
+def read_results(output_dir=OUTPUT_DIR):
+    """Every finished part of a bulk job as one DataFrame, in request order."""
+    with open(os.path.join(output_dir, MANIFEST)) as f:
+        done = json.load(f)["done"]
+    parts = [pd.read_parquet(part_path(output_dir, chunk)) for chunk in done]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate itineraries for a file of requests")
+    parser.add_argument("requests", help="CSV/Parquet with user_id, location, country[, budget, climate, trip_days].")
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--llm", action="store_true", help="LLM explanations instead of templates.")
+    args = parser.parse_args()
+
+    llm = None
+    if args.llm:
+        from trip_agents.llm import get_llm
+        llm = get_llm()
+    run_bulk(args.requests, args.output, args.workers, args.chunk_size, llm=llm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from telemetry.metrics import metrics
+
+CACHE_FILE = "cache/explanations.sqlite"
+
+# Row fields rendered into the explanation prompt
+PROMPT_FIELDS = ["name", "location", "category", "rating", "budget"]
+
+
+def _plain(value):
+    # numpy scalars -> Python values so the key is stable across dtypes
+    return value.item() if hasattr(value, "item") else value
+
+
+def cache_key(row, prompt_version, model_name):
+    fields = [_plain(row.get(field)) for field in PROMPT_FIELDS]
+    raw = json.dumps([_plain(row.get("poi_id")), fields, prompt_version, model_name], default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """
+    Two-tier cache of LLM explanations: a small in-process LRU in front of
+    a SQLite table that every worker process shares (WAL mode, so readers
+    never block the writer). Entries expire after `ttl_seconds`, and the
+    table is trimmed to `max_entries` by least-recent access.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=50_000, ttl_seconds=7 * 24 * 3600,
+                 memory_entries=1024, evict_every=256):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.evict_every = evict_every
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._puts_since_evict = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS explanations ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON explanations(last_access)")
+
+    def _connection(self):
+        # sqlite3 connections are not shareable across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and cached[1] > now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return cached[0]
+
+        with self._connection() as conn:
+            found = conn.execute(
+                "SELECT value, created_at FROM explanations WHERE key = ?", (key,)
+            ).fetchone()
+            if found is None or found[1] + self.ttl_seconds <= now:
+                if found is not None:
+                    conn.execute("DELETE FROM explanations WHERE key = ?", (key,))
+                self._count("misses")
+                return None
+            conn.execute("UPDATE explanations SET last_access = ? WHERE key = ?", (now, key))
+
+        value, created_at = found
+        self._remember(key, value, created_at + self.ttl_seconds)
+        self._count("disk_hits")
+        return value
+
+    def put(self, key, value):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO explanations (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+        self._remember(key, value, now + self.ttl_seconds)
+        self._count("writes")
+
+        with self._lock:
+            self._puts_since_evict += 1
+            due = self._puts_since_evict >= self.evict_every
+            if due:
+                self._puts_since_evict = 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drops expired rows, then the least recently used beyond max_entries."""
+        now = time.time()
+        with self._connection() as conn:
+            expired = conn.execute(
+                "DELETE FROM explanations WHERE created_at <= ?", (now - self.ttl_seconds,)
+            ).rowcount
+            excess = conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0] - self.max_entries
+            trimmed = 0
+            if excess > 0:
+                trimmed = conn.execute(
+                    "DELETE FROM explanations WHERE key IN ("
+                    " SELECT key FROM explanations ORDER BY last_access LIMIT ?)", (excess,)
+                ).rowcount
+        self._count("evictions", expired + trimmed)
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM explanations")
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_explanation_cache():
+    """Process-wide cache on CACHE_FILE, created on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExplanationCache()
+                metrics.register_collector(_cache_metrics)
+    return _cache
+
+
+def _cache_metrics():
+    if _cache is None:
+        return []
+    stats = _cache.stats()
+    return [(f"explanation_cache_{name}", value, {}) for name, value in stats.items()]
@@ -0,0 +1,169 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+import time
+from trip_agents.explanation_cache import cache_key
+from telemetry.metrics import metrics
+from telemetry.tracing import span, bind
+
+# Per-POI prompts sent to the LLM at once (1 = the old serial behaviour)
+MAX_CONCURRENCY = 4
+
+# Bump whenever build_prompt changes so cached explanations are not reused
+PROMPT_VERSION = "v1"
+
+
+def build_prompt(row):
+    return f"""
+            You are a friendly travel assistant.
+            Explain in 1–2 sentences why {row['name']} in {row['location']} was chosen
+            for the itinerary. Mention its category ({row['category']}),
+            rating ({row['rating']} stars), and budget level ({row['budget']}).
+            Keep it concise, warm, and natural.
+            """
+
+
+def is_transfer(row):
+    return row.get("time_of_day") == "Transfer"
+
+
+def template_explanation(row):
+    if is_transfer(row):
+        return f"{row['name']}: a travel day between cities."
+    return (
+        f"{row['name']} was selected because it fits your budget "
+        f"({row['budget']}), has a high rating ({row['rating']}), "
+        f"and matches your interest in {row['category']}."
+    )
+
+
+def call_llm(llm, prompt):
+    # Handle different CrewAI LLM APIs
+    if hasattr(llm, "run"):
+        response = llm.run(prompt)
+    elif hasattr(llm, "call"):
+        response = llm.call(prompt)
+    elif hasattr(llm, "__call__"):
+        response = llm(prompt)
+    else:
+        raise AttributeError("No valid text generation method found in LLM.")
+    return str(response).strip()
+
+
+def stream_llm(llm, prompt, on_token):
+    """
+    Full response text, passing each chunk to `on_token` as it arrives.
+    Clients without a callable `stream(prompt)` yield the whole reply as one chunk.
+    """
+    stream = getattr(llm, "stream", None)
+    if not callable(stream):
+        response = call_llm(llm, prompt)
+        on_token(response)
+        return response
+
+    chunks = []
+    for chunk in stream(prompt):
+        chunk = str(chunk)
+        chunks.append(chunk)
+        on_token(chunk)
+    return "".join(chunks).strip()
+
+
+def model_name(llm):
+    return str(getattr(llm, "model", type(llm).__name__))
+
+
+def explain_row(llm, row, cache=None, on_token=None):
+    # Travel days between cities (multi_city.py) are not POIs; nothing to ask the LLM
+    if is_transfer(row):
+        return template_explanation(row)
+
+    key = cache_key(row, PROMPT_VERSION, model_name(llm)) if cache is not None else None
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    prompt = build_prompt(row)
+    with span("llm_call", poi=row["name"], model=model_name(llm)) as call:
+        start = time.perf_counter()
+        try:
+            if on_token is None:
+                explanation = call_llm(llm, prompt)
+            else:
+                explanation = stream_llm(llm, prompt, on_token)
+        except Exception as e:
+            # Timeouts and open-circuit rejections (resilient_llm.py) carry their own outcome
+            outcome = getattr(e, "outcome", "error")
+            metrics.observe("llm_call_seconds", time.perf_counter() - start, outcome=outcome)
+            metrics.inc("llm_calls_total", outcome=outcome)
+            metrics.inc("llm_fallbacks_total")
+            call.set(outcome="fallback", error=str(e))
+            if outcome != "rejected":
+                print(f"LLM failed for {row['name']}: {e}")
+            return template_explanation(row)
+
+        # Token counts are whitespace-split estimates; the client does not report usage
+        prompt_tokens, completion_tokens = len(prompt.split()), len(explanation.split())
+        metrics.observe("llm_call_seconds", time.perf_counter() - start, outcome="ok")
+        metrics.inc("llm_calls_total", outcome="ok")
+        metrics.inc("llm_prompt_tokens_total", prompt_tokens)
+        metrics.inc("llm_completion_tokens_total", completion_tokens)
+        call.set(outcome="ok", prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    # Only real LLM output is cached; template fallbacks are retried next time
+    if key is not None:
+        cache.put(key, explanation)
+    return explanation
+
+
+def explain_rows(llm, rows, max_concurrency=MAX_CONCURRENCY, cache=None):
+    """
+    Explanations for `rows` (dict-like itinerary rows), in input order.
+    Up to `max_concurrency` LLM calls are in flight at once; a failed call
+    only falls back to the template text for its own row. With a `cache`
+    (see explanation_cache.py) previously generated text is reused.
+    """
+    rows = list(rows)
+    if max_concurrency <= 1 or len(rows) <= 1:
+        return [explain_row(llm, row, cache) for row in rows]
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(rows))) as pool:
+        return list(pool.map(bind(lambda row: explain_row(llm, row, cache)), rows))
+
+
+def iter_explanations(llm, rows, max_concurrency=MAX_CONCURRENCY, cache=None, tokens=False):
+    """
+    Yields ("explanation", index, text) for each row as soon as its call
+    finishes, so completion order (not row order) drives the output. With
+    `tokens`, ("token", index, chunk) events arrive while the text is being
+    generated; the final "explanation" event is authoritative (a call that
+    fails mid-stream ends with the template text).
+    """
+    rows = list(rows)
+    if not rows:
+        return
+
+    events = queue.Queue()
+
+    def work(index, row):
+        on_token = (lambda chunk: events.put(("token", index, chunk))) if tokens else None
+        try:
+            text = explain_row(llm, row, cache, on_token)
+        except Exception as e:
+            print(f"Explanation failed for {row['name']}: {e}")
+            text = template_explanation(row)
+        events.put(("explanation", index, text))
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(rows))))
+    try:
+        for index, row in enumerate(rows):
+            pool.submit(bind(work), index, row)
+        remaining = len(rows)
+        while remaining:
+            event = events.get()
+            if event[0] == "explanation":
+                remaining -= 1
+            yield event
+    finally:
+        # A consumer that stops early (e.g. a closed connection) cancels queued calls
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,26 @@
-from crewai import LLM
+import threading
 
-# LLM instance configured to use local Ollama (Mistral)
-llm = LLM(
-    model="ollama/mistral",             
-    base_url="http://localhost:11434"   # Default Ollama API
-)
+# Local Ollama (Mistral) settings; the client is created on first use
+LLM_MODEL = "ollama/mistral"
+LLM_BASE_URL = "http://localhost:11434"   # Default Ollama API
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """Shared LLM client. crewai is only imported the first time this runs."""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                from crewai import LLM
+                _llm = LLM(model=LLM_MODEL, base_url=LLM_BASE_URL)
+    return _llm
+
+
+def __getattr__(name):
+    # Keeps `from trip_agents.llm import llm` working without an import-time client
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
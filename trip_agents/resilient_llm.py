@@ -0,0 +1,309 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from trip_agents.explanations import call_llm, model_name
+from telemetry.metrics import metrics
+
+# Longest a single LLM call may take before its row gets the template text
+CALL_TIMEOUT = 10.0
+
+# Budget for all the explanations of one itinerary; rows still waiting
+# when it runs out get the template text, so this bounds request latency
+REQUEST_TIMEOUT = 20.0
+
+# Seconds before a second (hedged) attempt is started for a slow call;
+# None disables hedging. A failed first attempt is retried at once either way.
+HEDGE_AFTER = None
+
+# Consecutive failed calls that open the circuit, and how long it stays
+# open before one trial call is let through
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+
+# Most attempts per client running at once, counting ones abandoned at
+# their deadline that still wait on the backend; beyond it calls fail fast
+# instead of piling up threads behind a stalled backend
+MAX_IN_FLIGHT = 32
+
+
+class LLMTimeoutError(TimeoutError):
+    outcome = "timeout"
+
+
+class CircuitOpenError(RuntimeError):
+    outcome = "rejected"
+
+
+class LLMBusyError(CircuitOpenError):
+    """Every in-flight slot is held, typically by calls stuck past their deadline."""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open ->
+    half-open after `reset_timeout` seconds, when a single trial call is
+    allowed; its success closes the circuit again, its failure reopens it.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_at = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if now - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            if state == "closed":
+                return True
+            # A trial that never reported back (e.g. an abandoned stream) expires
+            if state == "half_open" and (self._trial_at is None or now - self._trial_at >= self.reset_timeout):
+                self._trial_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_at = None
+        metrics.set("llm_circuit_open", 0)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._trial_at = None
+                opened = True
+            else:
+                opened = False
+        if opened:
+            metrics.set("llm_circuit_open", 1)
+            metrics.inc("llm_circuit_opened_total")
+
+
+class ResilientLLM:
+    """
+    Wraps an LLM client (anything call_llm accepts) so no call outlives its
+    deadline: the sooner of `call_timeout` and the request deadline given to
+    for_request(). Optionally a hedged second attempt races a slow first
+    one. Failures and timeouts feed a circuit breaker; while it is open
+    calls fail at once and every row falls back to the template text.
+    Attempts run on threads bounded by `max_in_flight` slots; a call
+    finding them all taken fails at once with LLMBusyError.
+    """
+
+    def __init__(self, llm, call_timeout=CALL_TIMEOUT, hedge_after=HEDGE_AFTER, breaker=None,
+                 max_in_flight=MAX_IN_FLIGHT):
+        self.llm = llm
+        self.model = model_name(llm)
+        self.call_timeout = call_timeout
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def _start(self, fn, *args):
+        """
+        Runs fn(*args) on a daemon thread holding an in-flight slot until it
+        returns (an attempt abandoned at its deadline keeps its slot until
+        the client gives up). Returns a Future, or None when no slot is free.
+        """
+        if not self._slots.acquire(blocking=False):
+            metrics.inc("llm_busy_rejections_total")
+            return None
+        with self._lock:
+            self.in_flight += 1
+            metrics.set("llm_in_flight", self.in_flight, model=self.model)
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    metrics.set("llm_in_flight", self.in_flight, model=self.model)
+                self._slots.release()
+
+        threading.Thread(target=run, name="llm-call", daemon=True).start()
+        return future
+
+    def _busy(self):
+        return LLMBusyError(f"{self.in_flight} LLM calls already in flight; using template text")
+
+    def for_request(self, timeout=REQUEST_TIMEOUT):
+        """A view of this client whose calls also stop `timeout` seconds from now."""
+        return _RequestLLM(self, time.monotonic() + timeout)
+
+    def _timeout(self, deadline):
+        remaining = self.call_timeout
+        if deadline is not None:
+            remaining = min(remaining, deadline - time.monotonic())
+        if remaining <= 0:
+            metrics.inc("llm_deadline_exceeded_total")
+            raise LLMTimeoutError("Request deadline exceeded before the LLM call started")
+        return remaining
+
+    def _admit(self):
+        if not self.breaker.allow():
+            metrics.inc("llm_circuit_rejections_total")
+            raise CircuitOpenError("LLM circuit is open; using template text")
+
+    def _attempt(self, prompt, hedge):
+        start = time.perf_counter()
+        try:
+            text = call_llm(self.llm, prompt)
+        except Exception:
+            metrics.observe("llm_attempt_seconds", time.perf_counter() - start, outcome="error", hedge=hedge)
+            raise
+        metrics.observe("llm_attempt_seconds", time.perf_counter() - start, outcome="ok", hedge=hedge)
+        return text
+
+    def call(self, prompt, deadline=None):
+        timeout = self._timeout(deadline)
+        self._admit()
+        start = time.monotonic()
+        ends_at = start + timeout
+
+        first = self._start(self._attempt, prompt, 0)
+        if first is None:
+            raise self._busy()
+        attempts = [first]
+        retried = False
+        error = None
+        while True:
+            hedge_at = start + self.hedge_after if self.hedge_after is not None and not retried else None
+            wait_until = min(ends_at, hedge_at) if hedge_at is not None else ends_at
+            done, _ = wait([a for a in attempts if not a.done()] or attempts,
+                           timeout=max(0.0, wait_until - time.monotonic()), return_when=FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None:
+                    self.breaker.record_success()
+                    return attempt.result()
+                error = attempt.exception()
+
+            pending = [a for a in attempts if not a.done()]
+            now = time.monotonic()
+            if now >= ends_at:
+                break
+            if not retried and (not pending or (hedge_at is not None and now >= hedge_at)):
+                # Hedge a slow first attempt, or retry a failed one, within the same deadline
+                retried = True
+                second = self._start(self._attempt, prompt, 1)
+                if second is not None:
+                    metrics.inc("llm_hedges_total", reason="slow" if pending else "error")
+                    attempts.append(second)
+                    continue
+            if not pending:
+                break
+
+        self.breaker.record_failure()
+        abandoned = sum(not a.done() for a in attempts)
+        if abandoned or error is None:
+            metrics.inc("llm_abandoned_total", abandoned)
+            metrics.inc("llm_timeouts_total")
+            raise LLMTimeoutError(f"LLM call exceeded {timeout:.2f}s")
+        raise error
+
+    def stream(self, prompt, deadline=None):
+        """Chunks from the client's stream(), or its whole reply as one chunk, within the deadline."""
+        timeout = self._timeout(deadline)
+        self._admit()
+        ends_at = time.monotonic() + timeout
+        chunks = queue.Queue()
+        done = object()
+        abandoned = threading.Event()
+
+        def produce():
+            # Holds an in-flight slot like a call; stops reading once the consumer has given up
+            try:
+                stream = getattr(self.llm, "stream", None)
+                for chunk in (stream(prompt) if callable(stream) else [call_llm(self.llm, prompt)]):
+                    if abandoned.is_set():
+                        return
+                    chunks.put(chunk)
+                chunks.put(done)
+            except Exception as e:
+                chunks.put(e)
+
+        start = time.perf_counter()
+        if self._start(produce) is None:
+            raise self._busy()
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=max(0.0, ends_at - time.monotonic()))
+                except queue.Empty:
+                    self.breaker.record_failure()
+                    metrics.inc("llm_abandoned_total")
+                    metrics.inc("llm_timeouts_total")
+                    raise LLMTimeoutError(f"LLM stream exceeded {timeout:.2f}s")
+                if item is done:
+                    self.breaker.record_success()
+                    metrics.observe("llm_attempt_seconds", time.perf_counter() - start, outcome="ok", hedge=0)
+                    return
+                if isinstance(item, Exception):
+                    self.breaker.record_failure()
+                    metrics.observe("llm_attempt_seconds", time.perf_counter() - start, outcome="error", hedge=0)
+                    raise item
+                yield item
+        finally:
+            abandoned.set()
+
+
+class _RequestLLM:
+    """ResilientLLM calls bounded by one request's deadline (see for_request)."""
+
+    def __init__(self, resilient, deadline):
+        self.resilient = resilient
+        self.model = resilient.model
+        self.deadline = deadline
+
+    def call(self, prompt):
+        return self.resilient.call(prompt, self.deadline)
+
+    def stream(self, prompt):
+        return self.resilient.stream(prompt, self.deadline)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def resilient(llm):
+    """
+    The process-wide ResilientLLM for `llm` (one circuit breaker per
+    backend client, shared by every request). Wrapped clients pass through.
+    """
+    if isinstance(llm, (ResilientLLM, _RequestLLM)):
+        return llm
+    with _clients_lock:
+        entry = _clients.get(id(llm))
+        if entry is None or entry[0] is not llm:
+            entry = _clients[id(llm)] = (llm, ResilientLLM(llm))
+        return entry[1]
+
+
+def for_request(llm, timeout=REQUEST_TIMEOUT):
+    """`llm` made resilient and bounded by a deadline `timeout` seconds from now."""
+    wrapped = resilient(llm)
+    return wrapped if isinstance(wrapped, _RequestLLM) else wrapped.for_request(timeout)
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+
+REQUEST_FIELDS = {
+    "user_id": int,
+    "location": str,
+    "country": str,
+    "budget": str,
+    "climate": str,
+    "trip_days": int,
+}
+DEFAULTS = {"budget": "medium", "climate": "warm", "trip_days": 3}
+
+
+def _default_generate(**request):
+    from trip_agents.trip_agents import generate_itinerary
+    return generate_itinerary(**request)
+
+
+def _default_stream(**request):
+    from trip_agents.trip_agents import generate_itinerary_stream
+    return generate_itinerary_stream(**request)
+
+
+def parse_request(payload):
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object.")
+    request = dict(DEFAULTS)
+    for field, cast in REQUEST_FIELDS.items():
+        if field in payload:
+            try:
+                request[field] = cast(payload[field])
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for '{field}': {payload[field]!r}")
+        elif field not in request:
+            raise ValueError(f"Missing required field: '{field}'")
+    for field in ["location", "country", "budget", "climate"]:
+        request[field] = request[field].strip()
+    request["budget"] = request["budget"].lower()
+    request["climate"] = request["climate"].lower()
+    return request
+
+
+class ItineraryService:
+    """
+    Long-running front end for generate_itinerary.
+
+    Work runs on a bounded thread pool so the event loop stays responsive.
+    Identical requests that arrive while one is already running share its
+    result, at most `max_pending` requests may be queued or running before
+    new ones are rejected with 503, and each request gets `timeout` seconds.
+    """
+
+    def __init__(self, generate=None, max_workers=8, max_pending=64, timeout=120.0, stream=None):
+        self.generate = generate or _default_generate
+        self.stream = stream or _default_stream
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="itinerary")
+        self._inflight = {}
+        self._pending = 0
+        self.stats = {"requests": 0, "coalesced": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+
+    def warm_up(self):
+        """Loads the POI catalog and models before the first request arrives."""
+        from ml_models.poi_catalog import get_catalog
+        from ml_models.model_registry import registry
+        from ml_models import destination_classifier, preference_scorer
+
+        get_catalog().frame()
+        for path in [destination_classifier.MODEL_PATH, destination_classifier.ENCODER_PATH,
+                     preference_scorer.MODEL_PATH, preference_scorer.ENCODER_PATH]:
+            try:
+                registry.get(path)
+            except FileNotFoundError:
+                print(f"Model not found at {path}; it will be loaded on first use.")
+        if self.generate is _default_generate:
+            import trip_agents.trip_agents  # noqa: F401  (crewai import happens here, not per request)
+
+    def _run(self, request):
+        itinerary = self.generate(**request)
+        return json.loads(itinerary.to_json(orient="records"))
+
+    async def itinerary(self, request):
+        self.stats["requests"] += 1
+        key = tuple(sorted(request.items()))
+        shared = self._inflight.get(key)
+
+        if shared is not None:
+            self.stats["coalesced"] += 1
+        else:
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise web.HTTPServiceUnavailable(
+                    text=json.dumps({"error": "Server busy, try again shortly."}),
+                    content_type="application/json", headers={"Retry-After": "1"},
+                )
+            loop = asyncio.get_running_loop()
+            shared = loop.run_in_executor(self._executor, self._run, request)
+            self._inflight[key] = shared
+            self._pending += 1
+
+            def release(_):
+                self._pending -= 1
+                self._inflight.pop(key, None)
+
+            shared.add_done_callback(release)
+
+        try:
+            # shield: one caller timing out must not cancel the shared work
+            return await asyncio.wait_for(asyncio.shield(shared), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise web.HTTPGatewayTimeout(
+                text=json.dumps({"error": f"Itinerary not ready within {self.timeout}s."}),
+                content_type="application/json",
+            )
+
+    async def handle_itinerary(self, http_request):
+        try:
+            request = parse_request(await http_request.json())
+        except (ValueError, json.JSONDecodeError) as e:
+            raise web.HTTPBadRequest(text=json.dumps({"error": str(e)}), content_type="application/json")
+        if http_request.query.get("profile") in ("1", "true"):
+            # cProfile/tracemalloc capture, written with the request's trace
+            request["profile"] = True
+
+        start = time.perf_counter()
+        try:
+            itinerary = await self.itinerary(request)
+        except ValueError as e:
+            self.stats["errors"] += 1
+            raise web.HTTPUnprocessableEntity(text=json.dumps({"error": str(e)}), content_type="application/json")
+        return web.json_response({
+            "itinerary": itinerary,
+            "seconds": round(time.perf_counter() - start, 4),
+        })
+
+    async def handle_stream(self, http_request):
+        """
+        NDJSON: a "schedule" line as soon as the itinerary is optimised, then
+        one "explanation" line per slot as each is ready, then "done".
+        """
+        from trip_agents.stages import aiter_events, event_json
+
+        try:
+            request = parse_request(await http_request.json())
+        except (ValueError, json.JSONDecodeError) as e:
+            raise web.HTTPBadRequest(text=json.dumps({"error": str(e)}), content_type="application/json")
+        if http_request.query.get("tokens") in ("1", "true"):
+            request["tokens"] = True
+
+        if self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise web.HTTPServiceUnavailable(
+                text=json.dumps({"error": "Server busy, try again shortly."}),
+                content_type="application/json", headers={"Retry-After": "1"},
+            )
+
+        self.stats["requests"] += 1
+        self._pending += 1
+
+        def open_stream():
+            # Created on the executor too, so any eager setup work stays off the event loop
+            yield from self.stream(**request)
+
+        events = aiter_events(open_stream(), self._executor)
+        try:
+            # Errors before the schedule (unknown city, nothing fits) are still plain HTTP errors
+            try:
+                first = await asyncio.wait_for(anext(events), self.timeout)
+            except ValueError as e:
+                self.stats["errors"] += 1
+                raise web.HTTPUnprocessableEntity(text=json.dumps({"error": str(e)}), content_type="application/json")
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                raise web.HTTPGatewayTimeout(
+                    text=json.dumps({"error": f"Itinerary not ready within {self.timeout}s."}),
+                    content_type="application/json",
+                )
+
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(http_request)
+            await response.write((event_json(first) + "\n").encode())
+            async for event in events:
+                await response.write((event_json(event) + "\n").encode())
+            await response.write_eof()
+            return response
+        finally:
+            self._pending -= 1
+            await events.aclose()
+
+    async def handle_health(self, _):
+        return web.json_response(dict(self.stats, pending=self._pending, inflight=len(self._inflight)))
+
+    async def handle_metrics(self, _):
+        from telemetry.metrics import metrics
+
+        def service_metrics():
+            gauges = [(f"service_{name}", value, {}) for name, value in self.stats.items()]
+            return gauges + [("service_pending", self._pending, {}), ("service_inflight", len(self._inflight), {})]
+
+        return web.Response(text=metrics.render([service_metrics]), content_type="text/plain")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_app(service=None):
+    service = service or ItineraryService()
+    app = web.Application()
+    app.router.add_post("/itinerary", service.handle_itinerary)
+    app.router.add_post("/itinerary/stream", service.handle_stream)
+    app.router.add_get("/health", service.handle_health)
+    app.router.add_get("/metrics", service.handle_metrics)
+
+    async def on_cleanup(_):
+        service.shutdown()
+
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def run_service(host="127.0.0.1", port=8080, **service_options):
+    from ml_models.recommendation_store import get_recommendation_store, RecommendationRefresher
+
+    service = ItineraryService(**service_options)
+    print("Warming up models and POI catalog...")
+    service.warm_up()
+    store = get_recommendation_store()
+    if store is not None:
+        # Recomputes invalidated recommendation lists in the background
+        RecommendationRefresher(store).start()
+    print(f"Trip planner service listening on http://{host}:{port}")
+    web.run_app(create_app(service), host=host, port=port, print=None)
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import time
+from trip_agents.explanations import explain_rows, iter_explanations, template_explanation, MAX_CONCURRENCY
+from trip_agents.resilient_llm import for_request, REQUEST_TIMEOUT
+from telemetry.metrics import metrics
+from telemetry.tracing import span, trace
+
+# The pipeline stages as plain functions. The CrewAI agents in
+# trip_agents.py delegate here; template_itinerary uses them directly so
+# template-only requests never import crewai or create an LLM client.
+
+
+def plan_trip(location, budget, climate, country=None):
+    from ml_models.destination_classifier import predict_category
+
+    with span("classify") as stage:
+        # Multi-city trips are classified by their first city, whole-country
+        # trips by the country's top-rated city
+        cities = parse_locations(location) or _top_city(country)
+        if not cities:
+            stage.set(category=None)
+            return None
+        category = predict_category(climate, cities[0], budget)
+        stage.set(category=str(category))
+    return category
+
+
+def _top_city(country):
+    from ml_models.poi_catalog import get_catalog
+
+    pois = get_catalog().in_country(country) if country else None
+    if pois is None or pois.empty:
+        return []
+    return [pois.loc[pois["rating"].idxmax(), "location"]]
+
+
+def parse_locations(location):
+    """Cities in `location`: "Paris, Lyon" gives both; "" or "*" gives [] (the whole country)."""
+    cities = [city.strip() for city in str(location or "").split(",")]
+    return [city for city in cities if city and city != "*"]
+
+
+def score_pois(user_id, location, country):
+    import pandas as pd
+    from ml_models.poi_catalog import get_catalog
+
+    with span("score") as stage:
+        catalog = get_catalog()
+        cities = parse_locations(location)
+        if not cities:
+            filtered = catalog.in_country(country)
+        elif len(cities) == 1:
+            filtered = catalog.in_location(country, cities[0])
+        else:
+            filtered = pd.concat([catalog.in_location(country, city) for city in cities])
+        stage.set(candidates=len(filtered))
+        if filtered.empty:
+            raise ValueError(f"No POIs found in {location}, {country}")
+        return score_candidates(filtered)
+
+
+def score_candidates(pois):
+    pois["score"] = pois["rating"] / 5.0
+    return pois.sort_values("score", ascending=False)
+
+
+def build_itinerary(pois, trip_days, slots_per_day, max_budget, geo_routing=True, workers=None):
+    """`workers` caps the multi-city process pool (1 solves cities inline)."""
+    options = {}
+    if pois["location"].nunique() > 1:
+        # Candidates from several cities: days are split across them (see multi_city.py)
+        from ml_models.multi_city import plan_multi_city as solve
+        options["workers"] = workers
+    else:
+        from ml_models.optimizer import optimize_itinerary as solve
+
+    with span("optimize", candidates=len(pois)) as stage:
+        itinerary = solve(
+            recommended_pois=pois,
+            trip_days=trip_days,
+            slots_per_day=slots_per_day,
+            max_budget=max_budget,
+            enforce_diversity=True,
+            geo_routing=geo_routing,
+            **options
+        )
+        solution = itinerary.attrs.get("solution", {})
+        stage.set(slots=len(itinerary), solver=solution.get("solver"), optimal=solution.get("optimal"))
+    return itinerary
+
+
+def explain_itinerary(llm, itinerary_df, max_concurrency=MAX_CONCURRENCY, use_cache=True,
+                      timeout=REQUEST_TIMEOUT):
+    """
+    Adds an `explanation` column; with llm=None the template text is used.
+    Rows whose LLM call has not finished `timeout` seconds in get the
+    template text (see resilient_llm.py).
+    """
+    rows = itinerary_df.to_dict("records")
+    with span("explain", rows=len(rows), llm=llm is not None):
+        if llm is None:
+            itinerary_df["explanation"] = [template_explanation(row) for row in rows]
+            return itinerary_df
+
+        from trip_agents.explanation_cache import get_explanation_cache
+        cache = get_explanation_cache() if use_cache else None
+        itinerary_df["explanation"] = explain_rows(for_request(llm, timeout), rows, max_concurrency, cache)
+        return itinerary_df
+
+
+def template_itinerary(
+    user_id: int,
+    location: str,
+    country: str,
+    budget: str = "medium",
+    climate: str = "warm",
+    trip_days: int = 3,
+    slots_per_day: int = 2,
+    profile: bool = False
+):
+    """generate_itinerary without agents or LLM: template explanations only."""
+    with trace("template_itinerary", profile=profile, user_id=user_id, location=location, country=country):
+        plan_trip(location, budget, climate, country)
+        pois = score_pois(user_id, location, country)
+        itinerary = explain_itinerary(None, build_itinerary(pois, trip_days, slots_per_day, budget))
+
+        if itinerary.empty:
+            raise ValueError("No itinerary generated. Try different parameters or check data.")
+
+        return itinerary
+
+
+def stream_explanations(llm, itinerary_df, max_concurrency=MAX_CONCURRENCY, use_cache=True, tokens=False,
+                        timeout=REQUEST_TIMEOUT):
+    """
+    Events for an optimised itinerary: {"event": "schedule"} with the slots
+    straight away, then one "explanation" event per slot as each finishes
+    (plus "token" events with `tokens`), and "done" with the full table.
+    All explanations arrive within `timeout` seconds, as in explain_itinerary.
+    """
+    yield {"event": "schedule", "itinerary": itinerary_df.copy()}
+
+    rows = itinerary_df.to_dict("records")
+    start = time.perf_counter()
+    if llm is None:
+        events = (("explanation", i, template_explanation(row)) for i, row in enumerate(rows))
+    else:
+        from trip_agents.explanation_cache import get_explanation_cache
+        cache = get_explanation_cache() if use_cache else None
+        events = iter_explanations(for_request(llm, timeout), rows, max_concurrency, cache, tokens)
+
+    explanations = [None] * len(rows)
+    for kind, index, text in events:
+        if kind == "token":
+            yield {"event": "token", "index": index, "text": text}
+            continue
+        explanations[index] = text
+        yield {"event": "explanation", "index": index, "row": rows[index], "explanation": text}
+    # Not a span: the consumer runs between yields, so a context would leak into it
+    metrics.observe("stage_seconds", time.perf_counter() - start, stage="explain")
+
+    itinerary_df = itinerary_df.copy()
+    itinerary_df["explanation"] = explanations
+    yield {"event": "done", "itinerary": itinerary_df}
+
+
+def stream_template_itinerary(
+    user_id: int,
+    location: str,
+    country: str,
+    budget: str = "medium",
+    climate: str = "warm",
+    trip_days: int = 3,
+    slots_per_day: int = 2,
+    tokens: bool = False
+):
+    """template_itinerary as a stream of events (see stream_explanations). Templates have no tokens."""
+    with trace("template_itinerary_stream", user_id=user_id, location=location, country=country):
+        plan_trip(location, budget, climate, country)
+        pois = score_pois(user_id, location, country)
+        itinerary = build_itinerary(pois, trip_days, slots_per_day, budget)
+    if itinerary.empty:
+        raise ValueError("No itinerary generated. Try different parameters or check data.")
+    yield from stream_explanations(None, itinerary)
+
+
+def event_json(event):
+    """One event as a JSON line (DataFrames become lists of records)."""
+    payload = dict(event)
+    if "itinerary" in payload:
+        payload["itinerary"] = json.loads(payload["itinerary"].to_json(orient="records"))
+    return json.dumps(payload, default=str)
+
+
+async def aiter_events(events, executor=None):
+    """Async iterator over a blocking event generator; each step runs on `executor`."""
+    loop = asyncio.get_running_loop()
+    done = object()
+    try:
+        while True:
+            event = await loop.run_in_executor(executor, next, events, done)
+            if event is done:
+                return
+            yield event
+    finally:
+        try:
+            events.close()
+        except ValueError:
+            pass    # cancelled while a step was still running on the executor
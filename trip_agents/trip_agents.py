@@ -1,47 +1,30 @@
-from crewai import Agent, Crew
-from trip_agents.llm import llm
-from trip_agents.trip_tasks import (
-    create_trip_planning_task,
-    create_scoring_task,
-    create_optimizer_task,
-    create_explanation_task
-)
-from ml_models.recommender import hybrid_recommend
-from ml_models.optimizer import optimize_itinerary
-from ml_models.destination_classifier import predict_category
-import pandas as pd
+from crewai import Agent
+from trip_agents.llm import get_llm
+from trip_agents.explanations import MAX_CONCURRENCY
+from trip_agents import stages
+from telemetry.tracing import trace, bind
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 
 # Agent Definitions
 
 class PlannerAgent(Agent):
-    def plan_trip(self, location, budget, climate):
-        category = predict_category(climate, location, budget)
+    def plan_trip(self, location, budget, climate, country=None):
+        category = stages.plan_trip(location, budget, climate, country)
         print(f"[PlannerAgent] Predicted category: {category}")
         return category
 
 
 class ScoringAgent(Agent):
     def score_pois(self, user_id, location, country):
-        pois = pd.read_csv("data/POIs_draft1.csv")
-        filtered = pois[(pois["country"] == country) & (pois["location"] == location)]
-        if filtered.empty:
-            raise ValueError(f"No POIs found in {location}, {country}")
-        filtered["score"] = filtered["rating"] / 5.0
-        return filtered.sort_values("score", ascending=False)
+        return stages.score_pois(user_id, location, country)
 
 
 class OptimizerAgent(Agent):
-    def build_itinerary(self, pois, trip_days, slots_per_day, max_budget):
+    def build_itinerary(self, pois, trip_days, slots_per_day, max_budget, geo_routing=True):
         print("[OptimizerAgent] Building itinerary...")
-        itinerary = optimize_itinerary(
-            recommended_pois=pois,
-            trip_days=trip_days,
-            slots_per_day=slots_per_day,
-            max_budget=max_budget,
-            enforce_diversity=True
-        )
-        return itinerary
+        return stages.build_itinerary(pois, trip_days, slots_per_day, max_budget, geo_routing)
 
 
 """class ExplanationAgent(Agent):
@@ -56,51 +39,130 @@ class OptimizerAgent(Agent):
         return itinerary_df"""
 
 class ExplanationAgent(Agent):
-    def explain_itinerary(self, itinerary_df):
+    def explain_itinerary(self, itinerary_df, max_concurrency=MAX_CONCURRENCY, use_cache=True):
         """
         Uses the local LLM (Mistral via Ollama) to generate natural-language
-        explanations for each POI in the itinerary.
+        explanations for each POI in the itinerary. Prompts are sent
+        concurrently (up to `max_concurrency`) and results keep row order.
+        Explanations for POIs seen before come from the on-disk cache.
         """
-        explanations = []
+        return stages.explain_itinerary(self.llm, itinerary_df, max_concurrency, use_cache)
 
-        for _, row in itinerary_df.iterrows():
-            prompt = f"""
-            You are a friendly travel assistant.
-            Explain in 1–2 sentences why {row['name']} in {row['location']} was chosen 
-            for the itinerary. Mention its category ({row['category']}), 
-            rating ({row['rating']} stars), and budget level ({row['budget']}).
-            Keep it concise, warm, and natural.
-            """
-
-            try:
-                # Handle different CrewAI LLM APIs
-                if hasattr(self.llm, "run"):
-                    response = self.llm.run(prompt)
-                elif hasattr(self.llm, "call"):
-                    response = self.llm.call(prompt)
-                elif hasattr(self.llm, "__call__"):
-                    response = self.llm(prompt)
-                else:
-                    raise AttributeError("No valid text generation method found in LLM.")
-
-                explanation = str(response).strip()
-
-            except Exception as e:
-                print(f"LLM failed for {row['name']}: {e}")
-                explanation = (
-                    f"{row['name']} was selected because it fits your budget "
-                    f"({row['budget']}), has a high rating ({row['rating']}), "
-                    f"and matches your interest in {row['category']}."
-                )
-
-            explanations.append(explanation)
 
-        itinerary_df["explanation"] = explanations
-        return itinerary_df
 
+# Crew Orchestration
+
+class TripPipeline:
+    """
+    The four agents, built once and reused for every request.
+
+    plan_trip and score_pois share no data, so they run concurrently.
+    The CrewAI Tasks/Crew are only needed for crew.kickoff() and are
+    built on demand with build_crew().
+    """
+
+    def __init__(self, agent_llm=None, slots_per_day=2):
+        agent_llm = agent_llm or get_llm()
+        self.slots_per_day = slots_per_day
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="trip-pipeline")
+
+        self.planner = PlannerAgent(
+            llm=agent_llm,
+            role="Trip Planner",
+            goal="Plan suitable destinations and categories based on user context",
+            backstory="An expert travel planner who knows global destinations and user preferences."
+        )
+
+        self.scorer = ScoringAgent(
+            llm=agent_llm,
+            role="POI Scorer",
+            goal="Score POIs by user interest and preference",
+            backstory="An experienced travel data analyst ranking points of interest."
+        )
+
+        self.optimizer = OptimizerAgent(
+            llm=agent_llm,
+            role="Itinerary Optimizer",
+            goal="Optimize itinerary with time and budget constraints",
+            backstory="A travel logistics specialist who designs efficient trip schedules."
+        )
+
+        self.explainer = ExplanationAgent(
+            llm=agent_llm,
+            role="Explanation Agent",
+            goal="Provide justifications for itinerary decisions",
+            backstory="An AI travel assistant skilled at explaining why each choice was made."
+        )
+
+    def build_crew(self, user_id, location, country, budget="medium", climate="warm", trip_days=3):
+        from crewai import Crew
+        from trip_agents.trip_tasks import (
+            create_trip_planning_task,
+            create_scoring_task,
+            create_optimizer_task,
+            create_explanation_task
+        )
+
+        planning_task = create_trip_planning_task(self.planner, location, budget, climate)
+        scoring_task = create_scoring_task(self.scorer, user_id, location, country)
+        optimizer_task = create_optimizer_task(self.optimizer, trip_days, self.slots_per_day, budget)
+        explanation_task = create_explanation_task(self.explainer)
+
+        return Crew(
+            agents=[self.planner, self.scorer, self.optimizer, self.explainer],
+            tasks=[planning_task, scoring_task, optimizer_task, explanation_task],
+            verbose=True
+        )
+
+    def run(self, user_id, location, country, budget="medium", climate="warm", trip_days=3, profile=False):
+        with trace("generate_itinerary", profile=profile, user_id=user_id, location=location, country=country):
+            # Independent stages first: classification runs while POIs are scored
+            planning = self._executor.submit(bind(self.planner.plan_trip), location, budget, climate, country)
+            pois = self.scorer.score_pois(user_id, location, country)
+            category = planning.result()
 
+            itinerary = self.optimizer.build_itinerary(pois, trip_days, self.slots_per_day, budget)
+            explained = self.explainer.explain_itinerary(itinerary)
+
+            if explained.empty:
+                raise ValueError("No itinerary generated. Try different parameters or check data.")
+
+            return explained
+
+
+    def stream(self, user_id, location, country, budget="medium", climate="warm", trip_days=3, tokens=False):
+        """
+        run() as a generator: the schedule is yielded as soon as it is
+        optimised, then each slot's explanation as its LLM call completes
+        (see stages.stream_explanations). Token events need max_concurrency=1
+        to stay readable, so `tokens` explains one slot at a time.
+        """
+        with trace("generate_itinerary_stream", user_id=user_id, location=location, country=country):
+            planning = self._executor.submit(bind(self.planner.plan_trip), location, budget, climate, country)
+            pois = self.scorer.score_pois(user_id, location, country)
+            planning.result()
+            itinerary = self.optimizer.build_itinerary(pois, trip_days, self.slots_per_day, budget)
+
+        if itinerary.empty:
+            raise ValueError("No itinerary generated. Try different parameters or check data.")
+
+        max_concurrency = 1 if tokens else MAX_CONCURRENCY
+        yield from stages.stream_explanations(self.explainer.llm, itinerary, max_concurrency, tokens=tokens)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """Process-wide TripPipeline, built on first use."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = TripPipeline()
+    return _pipeline
 
-# Crew Orchestration Function
 
 def generate_itinerary(
     user_id: int,
@@ -108,57 +170,26 @@ def generate_itinerary(
     country: str,
     budget: str = "medium",
     climate: str = "warm",
-    trip_days: int = 3
+    trip_days: int = 3,
+    profile: bool = False
 ):
     print(f"Generating itinerary for {location}, {country}...")
+    return get_pipeline().run(user_id, location, country, budget, climate, trip_days, profile)
+
+
+def generate_itinerary_stream(
+    user_id: int,
+    location: str,
+    country: str,
+    budget: str = "medium",
+    climate: str = "warm",
+    trip_days: int = 3,
+    tokens: bool = False
+):
+    """Generator variant of generate_itinerary; yields event dicts."""
+    return get_pipeline().stream(user_id, location, country, budget, climate, trip_days, tokens)
+
 
-    planner = PlannerAgent(
-        llm=llm,
-        role="Trip Planner",
-        goal="Plan suitable destinations and categories based on user context",
-        backstory="An expert travel planner who knows global destinations and user preferences."
-    )
-
-    scorer = ScoringAgent(
-        llm=llm,
-        role="POI Scorer",
-        goal="Score POIs by user interest and preference",
-        backstory="An experienced travel data analyst ranking points of interest."
-    )
-
-    optimizer = OptimizerAgent(
-        llm=llm,
-        role="Itinerary Optimizer",
-        goal="Optimize itinerary with time and budget constraints",
-        backstory="A travel logistics specialist who designs efficient trip schedules."
-    )
-
-    explainer = ExplanationAgent(
-        llm=llm,
-        role="Explanation Agent",
-        goal="Provide justifications for itinerary decisions",
-        backstory="An AI travel assistant skilled at explaining why each choice was made."
-    )
-
-    
-    planning_task = create_trip_planning_task(planner, location, budget, climate)
-    scoring_task = create_scoring_task(scorer, user_id, location, country)
-    optimizer_task = create_optimizer_task(optimizer, trip_days, 2, budget)
-    explanation_task = create_explanation_task(explainer)
-
-    crew = Crew(
-        agents=[planner, scorer, optimizer, explainer],
-        tasks=[planning_task, scoring_task, optimizer_task, explanation_task],
-        verbose=True
-    )
-
-    # Sequential workflow
-    category = planner.plan_trip(location, budget, climate)
-    pois = scorer.score_pois(user_id, location, country)
-    itinerary = optimizer.build_itinerary(pois, trip_days, 2, budget)
-    explained = explainer.explain_itinerary(itinerary)
-
-    if explained.empty:
-        raise ValueError("No itinerary generated. Try different parameters or check data.")
-
-    return explained
+def agenerate_itinerary_stream(*args, executor=None, **kwargs):
+    """Async-iterator variant of generate_itinerary_stream for event-loop callers."""
+    return stages.aiter_events(generate_itinerary_stream(*args, **kwargs), executor)